@@ -0,0 +1,217 @@
+# benchmarks/fake_server.py
+"""
+Local stand-in for the NCBI E-utilities (esearch/efetch, including the History server)
+and a Groq/OpenAI-compatible chat completions endpoint, for reproducible offline benchmarks.
+
+Result sets are generated, not recorded: the query term `size=N` matches PMIDs 1..N and
+every PMID always yields the same synthetic article, so runs are comparable.
+
+    python benchmarks/fake_server.py [--port 8765] [--latency 0.05] [--rate 10]
+
+Then point the tool at it:
+
+    NCBI_EUTILS_URL=http://127.0.0.1:8765/entrez/eutils GROQ_BASE_URL=http://127.0.0.1:8765 GROQ_API_KEY=fake
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Any, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import escape
+
+FIRST_NAMES = ["Jane", "John", "Wei", "Priya", "Lars", "Yuki", "Maria", "Ahmed", "Olga", "Carlos"]
+LAST_NAMES = ["Doe", "Smith", "Zhang", "Patel", "Nilsson", "Tanaka", "Garcia", "Hassan", "Ivanova", "Lopez"]
+DEPARTMENTS = ["Department of Pharmacology", "Division of Oncology", "Research and Development",
+               "Discovery Biology", "Clinical Operations", "Laboratory of Genetics"]
+ACADEMIC = ["Harvard University", "Karolinska Institute", "Imperial College London",
+            "Mayo Clinic Hospital", "Max Planck Institute for Biology", "National Cancer Center"]
+INDUSTRY = ["Pfizer Inc.", "Novartis Pharmaceuticals Corporation", "Genmab A/S", "Acme Therapeutics",
+            "BioNTech SE", "Sun Pharmaceutical Industries Ltd", "Regeneron Pharmaceuticals Inc"]
+# No keyword hits: these go through triage to the LLM layer
+AMBIGUOUS = ["Genentech", "Moderna", "Illumina", "Vertex", "Amgen", "Broad Foundation"]
+LLM_INDUSTRY = {"Genentech", "Moderna", "Illumina", "Vertex", "Amgen"}
+PLACES = ["Boston, MA, USA", "Basel, Switzerland", "Princeton, NJ, USA", "Tokyo, Japan",
+          "Mumbai, India", "Cambridge, UK", "Mainz, Germany"]
+
+def make_article(pmid: int) -> str:
+    """
+    The synthetic <PubmedArticle> for `pmid`; deterministic per PMID.
+    """
+    rng = random.Random(pmid)
+    authors = []
+    for i in range(rng.randint(2, 8)):
+        roll = rng.random()
+        org = rng.choice(ACADEMIC if roll < 0.6 else INDUSTRY if roll < 0.85 else AMBIGUOUS)
+        affiliation = f"{rng.choice(DEPARTMENTS)}, {org}, {rng.choice(PLACES)}"
+        if rng.random() < 0.1:
+            affiliation += f". author{pmid}.{i}@example.org"
+        authors.append(
+            f"<Author><LastName>{rng.choice(LAST_NAMES)}</LastName><ForeName>{rng.choice(FIRST_NAMES)}</ForeName>"
+            f"<AffiliationInfo><Affiliation>{escape(affiliation)}</Affiliation></AffiliationInfo></Author>"
+        )
+    return (
+        f"<PubmedArticle><MedlineCitation><PMID>{pmid}</PMID><Article>"
+        f"<Journal><JournalIssue><PubDate><Year>{rng.randint(2000, 2024)}</Year><Month>Jan</Month>"
+        f"<Day>{rng.randint(1, 28)}</Day></PubDate></JournalIssue></Journal>"
+        f"<ArticleTitle>Synthetic study {pmid} of pathway {rng.randint(1, 999)}</ArticleTitle>"
+        f"<AuthorList>{''.join(authors)}</AuthorList></Article></MedlineCitation></PubmedArticle>"
+    )
+
+def classify_line(line: str) -> Optional[List[str]]:
+    """
+    The fake model's verdict for one '<id>\\t<affiliation>' line.
+    """
+    idx, _, affiliation = line.partition("\t")
+    for name in LLM_INDUSTRY:
+        if name in affiliation:
+            email = re.findall(r"[\w\.-]+@[\w\.-]+\.\w+", affiliation)
+            return [int(idx), name, email[0] if email else "none"]
+    return None
+
+class FakeServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], latency: float = 0.0, rate: float = 0.0) -> None:
+        super().__init__(address, Handler)
+        # Seconds added to every response, and requests/second allowed before answering 429
+        self.latency: float = latency
+        self.rate: float = rate
+        self.requests: int = 0
+        self.throttled: int = 0
+        self._lock = threading.Lock()
+        self._window: List[float] = []
+
+    def admit(self) -> bool:
+        """
+        Sliding one-second window rate limit; False means the request gets a 429.
+        """
+        with self._lock:
+            self.requests += 1
+            if not self.rate:
+                return True
+            now = time.monotonic()
+            self._window = [t for t in self._window if now - t < 1.0]
+            if len(self._window) >= self.rate:
+                self.throttled += 1
+                return False
+            self._window.append(now)
+            return True
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: FakeServer
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _params(self, body: bytes) -> Dict[str, str]:
+        url = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if "form-urlencoded" in self.headers.get("Content-Type", ""):
+            params.update({k: v[-1] for k, v in parse_qs(body.decode()).items()})
+        return params
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self) -> None:
+        # Always consume the body, so keep-alive connections stay in sync even on a 429
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if not self.server.admit():
+            self._send(429, b'{"error": "rate limited"}', "application/json", {"Retry-After": "1"})
+            return
+        path = urlparse(self.path).path
+        if path.endswith("/esearch.fcgi"):
+            self._esearch(self._params(body))
+        elif path.endswith("/efetch.fcgi"):
+            self._efetch(self._params(body))
+        elif path.endswith("/chat/completions"):
+            self._chat(json.loads(body))
+        else:
+            self._send(404, b"not found", "text/plain")
+
+    do_GET = _route
+    do_POST = _route
+
+    @staticmethod
+    def _size(term: str) -> int:
+        match = re.search(r"size=(\d+)", term or "")
+        return int(match.group(1)) if match else 0
+
+    def _esearch(self, params: Dict[str, str]) -> None:
+        count = self._size(params.get("term", ""))
+        start = int(params.get("retstart", 0))
+        retmax = int(params.get("retmax", 20))
+        result = {
+            "count": str(count),
+            "retstart": str(start),
+            "retmax": str(retmax),
+            "idlist": [str(pmid) for pmid in range(start + 1, min(start + retmax, count) + 1)],
+            "webenv": f"FAKE_{count}",
+            "querykey": "1"
+        }
+        self._send(200, json.dumps({"esearchresult": result}).encode(), "application/json")
+
+    def _efetch(self, params: Dict[str, str]) -> None:
+        if "id" in params:
+            pmids = [int(p) for p in params["id"].split(",") if p]
+        else:
+            count = int(params.get("WebEnv", "FAKE_0").split("_")[-1])
+            start = int(params.get("retstart", 0))
+            pmids = list(range(start + 1, min(start + int(params.get("retmax", 20)), count) + 1))
+        if params.get("rettype") == "uilist":
+            self._send(200, "\n".join(map(str, pmids)).encode(), "text/plain")
+            return
+        articles = "".join(make_article(pmid) for pmid in pmids)
+        self._send(200, f"<?xml version=\"1.0\"?><PubmedArticleSet>{articles}</PubmedArticleSet>".encode(),
+                   "text/xml")
+
+    def _chat(self, request: Dict[str, Any]) -> None:
+        user = next(m["content"] for m in request["messages"] if m["role"] == "user")
+        verdicts = [v for v in map(classify_line, user.splitlines()) if v]
+        content = json.dumps(verdicts)
+        prompt_tokens = sum(len(m["content"]) for m in request["messages"]) // 4
+        response = {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(content) // 4,
+                      "total_tokens": prompt_tokens + len(content) // 4}
+        }
+        self._send(200, json.dumps(response).encode(), "application/json")
+
+def start(port: int = 0, latency: float = 0.0, rate: float = 0.0) -> FakeServer:
+    """
+    Start the server on a background thread; port 0 picks a free port (see `server.server_port`).
+    """
+    server = FakeServer(("127.0.0.1", port), latency, rate)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fake NCBI E-utilities and Groq server.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--rate", type=float, default=0.0, help="Requests/second before answering 429 (0: unlimited)")
+    args = parser.parse_args()
+    server = FakeServer(("127.0.0.1", args.port), args.latency, args.rate)
+    print(f"Serving on http://127.0.0.1:{server.server_port}")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
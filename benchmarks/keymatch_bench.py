@@ -0,0 +1,94 @@
+# benchmarks/keymatch_bench.py
+"""
+Micro-benchmark: KeyMatch's keyword matcher vs. the previous regex implementation
+on synthetic affiliation corpora.
+
+    python benchmarks/keymatch_bench.py [--sizes 1000 10000 100000] [--seed 0]
+"""
+
+import argparse
+import random
+import re
+import time
+from typing import List, Dict, Optional, Callable
+from pubmed_papers.pipe.keymatch import KeyMatch
+
+DEPARTMENTS = ["Department of Pharmacology", "Division of Oncology", "Research and Development",
+               "Discovery Biology", "Clinical Operations", "Laboratory of Genetics"]
+ACADEMIC = ["Harvard University", "Karolinska Institute", "Imperial College London",
+            "Mayo Clinic Hospital", "Max Planck Institute for Biology", "National Cancer Center"]
+INDUSTRY = ["Pfizer Inc.", "Novartis Pharmaceuticals Corporation", "Genmab A/S", "Acme Therapeutics",
+            "BioNTech SE", "Sun Pharmaceutical Industries Ltd", "Takeda Pharmaceutical Co. Ltd",
+            "Regeneron Pharmaceuticals Inc", "Covance Drug Development", "Apex Biotech Ventures LLC"]
+PLACES = ["Boston, MA, USA", "Basel, Switzerland", "Princeton, NJ, USA", "Tokyo, Japan",
+          "Mumbai, India", "Cambridge, UK", "Mainz, Germany"]
+
+def make_corpus(size: int, seed: int) -> List[str]:
+    """
+    Generate affiliations with a realistic mix of academic, industry and ambiguous strings.
+    """
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(size):
+        org = rng.choice(ACADEMIC if rng.random() < 0.6 else INDUSTRY)
+        parts = [rng.choice(DEPARTMENTS), org, rng.choice(PLACES)]
+        if rng.random() < 0.2:
+            parts[-1] += f". author{i}@example.org"
+        corpus.append(", ".join(parts))
+    return corpus
+
+def alternation(keywords: List[str]) -> str:
+    """
+    The regex the keyword matcher replaced: a word-bounded alternation of `keywords`.
+    """
+    return r'(' + '|'.join([rf'\b{re.escape(k)}\b' for k in keywords]) + r')'
+
+def regex_classify(keymatch: KeyMatch) -> Callable[[str], Optional[Dict[str, str]]]:
+    """
+    The pre-matcher implementation of KeyMatch.classify_affiliation, kept for comparison.
+    """
+    email_pattern = re.compile(r'[\w\.-]+@[\w\.-]+\.\w+')
+    pattern = alternation(keymatch.company_keywords)
+    exclude_pattern = alternation(keymatch.exclude_keywords)
+
+    def classify(affiliation: str) -> Optional[Dict[str, str]]:
+        affiliation_lower = affiliation.lower()
+        match = re.search(pattern, affiliation_lower)
+        exclude_match = re.search(exclude_pattern, affiliation_lower)
+        if not match or exclude_match:
+            return None
+        company = match.group(0)
+        company_name = None
+        for part in [p.strip() for p in affiliation.split(',')]:
+            if company in part.lower():
+                company_name = part.strip()
+                break
+        emails = email_pattern.findall(affiliation)
+        return {"company": company_name or company, "email": emails[0] if emails else "none"}
+
+    return classify
+
+def timed(func: Callable[[str], object], corpus: List[str]) -> float:
+    start = time.perf_counter()
+    for affiliation in corpus:
+        func(affiliation)
+    return time.perf_counter() - start
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark KeyMatch matcher engines.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    keymatch = KeyMatch()
+    legacy = regex_classify(keymatch)
+    print(f"{'size':>8} {'regex s':>9} {'matcher s':>12} {'speedup':>8} {'verdict diffs':>14}")
+    for size in args.sizes:
+        corpus = make_corpus(size, args.seed)
+        regex_time = timed(legacy, corpus)
+        matcher_time = timed(keymatch.classify_affiliation, corpus)
+        diffs = sum((legacy(a) is None) != (keymatch.classify_affiliation(a) is None) for a in corpus)
+        print(f"{size:>8} {regex_time:>9.3f} {matcher_time:>12.3f} {regex_time / matcher_time:>7.1f}x {diffs:>14}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# benchmarks/pipeline_bench.py
+"""
+Offline end-to-end benchmark against the fake NCBI/Groq server (benchmarks/fake_server.py).
+Reports throughput and peak Python memory (tracemalloc) per stage and result-set size:
+fetch_pmids, fetch_metadata, KeyMatch.get_filter, the LLM stage and PubMedController.results.
+
+    python benchmarks/pipeline_bench.py [--sizes 1000 10000 100000] [--latency 0.0] [--rate 0]
+                                        [--ncbi-rate 1000] [--workers 0] [--json results.json]
+
+The server runs in a child process, so its work and memory are not measured. With --workers,
+peak memory covers only this process, not the parsing workers. Timings
+include tracemalloc overhead; compare runs made with the same options.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import List, Dict, Any, Callable, Tuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def start_server(latency: float, rate: float) -> Tuple[subprocess.Popen, str]:
+    """
+    Launch fake_server.py on a free port. Returns (process, base URL).
+    """
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "fake_server.py"), "--port", "0",
+         "--latency", str(latency), "--rate", str(rate)],
+        stdout=subprocess.PIPE, text=True
+    )
+    line = proc.stdout.readline().strip()
+    return proc, line.rsplit(" ", 1)[-1]
+
+def measure(func: Callable[[], Any]) -> Tuple[Any, float, int]:
+    """
+    Run `func`, returning (result, seconds, peak traced bytes).
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = func()
+        return result, time.perf_counter() - start, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline pipeline benchmark.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--latency", type=float, default=0.0, help="Fake server latency per request (seconds)")
+    parser.add_argument("--rate", type=float, default=0.0, help="Fake server requests/second before 429 (0: unlimited)")
+    parser.add_argument("--ncbi-rate", type=float, default=1000.0, help="Client-side NCBI rate limit (requests/second)")
+    parser.add_argument("--workers", type=int, default=0, help="Parsing processes for controller.results (0: in-process)")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    proc, base_url = start_server(args.latency, args.rate)
+    try:
+        # The client reads its endpoints and limits at import time
+        os.environ["NCBI_EUTILS_URL"] = f"{base_url}/entrez/eutils"
+        os.environ["NCBI_RATE"] = str(args.ncbi_rate)
+        os.environ["GROQ_BASE_URL"] = base_url
+        os.environ["GROQ_API_KEY"] = "fake"
+        os.environ.setdefault("GROQ_RPM", "1000000")
+        os.environ.setdefault("GROQ_TPM", "100000000")
+        from pubmed_papers.pipe.pupmed import fetch_pmids, fetch_metadata
+        from pubmed_papers.pipe.keymatch import KeyMatch
+        from pubmed_papers.pipe.LLMmatch import classify_affiliations_llama3
+        from pubmed_papers.pipe.controller import PubMedController
+
+        rows: List[Dict[str, Any]] = []
+
+        def report(size: int, stage: str, items: int, seconds: float, peak: int) -> None:
+            rows.append({"size": size, "stage": stage, "items": items, "seconds": round(seconds, 4),
+                         "items_per_second": round(items / seconds, 1) if seconds else None,
+                         "peak_mb": round(peak / 2 ** 20, 2)})
+            print(f"{size:>8} {stage:<20} {items:>8} {seconds:>9.3f} {items / seconds if seconds else 0:>12.0f} "
+                  f"{peak / 2 ** 20:>9.1f}", flush=True)
+
+        print(f"{'size':>8} {'stage':<20} {'items':>8} {'seconds':>9} {'items/s':>12} {'peak MB':>9}")
+        for size in args.sizes:
+            query = f"size={size}"
+            pmids, seconds, peak = measure(lambda query=query: fetch_pmids(query))
+            report(size, "fetch_pmids", len(pmids), seconds, peak)
+
+            papers, seconds, peak = measure(lambda pmids=pmids: fetch_metadata(pmids))
+            report(size, "fetch_metadata", len(papers), seconds, peak)
+
+            keymatch = KeyMatch()
+            (matched, unmatched), seconds, peak = measure(lambda papers=papers: keymatch.get_filter(papers))
+            report(size, "KeyMatch.get_filter", len(papers), seconds, peak)
+
+            affiliations = sorted({a["affiliation"] for p in unmatched for a in p["authors"] if a["affiliation"]})
+            _, seconds, peak = measure(lambda affiliations=affiliations: classify_affiliations_llama3(affiliations))
+            report(size, "LLM stage", len(affiliations), seconds, peak)
+
+            with PubMedController(workers=args.workers) as controller:
+                _, seconds, peak = measure(lambda query=query: controller.results(query))
+            report(size, "controller.results", size, seconds, peak)
+
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(rows, f, indent=2)
+    finally:
+        proc.terminate()
+        proc.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# benchmarks/startup_bench.py
+"""
+Startup benchmark: cumulative import time of the CLI entry point, measured with
+`python -X importtime` in fresh interpreters, checked against a budget.
+
+    python benchmarks/startup_bench.py [--runs 5] [--budget-ms 50]
+
+Exits non-zero when the median exceeds the budget or a heavy dependency
+(requests, groq, torch, transformers) is imported at startup.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+ENTRY_POINT = "pubmed_papers.main"
+HEAVY_MODULES = ["requests", "groq", "torch", "transformers"]
+# The source tree is importable without installing the package (tests/startup_test.py uses this module too)
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+def import_times(module: str) -> Dict[str, int]:
+    """
+    Import `module` in a fresh interpreter and return {module: cumulative microseconds}
+    for everything it imported.
+    """
+    env = dict(os.environ)
+    env.pop("GROQ_API_KEY", None)
+    env["PYTHONPATH"] = SRC + os.pathsep + env.get("PYTHONPATH", "")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env, check=True
+    )
+    times: Dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # "import time:  self [us] | cumulative | imported package", nesting shown by indentation
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+def heavy_imports(times: Dict[str, int]) -> List[str]:
+    """
+    The heavy dependencies (and their submodules) among the imported modules.
+    """
+    return sorted(name for name in times if name.split(".")[0] in HEAVY_MODULES)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark CLI startup import time.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    totals = []
+    heavy = set()
+    for _ in range(args.runs):
+        times = import_times(ENTRY_POINT)
+        totals.append(times[ENTRY_POINT] / 1000)
+        heavy.update(heavy_imports(times))
+    median = statistics.median(totals)
+    print(f"{ENTRY_POINT}: median {median:.1f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+    if heavy:
+        print(f"heavy modules imported at startup: {', '.join(sorted(heavy))}")
+    if heavy or median > args.budget_ms:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
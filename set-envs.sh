@@ -12,3 +12,7 @@ export POETRY_CACHE_DIR="$PWD/.poetry-cache"
 # Go to https://console.groq.com/keys to get your API key
 # You can also set this in your environment variables as GROQ_API_KEY
 export GROQ_API_KEY="YOUR_GROQ_API_KEY_HERE"
+
+# (Optional) Paste your NCBI API key below to raise the E-utilities limit from 3 to 10 requests/second
+# Go to https://account.ncbi.nlm.nih.gov/settings/ to get your API key
+# export NCBI_API_KEY="YOUR_NCBI_API_KEY_HERE"
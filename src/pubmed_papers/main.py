@@ -1,78 +1,92 @@
 # src/pubmed_papers/main.py
 
-from pubmed_papers.pipe.controller import PubMedController
 import argparse
+import os
+import re
 import sys
-import json
-import csv
-from typing import List, Dict, Any
+from contextlib import ExitStack
+from typing import TYPE_CHECKING, List, Iterable, Mapping, Optional
+from pubmed_papers.pipe.output import FORMATS, TextWriter, open_writer
+from pubmed_papers.pipe.metrics import metrics
+from pubmed_papers.pipe.records import as_paper
 from pubmed_papers.utils import DebugUtil
 
-def save_results_csv(papers: List[Dict[str, Any]], filename: str) -> None:
+if TYPE_CHECKING:
+    # Imported on use at run time, to keep the CLI's startup light
+    from pubmed_papers.pipe.gazetteer import Gazetteer
+
+def save_results_csv(papers: Iterable[Mapping], filename: str, append: bool = False,
+                     query_column: bool = False) -> None:
+    """
+    Save paper dictionaries to a CSV file with the required columns.
+    Rows are written as papers arrive, so a streaming iterable is never materialized.
+    """
+    save_results(papers, filename, "csv", append=append, query_column=query_column)
+
+def print_readable(papers: Iterable[Mapping]) -> None:
+    """
+    Print a human-readable summary of the papers as they arrive.
     """
-    Save the list of paper dictionaries to a CSV file with the required columns.
+    with TextWriter() as writer:
+        writer.write_all(papers)
+
+def save_results(papers: Iterable[Mapping], filename: str, fmt: Optional[str] = None,
+                 append: bool = False, query_column: bool = False) -> None:
     """
-    with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow([
-            "PubmedID", "Title", "Publication Date",
-            "Non-academic Author(s)", "Company Affiliation(s)", "Corresponding Author Email"
-        ])
+    Stream papers to `filename` as CSV, JSON Lines or a JSON array (default: from the extension).
+    With `append`, results are added to what an earlier run wrote.
+    """
+    try:
+        writer = open_writer(filename, fmt, append=append, query_column=query_column)
+    except (OSError, ValueError) as e:
+        DebugUtil.debug_print(f"Error saving to file: {e}", error=True)
+    with writer:
+        # Errors raised while producing the papers (the pipeline) propagate as they are;
+        # only failures of the write itself are reported as saving errors
         for paper in papers:
-            pubmed_id = paper.get("pubmed_id", "")
-            title = paper.get("title", "")
-            pub_date = paper.get("publication_date", "")
-            authors = paper.get("authors", [])
-            non_acad_authors = []
-            companies = []
-            emails = []
-            for author in authors:
-                aff = author.get("affiliation", {})
-                if aff.get("company"):
-                    non_acad_authors.append(author.get("name", ""))
-                    companies.append(aff.get("company", ""))
-                    if aff.get("email", "none") != "none":
-                        emails.append(aff.get("email"))
-            writer.writerow([
-                pubmed_id,
-                title,
-                pub_date,
-                "; ".join(non_acad_authors),
-                "; ".join(companies),
-                emails[0] if emails else ""
-            ])
-
-def print_readable(papers: List[Dict[str, Any]]) -> None:
-    """
-    Print a human-readable summary of the papers.
-    """
-    if not papers:
-        print("No Matched papers found.")
-        return
-    print("Matched papers ↓")
-    print("-" * 40)
-    for paper in papers:
-        pubmed_id = paper.get("pubmed_id", "")
-        title = paper.get("title", "")
-        pub_date = paper.get("publication_date", "")
-        authors = paper.get("authors", [])
-        non_acad_authors = []
-        companies = []
-        emails = []
-        for author in authors:
-            aff = author.get("affiliation", {})
-            if aff.get("company"):
-                non_acad_authors.append(author.get("name", ""))
-                companies.append(aff.get("company", ""))
-                if aff.get("email", "none") != "none":
-                    emails.append(aff.get("email"))
-        print(f"PubmedID: {pubmed_id}")
-        print(f"Title: {title}")
-        print(f"Publication Date: {pub_date}")
-        print(f"Non-academic Author(s): {', '.join(non_acad_authors)}")
-        print(f"Company Affiliation(s): {', '.join(companies)}")
-        print(f"Corresponding Author Email: {emails[0] if emails else ''}")
-        print("-" * 40)
+            try:
+                writer.write(paper)
+            except OSError as e:
+                DebugUtil.debug_print(f"Error saving to file: {e}", error=True)
+    DebugUtil.debug_print(f"Saved {writer.count} results to {filename}")
+
+def load_gazetteer_seed(gazetteer: "Gazetteer", filename: str) -> None:
+    """
+    Add the companies of a --gazetteer-seed file to `gazetteer`.
+    """
+    try:
+        added = gazetteer.load_seed(filename)
+    except OSError as e:
+        DebugUtil.debug_print(f"Cannot read gazetteer seed: {e}", error=True)
+    DebugUtil.debug_print(f"Gazetteer: {added} variants added from {filename}")
+
+def read_queries(filename: str) -> List[str]:
+    """
+    Read a batch file: one PubMed query per line; blank lines and lines starting with # are skipped.
+    A repeated query is kept once, at its first occurrence.
+    """
+    with open(filename, encoding='utf-8') as f:
+        queries = [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+    unique = list(dict.fromkeys(queries))
+    if len(unique) < len(queries):
+        DebugUtil.debug_print(f"Skipped {len(queries) - len(unique)} repeated queries in {filename}")
+    return unique
+
+def split_filename(filename: str, index: int) -> str:
+    """
+    Per-query output file for batch mode: results.csv -> results.3.csv for the third query.
+    """
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}.{index}{ext}"
+
+def entrez_date(value: str) -> str:
+    """
+    argparse type for --since/--until: YYYY, YYYY/MM or YYYY/MM/DD (dashes allowed), as esearch expects it.
+    """
+    date = value.replace("-", "/")
+    if not re.fullmatch(r"\d{4}(/\d{1,2}(/\d{1,2})?)?", date):
+        raise argparse.ArgumentTypeError(f"invalid date {value!r}, expected YYYY, YYYY/MM or YYYY/MM/DD")
+    return date
 
 def main() -> None:
     """
@@ -80,41 +94,255 @@ def main() -> None:
     """
     parser = argparse.ArgumentParser(description="Search PubMed papers.")
 
-    parser.add_argument("query", help="Search query for PubMed")
+    parser.add_argument("query", nargs="?", help="Search query for PubMed")
     parser.add_argument("-d", "--debug", action="store_true", help="Enable debug logging")
     parser.add_argument("-f", "--file", help="Save result to a file")
+    parser.add_argument("--format", choices=FORMATS,
+                        help="Output file format (default: from the extension; .jsonl/.ndjson is JSON Lines, other non-CSV files a JSON array)")
+    parser.add_argument("--pmids", action="store_true", help="Treat the query as a comma-separated list of PMIDs")
+    parser.add_argument("--cache-dir", help="Directory for the PMID metadata and LLM verdict caches (default: ~/.cache/pubmed_papers)")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the PMID metadata and LLM verdict caches")
+    parser.add_argument("--local-model", help="Local transformers classification model (name or path) tried before the remote LLM")
+    parser.add_argument("--threads", type=int, default=4, help="CPU threads for the local model")
+    parser.add_argument("--offline", action="store_true", help="Never call the remote LLM; only keyword and local-model matching")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only process papers added since the last run of this query and append them to --file")
+    parser.add_argument("--queries", metavar="FILE",
+                        help="Batch mode: run every query in FILE (one per line), fetching shared papers once")
+    parser.add_argument("--split", action="store_true",
+                        help="With --queries and --file, write one file per query (results.1.csv, ...) instead of a combined file with a query column")
+    parser.add_argument("--max-results", type=int, metavar="N",
+                        help="Stop once N matched papers were found; nothing past them is downloaded or classified")
+    parser.add_argument("--since", type=entrez_date, metavar="DATE",
+                        help="Only papers published on or after DATE (YYYY, YYYY/MM or YYYY/MM/DD)")
+    parser.add_argument("--until", type=entrez_date, metavar="DATE",
+                        help="Only papers published on or before DATE (YYYY, YYYY/MM or YYYY/MM/DD)")
+    parser.add_argument("--sort", choices=["relevance", "pub_date", "author", "journal"],
+                        help="Result order (default: most recently added to PubMed first)")
+    parser.add_argument("--serve", type=int, metavar="PORT",
+                        help="Run as an HTTP service on PORT instead of running one query (see README)")
+    parser.add_argument("--host", default="127.0.0.1", help="Address the service listens on (default: 127.0.0.1)")
+    parser.add_argument("--result-ttl", type=float, default=600.0,
+                        help="Seconds the service reuses a finished result set (default: 600)")
+    parser.add_argument("--shard-init", metavar="DIR",
+                        help="Sharded run, coordinator: search the query and split its PMIDs into shards in DIR")
+    parser.add_argument("--shard-size", type=int, default=5000, help="PMIDs per shard for --shard-init (default: 5000)")
+    parser.add_argument("--shard-work", metavar="DIR",
+                        help="Sharded run, worker: claim and process shards in DIR until none is left")
+    parser.add_argument("--shard-merge", metavar="DIR",
+                        help="Sharded run: combine the finished shards in DIR into --file (or print them)")
+    parser.add_argument("--journal", action="store_true",
+                        help="Checkpoint a single-query or --pmids run, so it can be resumed with --resume after a crash")
+    parser.add_argument("--resume", metavar="RUN_ID",
+                        help="Resume an interrupted --journal run: skip the search and every chunk it already classified")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Processes that parse downloaded pages and run keyword matching (default: 0, in-process)")
+    parser.add_argument("--gazetteer-seed", metavar="FILE",
+                        help="Add known companies to the gazetteer, one per line as 'Canonical Name | variant | ...'")
+    parser.add_argument("--gazetteer-list", action="store_true",
+                        help="List the gazetteer's seed and learned companies with their confirmations, then exit")
+    parser.add_argument("--gazetteer-remove", metavar="NAME", action="append",
+                        help="Remove a company (canonical name or variant) from the gazetteer and never learn it again; repeatable")
+    parser.add_argument("--no-gazetteer", action="store_true",
+                        help="Do not use or grow the company gazetteer (keyword heuristics only in layer 1)")
+    parser.add_argument("--keyword-only", action="store_true", help="Only use keyword matching; no local model or LLM is loaded")
+    parser.add_argument("--metrics-file", help="Write run metrics (stage timings, request, paper and cache counts) to this file")
+    parser.add_argument("--metrics-format", choices=["json", "prometheus"],
+                        help="Metrics file format (default: prometheus for a .prom file, otherwise JSON)")
 
     args = parser.parse_args()
-
+    gazetteer_mode = (args.gazetteer_list or args.gazetteer_remove) or None
+    if [args.query, args.queries, args.resume, args.serve, args.shard_work, args.shard_merge, gazetteer_mode].count(None) != 6:
+        parser.error("give either a query, --queries FILE, --resume RUN_ID, --serve PORT, --shard-work DIR, "
+                     "--shard-merge DIR, --gazetteer-list or --gazetteer-remove NAME")
+    if args.shard_init and (args.query is None or args.incremental or args.max_results):
+        parser.error("--shard-init needs a query and cannot be combined with --incremental or --max-results")
+    if args.shard_work and (args.max_results or args.pmids or args.incremental or args.file):
+        parser.error("--shard-work cannot be combined with --max-results, --pmids, --incremental or --file")
+    if args.shard_size < 1:
+        parser.error("--shard-size must be at least 1")
+    if args.serve is not None and (args.pmids or args.incremental or args.file):
+        parser.error("--serve cannot be combined with --pmids, --incremental or --file")
+    if args.incremental and args.pmids:
+        parser.error("--incremental cannot be combined with --pmids")
+    if args.queries and (args.pmids or args.incremental):
+        parser.error("--queries cannot be combined with --pmids or --incremental")
+    if args.resume and (args.pmids or args.incremental):
+        parser.error("--resume cannot be combined with --pmids or --incremental")
+    if args.journal and (args.query is None or args.incremental or args.shard_init):
+        parser.error("--journal only applies to single-query and --pmids runs")
+    if (args.journal or args.resume) and args.max_results:
+        parser.error("--journal and --resume cannot be combined with --max-results, which only fetches the first pages")
+    if args.split and not (args.queries and args.file):
+        parser.error("--split requires --queries and --file")
+    if (args.gazetteer_seed or args.gazetteer_list or args.gazetteer_remove) and (args.no_cache or args.no_gazetteer):
+        parser.error("--gazetteer-seed, --gazetteer-list and --gazetteer-remove need the gazetteer, "
+                     "which --no-cache and --no-gazetteer disable")
+    if args.workers < 0:
+        parser.error("--workers must be 0 or more")
+    if args.max_results is not None and args.max_results < 1:
+        parser.error("--max-results must be at least 1")
+    if args.incremental and (args.max_results or args.since or args.until or args.sort):
+        parser.error("--incremental cannot be combined with --max-results, --since, --until or --sort")
+    if args.queries and args.max_results:
+        parser.error("--max-results cannot be combined with --queries")
     DebugUtil.enabled = args.debug
+    metrics.reset()
+    try:
+        run(args)
+    finally:
+        if args.metrics_file:
+            fmt = args.metrics_format or ("prometheus" if args.metrics_file.endswith(".prom") else "json")
+            metrics.write(args.metrics_file, fmt)
+            DebugUtil.debug_print(f"Wrote run metrics to {args.metrics_file}")
+
+def run(args: argparse.Namespace) -> None:
+    """
+    Run the search described by the parsed command-line arguments.
+    """
+
+    # Pipeline stages and backends are imported here, after argument parsing, so that
+    # `-h` and usage errors stay fast and never need GROQ_API_KEY or the network stack
+    from pubmed_papers.pipe.controller import PubMedController
+    from pubmed_papers.pipe.cache import open_cache, open_verdict_cache, MetadataCache, VerdictCache, DEFAULT_CACHE_DIR
+
+    if args.gazetteer_list or args.gazetteer_remove:
+        from pubmed_papers.pipe.gazetteer import Gazetteer
+        gazetteer = Gazetteer(args.cache_dir or DEFAULT_CACHE_DIR)
+        if args.gazetteer_seed:
+            # Seeded first, so the listing shows (and removals apply to) the new entries
+            load_gazetteer_seed(gazetteer, args.gazetteer_seed)
+        for name in args.gazetteer_remove or []:
+            removed = gazetteer.remove(name)
+            print(f"Removed {removed} gazetteer entries for {name!r}", file=sys.stderr)
+        if args.gazetteer_list:
+            print("Company\tVariant\tSource\tConfirmations")
+            for company, variant, source, confirmations in gazetteer.entries():
+                print(f"{company}\t{variant}\t{source}\t{confirmations if source != 'seed' else ''}")
+        gazetteer.close()
+        return
+    if args.shard_merge:
+        from pubmed_papers.pipe.shard import ShardQueue
+        papers = ShardQueue(args.shard_merge).results()
+        if args.file:
+            save_results(papers, args.file, args.format)
+        else:
+            print_readable(papers)
+        return
+    if args.shard_init:
+        from pubmed_papers.pipe.shard import ShardQueue
+        controller = PubMedController(since=args.since, until=args.until, sort=args.sort)
+        pmids = [p.strip() for p in args.query.split(",") if p.strip()] if args.pmids else controller.search(args.query)
+        shards = ShardQueue(args.shard_init).create(args.query, pmids, args.shard_size)
+        print(f"Split {len(pmids)} PMIDs into {shards} shards in {args.shard_init}", file=sys.stderr)
+        return
+
+    # Journaled runs can be resumed after a crash
+    journal = None
+    if args.journal or args.resume:
+        from pubmed_papers.pipe.journal import open_journal
+        journal = open_journal(os.path.join(args.cache_dir or DEFAULT_CACHE_DIR, "runs"), args.resume)
+    if journal is not None:
+        if args.resume:
+            args.query = journal.get("query")
+            args.pmids = journal.get("mode") == "pmids"
+        else:
+            journal.set("query", args.query)
+            journal.set("mode", "pmids" if args.pmids else "query")
+        DebugUtil.debug_print(f"Run ID: {journal.run_id} (journal in {journal.directory})")
 
-    DebugUtil.debug_print(f"Query: {args.query}")
+    if args.query or args.queries:
+        DebugUtil.debug_print(f"Query: {args.query}" if args.query else f"Queries file: {args.queries}")
     if args.file:
         DebugUtil.debug_print(f"Will write to file: {args.file}")
 
     # Initialize the PubMed controller with the query
-    controller = PubMedController()
-    papers: List[Dict[str, Any]] = controller.results(args.query)
-    if papers is None:
-        papers = []
-
-    # Save as CSV if requested
-    if args.file and args.file.endswith('.csv'):
-        save_results_csv(papers, args.file)
-        DebugUtil.debug_print(f"Saved results to {args.file}")
-    else:
-        # Save as JSON or print human-readable summary to console
-        if args.file:
-            result = json.dumps(papers, indent=2)
-            try:
-                with open(args.file, 'w', encoding='utf-8') as f:
-                    f.write(result)
-                DebugUtil.debug_print(f"Saved results to {args.file}")
-            except Exception as e:
-                DebugUtil.debug_print(f"Error saving to file: {e}", error=True)
-                sys.exit(1)
+    cache = None if args.no_cache else open_cache(args.cache_dir)
+    verdict_cache = None if args.no_cache else open_verdict_cache(args.cache_dir)
+    if journal is not None and args.no_cache:
+        # Without the shared caches, the run's own directory checkpoints its metadata and LLM verdicts
+        cache = MetadataCache(journal.directory, ttl=float("inf"))
+        verdict_cache = VerdictCache(journal.directory, ttl=float("inf"))
+    if not (args.no_cache or args.no_gazetteer):
+        from pubmed_papers.pipe.gazetteer import open_gazetteer
+        from pubmed_papers.pipe.classify import set_gazetteer
+        gazetteer = open_gazetteer(args.cache_dir or DEFAULT_CACHE_DIR)
+        if gazetteer is not None and args.gazetteer_seed:
+            load_gazetteer_seed(gazetteer, args.gazetteer_seed)
+        set_gazetteer(gazetteer)
+    backends = []
+    if args.local_model and not args.keyword_only:
+        from pubmed_papers.pipe.localmodel import LocalModelBackend
+        backends.append(LocalModelBackend(args.local_model, threads=args.threads))
+    if not (args.offline or args.keyword_only):
+        from pubmed_papers.pipe.classify import GroqBackend
+        backends.append(GroqBackend(verdict_cache))
+    with PubMedController(cache=cache, verdict_cache=verdict_cache, backends=backends, workers=args.workers,
+                          max_results=args.max_results, since=args.since, until=args.until,
+                          sort=args.sort) as controller:
+        if args.serve is not None:
+            # One warm controller (sessions, matchers, LLM client, caches) for every request
+            from pubmed_papers.pipe.service import serve
+            serve(controller, args.host, args.serve, args.result_ttl)
+            return
+        if args.shard_work:
+            # Each worker process uses the NCBI_API_KEY and GROQ_API_KEY of its own environment,
+            # so nodes with separate credentials get separate rate limits
+            from pubmed_papers.pipe.shard import ShardQueue, work
+            completed = work(ShardQueue(args.shard_work), controller)
+            print(f"Processed {completed} shards", file=sys.stderr)
+            return
+        if args.queries:
+            queries = read_queries(args.queries)
+            DebugUtil.debug_print(f"Running {len(queries)} queries")
+            papers: Iterable[Mapping] = (
+                as_paper(paper).with_query(query) for query, paper in controller.stream_many(queries)
+            )
+            if args.split:
+                # One open writer per query; each paper goes straight to its query's file
+                with ExitStack() as stack:
+                    writers = {}
+                    for index, query in enumerate(queries, start=1):
+                        writers[query] = stack.enter_context(open_writer(split_filename(args.file, index), args.format))
+                    for paper in papers:
+                        writers[paper.query].write(paper.with_query(None))
+                DebugUtil.debug_print(f"Saved results for {len(queries)} queries")
+                return
+        elif journal is not None:
+            pmids = [p.strip() for p in args.query.split(",") if p.strip()] if args.pmids else None
+            papers = controller.stream_journaled(journal, query=args.query, pmids=pmids)
+        elif args.pmids:
+            pmids = [p.strip() for p in args.query.split(",") if p.strip()]
+            papers = controller.stream_for_pmids(pmids)
+        elif args.incremental:
+            from pubmed_papers.pipe.watermark import open_watermarks
+            watermarks = open_watermarks(args.cache_dir or DEFAULT_CACHE_DIR)
+            if watermarks is None:
+                DebugUtil.debug_print("Cannot run incrementally without a watermark store", error=True)
+            papers = controller.stream_incremental(args.query, watermarks)
         else:
-            print_readable(papers)
+            papers = controller.stream(args.query)
+
+        # Save as CSV or JSON, or print human-readable summary to console
+        try:
+            if args.file:
+                save_results(papers, args.file, args.format, append=args.incremental, query_column=bool(args.queries))
+            else:
+                print_readable(papers)
+        except BaseException:
+            if journal is not None and journal.pmids() is None:
+                # Failed before anything was checkpointed (e.g. in the search): nothing to resume
+                journal.remove()
+            elif journal is not None:
+                journal.close()
+                print(f"Run interrupted; continue it with --resume {journal.run_id}", file=sys.stderr)
+            raise
+        if journal is not None:
+            # A finished run needs no checkpoints
+            if args.no_cache:
+                cache.close()
+                verdict_cache.close()
+            journal.remove()
 
 if __name__ == "__main__":
     main()
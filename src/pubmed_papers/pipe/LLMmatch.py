@@ -2,15 +2,52 @@ import os
 import time
 import re
 import json
-from typing import List, Dict
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Optional, Any
 from tqdm import tqdm
-from groq import Groq
+from groq import Groq, APIStatusError, APIConnectionError
+from pubmed_papers.pipe.cache import VerdictCache
+from pubmed_papers.pipe.metrics import metrics
+from pubmed_papers.pipe.ratelimit import TokenBucket
 from pubmed_papers.utils import DebugUtil
 
-GROQ_API_KEY = os.environ.get("GROQ_API_KEY")
-if not GROQ_API_KEY:
-    raise RuntimeError("GROQ_API_KEY environment variable not set")
-client = Groq(api_key=GROQ_API_KEY)
+_client: Optional[Groq] = None
+_client_lock = threading.Lock()
+
+def get_client() -> Groq:
+    """
+    The shared Groq client, created on first use so that importing this module
+    (or running without the LLM layer) does not require GROQ_API_KEY.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            api_key = os.environ.get("GROQ_API_KEY")
+            if not api_key:
+                raise RuntimeError("GROQ_API_KEY environment variable not set")
+            # Retries are handled by the scheduler below, which also honors the rate limiters
+            _client = Groq(api_key=api_key, max_retries=0)
+        return _client
+
+# Account limits; defaults match the Groq free tier for the model
+GROQ_RPM = int(os.environ.get("GROQ_RPM", "30"))
+GROQ_TPM = int(os.environ.get("GROQ_TPM", "6000"))
+MAX_WORKERS = int(os.environ.get("GROQ_MAX_WORKERS", "4"))
+
+# Budget for one request's input (affiliations only, the system prompt is added on top)
+MAX_BATCH_TOKENS = 1500
+# Output budget: room for the model's reasoning plus a short JSON item per affiliation
+OUTPUT_BASE_TOKENS = 1024
+OUTPUT_TOKENS_PER_ITEM = 24
+MAX_OUTPUT_TOKENS = 4000
+# Typical reasoning length, reserved against the TPM limit until the reply reports its usage
+EXPECTED_OUTPUT_BASE_TOKENS = 256
+MAX_RETRIES = 5
+
+request_limiter = TokenBucket(GROQ_RPM / 60.0)
+token_limiter = TokenBucket(GROQ_TPM / 60.0, capacity=GROQ_TPM)
 
 def extract_first_email(text: str) -> str:
     """
@@ -19,82 +56,223 @@ def extract_first_email(text: str) -> str:
     emails = re.findall(r'[\w\.-]+@[\w\.-]+', text)
     return emails[0] if emails else "none"
 
-def filter_industry_papers_llama3(papers: List[Dict]) -> List[Dict]:
-    """
-    Sends all paper metadata to LLM in batches.
-    Returns only papers with at least one industry-matched author,
-    with authors structured as {"name": ..., "affiliation": {"company": ..., "email": ...}}
-    """
-    DebugUtil.debug_print(f"Total papers received: {len(papers)}")
-    batch_size = 10  # adjust as needed to stay within token/request limits
-
-    matched_papers: List[Dict] = []
-    for i in tqdm(range(0, len(papers), batch_size), desc="Classifying papers"):
-        batch = papers[i:i+batch_size]
-        # Prepare prompt
-        system_prompt = (
-            "You are an expert in biomedical research and precise data extraction. "
-            "Your primary goal is to identify and extract details of 'industry-oriented' authors from scientific papers. "
-            "Industry-oriented affiliations explicitly include: biotech firms, pharmaceutical corporations, contract research organizations (CROs), and any other private companies. "
-            "Academic institutions (universities, colleges, university hospitals, academic research institutes) and government research centers/agencies are NOT considered industry-oriented."
-            "\n\nFor each paper provided in the 'INPUT PAPERS' section, perform the following steps:"
-            "\n1. Analyze all authors and their affiliations."
-            "\n2. Identify authors whose affiliations are 'industry-oriented' as defined above."
-            "\n3. For each identified industry-oriented author, extract their full name."
-            "\n4. From their affiliation text, accurately extract ONLY the most prominent company or institution name. Prioritize names that clearly indicate a private company, typically found between commas. If an affiliation lists multiple entities, focus on the core industry name."
-            "\n5. Extract the *first* valid email address associated with *that specific author's* affiliation if present. If no email is found, use 'none'."
-            "\n\n'OUTPUT JSON FORMAT':"
-            "\nReturn a JSON list. Each item in the list must represent a paper that contains at least one industry-oriented author. Papers with no industry-oriented authors MUST be omitted."
-            "\nEach paper object in the JSON list must have the following structure:"
-            "\n{"
-            "\n  \"pubmed_id\": \"<Unique identifier for the paper>\","
-            "\n  \"title\": \"<Title of the paper>\","
-            "\n  \"publication_date\": \"<Date the paper was published> (YYYY-MM-DD format preferred)\","
-            "\n  \"authors\": ["
-            "\n    {"
-            "\n      \"name\": \"<Full name of the industry-oriented author>\","
-            "\n      \"affiliation\": {"
-            "\n        \"company\": \"<Extracted industry company name or 'none' if not applicable>\","
-            "\n        \"email\": \"<Extracted email address or 'none'>\""
-            "\n      }"
-            "\n    },"
-            "\n    // ... other industry-oriented authors from the same paper"
-            "\n  ]"
-            "\n}"
-            "\n\nConstraints:"
-            "\n- Ensure the output is valid, strictly-formed JSON."
-            "\n- Do not include any conversational text or explanations outside the JSON."
-            "\n- For 'publication_date', provide it in 'YYYY-MM-DD' format if possible from the input."
-            "\n- If an author is industry-oriented, but no specific company name can be extracted, use 'none' for 'company'."
-            "\n- The 'authors' list for each paper in the output should ONLY contain industry-oriented authors."
-            "\n- Emails should be valid email formats. If only partially captured, aim for the full valid email."
-        )
-        user_content = json.dumps(batch, ensure_ascii=False, indent=2)
+SYSTEM_PROMPT = (
+    "You are an expert in biomedical research and precise data extraction. "
+    "Your primary goal is to identify 'industry-oriented' author affiliations from scientific papers. "
+    "Industry-oriented affiliations explicitly include: biotech firms, pharmaceutical corporations, contract research organizations (CROs), and any other private companies. "
+    "Academic institutions (universities, colleges, university hospitals, academic research institutes) and government research centers/agencies are NOT considered industry-oriented."
+    "\n\nINPUT FORMAT: one affiliation per line, as '<id><TAB><affiliation text>'."
+    "\n\nFor each affiliation, perform the following steps:"
+    "\n1. Decide whether the affiliation is 'industry-oriented' as defined above."
+    "\n2. For each industry-oriented affiliation, accurately extract ONLY the most prominent company or institution name. Prioritize names that clearly indicate a private company, typically found between commas. If an affiliation lists multiple entities, focus on the core industry name."
+    "\n3. Extract the *first* valid email address found in that affiliation if present. If no email is found, use 'none'."
+    "\n\n'OUTPUT JSON FORMAT':"
+    "\nReturn a compact JSON list with one item per industry-oriented affiliation: [<id>, \"<company>\", \"<email>\"]."
+    "\nAffiliations that are not industry-oriented MUST be omitted. Example: [[3,\"Pfizer Inc.\",\"none\"],[7,\"Genentech\",\"jdoe@gene.com\"]]"
+    "\n\nConstraints:"
+    "\n- Ensure the output is valid, strictly-formed JSON."
+    "\n- Do not include any conversational text or explanations outside the JSON."
+    "\n- If an affiliation is industry-oriented, but no specific company name can be extracted, use 'none' for 'company'."
+    "\n- Emails should be valid email formats. If only partially captured, aim for the full valid email."
+)
+
+MODEL = "deepseek-r1-distill-llama-70b"
+
+# Derived from the prompt text, so editing the prompt invalidates cached verdicts
+PROMPT_VERSION = hashlib.sha256(SYSTEM_PROMPT.encode("utf-8")).hexdigest()[:12]
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count (about four characters per token), good enough for budgeting.
+    """
+    return len(text) // 4 + 1
+
+SYSTEM_PROMPT_TOKENS = estimate_tokens(SYSTEM_PROMPT)
+
+def serialize_batch(batch: List[Dict[str, Any]]) -> str:
+    """
+    Compact, indentation-free payload: one '<id>\\t<affiliation>' line per affiliation.
+    """
+    return "\n".join(f"{item['id']}\t{' '.join(item['affiliation'].split())}" for item in batch)
+
+def pack_batches(items: List[Dict[str, Any]], max_tokens: int = MAX_BATCH_TOKENS) -> List[List[Dict[str, Any]]]:
+    """
+    Greedily pack items into batches whose serialized size stays under `max_tokens`.
+    An item larger than the budget gets a batch of its own.
+    """
+    batches: List[List[Dict[str, Any]]] = []
+    batch: List[Dict[str, Any]] = []
+    used = 0
+    for item in items:
+        cost = estimate_tokens(serialize_batch([item]))
+        if batch and used + cost > max_tokens:
+            batches.append(batch)
+            batch, used = [], 0
+        batch.append(item)
+        used += cost
+    if batch:
+        batches.append(batch)
+    return batches
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, APIConnectionError):
+        return True
+    return isinstance(error, APIStatusError) and (error.status_code == 429 or error.status_code >= 500)
+
+def _retry_delay(error: Exception, attempt: int) -> float:
+    """
+    Use the server's Retry-After when given, otherwise exponential backoff.
+    """
+    response = getattr(error, "response", None)
+    if response is not None:
+        try:
+            return max(0.0, float(response.headers.get("retry-after")))
+        except (TypeError, ValueError):
+            pass
+    return 2.0 ** attempt
+
+def _complete(user_content: str, items: int) -> str:
+    """
+    One chat completion under the request/token limiters, retrying 429/5xx and connection errors.
+    The token limiter is charged the estimated prompt plus the expected (not the maximum)
+    completion, and settled against the usage the reply reports.
+    """
+    max_tokens = min(MAX_OUTPUT_TOKENS, OUTPUT_BASE_TOKENS + OUTPUT_TOKENS_PER_ITEM * items)
+    expected_output = min(max_tokens, EXPECTED_OUTPUT_BASE_TOKENS + OUTPUT_TOKENS_PER_ITEM * items)
+    budget = min(token_limiter.capacity, SYSTEM_PROMPT_TOKENS + estimate_tokens(user_content) + expected_output)
+
+    for attempt in range(MAX_RETRIES + 1):
+        with metrics.timer("llm_wait"):
+            request_limiter.acquire()
+            token_limiter.acquire(budget)
         try:
-            response = client.chat.completions.create(
-                model="deepseek-r1-distill-llama-70b",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_content}
-                ],
-                max_tokens=4000,
-                temperature=0
-            )
-            raw = response.choices[0].message.content
-
-            # Uncommed only if you want to debug the raw response
-            # DebugUtil.debug_print(f"LLM batch response: {raw}")
+            metrics.incr("llm.requests")
+            with metrics.timer("llm"):
+                response = get_client().chat.completions.create(
+                    model=MODEL,
+                    messages=[
+                        {"role": "system", "content": SYSTEM_PROMPT},
+                        {"role": "user", "content": user_content}
+                    ],
+                    max_tokens=max_tokens,
+                    temperature=0
+                )
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                metrics.incr("llm.tokens_in", getattr(usage, "prompt_tokens", 0) or 0)
+                metrics.incr("llm.tokens_out", getattr(usage, "completion_tokens", 0) or 0)
+                total = getattr(usage, "total_tokens", None)
+                if total is not None:
+                    token_limiter.settle(budget, total)
+            return response.choices[0].message.content
+        except Exception as e:
+            if not _is_retryable(e) or attempt == MAX_RETRIES:
+                metrics.incr("llm.errors")
+                raise
+            metrics.incr("llm.retries")
+            delay = _retry_delay(e, attempt)
+            DebugUtil.debug_print(f"LLM request failed ({e}), retrying in {delay:.1f}s")
+            if isinstance(e, APIStatusError) and e.status_code == 429:
+                # Throttled: hold back every worker, not just this one
+                request_limiter.pause(delay)
+            else:
+                time.sleep(delay)
+
+def _parse_verdicts(raw: str, batch: List[Dict[str, Any]]) -> Dict[int, Optional[Dict[str, str]]]:
+    """
+    Parse an LLM reply of [id, company, email] items into {id: {"company", "email"}} for
+    every id in the batch; ids the model omitted were judged academic and map to None.
+    Raises ValueError on malformed JSON.
+    """
+    match = re.search(r'\[.*\]', raw or "", re.DOTALL)
+    if match is None:
+        raise ValueError("no JSON list in LLM response")
+    results = json.loads(match.group(0))
+    verdicts: Dict[int, Optional[Dict[str, str]]] = {item["id"]: None for item in batch}
+    for item in results:
+        idx = int(item[0])
+        if idx in verdicts:
+            verdicts[idx] = {
+                "company": str(item[1]) if len(item) > 1 else "none",
+                "email": str(item[2]) if len(item) > 2 else "none"
+            }
+    return verdicts
+
+def _classify_batch(batch: List[Dict[str, Any]]) -> Dict[int, Optional[Dict[str, str]]]:
+    """
+    Classify one batch. If the reply is not valid JSON, split the batch in half and
+    retry each half, so one bad reply costs at most a single affiliation.
+    Affiliations that still cannot be parsed are left out of the result.
+    """
+    user_content = serialize_batch(batch)
+    raw = _complete(user_content, len(batch))
+
+    # Uncommed only if you want to debug the raw response
+    # DebugUtil.debug_print(f"LLM batch response: {raw}")
+    try:
+        return _parse_verdicts(raw, batch)
+    except Exception as e:
+        if len(batch) == 1:
+            DebugUtil.debug_print(f"Failed to parse LLM response for affiliation {batch[0]['id']}: {e}")
+            return {}
+        DebugUtil.debug_print(f"Failed to parse LLM response for {len(batch)} affiliations, splitting: {e}")
+        metrics.incr("llm.split_batches")
+        half = len(batch) // 2
+        verdicts = _classify_batch(batch[:half])
+        verdicts.update(_classify_batch(batch[half:]))
+        return verdicts
+
+def classify_affiliations(affiliations: List[str], cache: Optional[VerdictCache] = None) -> Dict[int, Optional[Dict[str, str]]]:
+    """
+    Sends unique affiliation strings to the LLM.
+    Returns {index into `affiliations`: verdict} for the affiliations the model decided:
+    {"company": ..., "email": ...} for industry-oriented ones, None for academic ones.
+    Affiliations whose reply could not be parsed are left out, so they can be retried.
+    With a `cache`, previously classified affiliations are answered from disk and
+    only the rest are sent to the LLM.
+    Batches are packed by estimated tokens and run concurrently under the account's
+    requests-per-minute and tokens-per-minute limits.
+    """
+    DebugUtil.debug_print(f"Total affiliations received: {len(affiliations)}")
+    verdicts: Dict[int, Optional[Dict[str, str]]] = {}
+
+    pending = list(range(len(affiliations)))
+    if cache is not None:
+        keys = [VerdictCache.fingerprint(aff, MODEL, PROMPT_VERSION) for aff in affiliations]
+        cached = cache.get_many(keys)
+        pending = [idx for idx in pending if keys[idx] not in cached]
+        for idx, key in enumerate(keys):
+            verdict = cached.get(key)
+            if verdict is not None:
+                verdicts[idx] = {"company": verdict["company"], "email": verdict["email"]} if verdict["industry"] else None
+        DebugUtil.debug_print(f"LLM verdict cache: {len(affiliations) - len(pending)} hits, {len(pending)} misses")
+
+    batches = pack_batches([{"id": idx, "affiliation": affiliations[idx]} for idx in pending])
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = [executor.submit(_classify_batch, batch) for batch in batches]
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Classifying affiliations"):
             try:
-                json_str = re.search(r'\[.*\]', raw, re.DOTALL).group(0)
-                results = json.loads(json_str)
-                matched_papers.extend(results)
+                batch_verdicts = future.result()
             except Exception as e:
-                DebugUtil.debug_print(f"Failed to parse LLM response: {e}", error=True)
+                DebugUtil.debug_print(f"Error during LLM API call: {e}", error=True)
                 continue
-        except Exception as e:
-            DebugUtil.debug_print(f"Error during LLM API call: {e}", error=True)
-            continue
-        time.sleep(3)  # Throttle to stay under 30 requests/min
+            verdicts.update(batch_verdicts)
+            if cache is not None:
+                # Academic verdicts are cached too, so they are not asked again
+                cache.put_many(
+                    (keys[idx], {"industry": v is not None, **(v or {"company": "none", "email": "none"})})
+                    for idx, v in batch_verdicts.items()
+                )
+
+    DebugUtil.debug_print(
+        f"Total industry affiliations: {sum(1 for v in verdicts.values() if v)}, "
+        f"undecided: {len(affiliations) - len(verdicts)}"
+    )
+    return verdicts
 
-    DebugUtil.debug_print(f"Total matched papers: {len(matched_papers)}")
-    return matched_papers
\ No newline at end of file
+def classify_affiliations_llama3(affiliations: List[str], cache: Optional[VerdictCache] = None) -> Dict[int, Dict[str, str]]:
+    """
+    Like `classify_affiliations`, but returns only the industry-oriented affiliations:
+    {index into `affiliations`: {"company": ..., "email": ...}}.
+    """
+    return {idx: v for idx, v in classify_affiliations(affiliations, cache).items() if v is not None}
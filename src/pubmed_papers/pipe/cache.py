@@ -0,0 +1,190 @@
+# src/pubmed_papers/pipe/cache.py
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Dict, Any, Iterable, Mapping, Optional, Tuple
+from pubmed_papers.pipe.metrics import metrics
+from pubmed_papers.pipe.records import Paper, as_dict
+from pubmed_papers.utils import DebugUtil
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "pubmed_papers")
+
+# SQLite caps the number of bound parameters per statement
+_SQL_CHUNK = 500
+
+# Expired and surplus entries are evicted once per this fraction of `max_entries` written
+_EVICT_FRACTION = 100
+
+class _SQLiteCache:
+    """
+    Persistent key -> JSON value store backed by one SQLite file.
+    Entries expire `ttl` seconds after they were written; when more than `max_entries`
+    are stored, the least recently used ones are evicted. Eviction runs when the cache is
+    opened and then after every `max_entries / 100` writes, not on each write, so the
+    store may briefly hold up to 1% more entries.
+    """
+    name: str = "cache"
+
+    def __init__(self, cache_dir: str, ttl: float, max_entries: int) -> None:
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path: str = os.path.join(cache_dir, f"{self.name}.sqlite3")
+        self.ttl: float = ttl
+        self.max_entries: int = max_entries
+        self.hits: int = 0
+        self.misses: int = 0
+        self._lock = threading.Lock()
+        # The pipeline reads and writes the cache from its worker threads
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.name} ("
+            "key TEXT PRIMARY KEY, data TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {self.name}_accessed ON {self.name} (accessed)")
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {self.name}_created ON {self.name} (created)")
+        self._evict_every: int = max(1, max_entries // _EVICT_FRACTION)
+        self._written: int = 0
+        self._evict()
+        self._conn.commit()
+
+    def _get(self, keys: List[str]) -> Dict[str, Any]:
+        """
+        Look up `keys`. Returns only the hits; expired entries count as misses.
+        """
+        now = time.time()
+        found: Dict[str, Any] = {}
+        with self._lock:
+            for i in range(0, len(keys), _SQL_CHUNK):
+                chunk = keys[i:i + _SQL_CHUNK]
+                marks = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, data FROM {self.name} WHERE key IN ({marks}) AND created >= ?",
+                    (*chunk, now - self.ttl)
+                ).fetchall()
+                for key, data in rows:
+                    found[key] = json.loads(data)
+                if rows:
+                    self._conn.executemany(
+                        f"UPDATE {self.name} SET accessed = ? WHERE key = ?",
+                        [(now, key) for key, _ in rows]
+                    )
+            self._conn.commit()
+            hits, misses = len(found), len(set(keys)) - len(found)
+            self.hits += hits
+            self.misses += misses
+        metrics.incr(f"cache.{self.name}.hits", hits)
+        metrics.incr(f"cache.{self.name}.misses", misses)
+        return found
+
+    def _put(self, items: Iterable[Tuple[str, Any]]) -> None:
+        """
+        Store values, replacing older copies; enforce the size bound every `_evict_every` writes.
+        """
+        now = time.time()
+        rows = [
+            (key, json.dumps(value, ensure_ascii=False, separators=(",", ":")), now, now)
+            for key, value in items
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(f"INSERT OR REPLACE INTO {self.name} VALUES (?, ?, ?, ?)", rows)
+            self._written += len(rows)
+            if self._written >= self._evict_every:
+                self._evict()
+                self._written = 0
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """
+        Drop expired entries, then the least recently used ones beyond `max_entries`.
+        """
+        self._conn.execute(f"DELETE FROM {self.name} WHERE created < ?", (time.time() - self.ttl,))
+        (count,) = self._conn.execute(f"SELECT COUNT(*) FROM {self.name}").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                f"DELETE FROM {self.name} WHERE key IN (SELECT key FROM {self.name} ORDER BY accessed LIMIT ?)",
+                (excess,)
+            )
+            DebugUtil.debug_print(f"{self.name} cache: evicted {excess} least recently used entries")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+class MetadataCache(_SQLiteCache):
+    """
+    PMID -> parsed Paper records, stored as {pubmed_id, title, publication_date, authors} JSON.
+    """
+    name = "metadata"
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, ttl: float = 30 * 24 * 3600,
+                 max_entries: int = 500_000) -> None:
+        super().__init__(cache_dir, ttl, max_entries)
+
+    def get_many(self, pmids: List[str]) -> Dict[str, Paper]:
+        """
+        Look up cached records for `pmids`. Returns only the hits, keyed by PMID.
+        """
+        return {pmid: Paper.from_dict(data) for pmid, data in self._get(pmids).items()}
+
+    def put_many(self, records: Iterable[Mapping]) -> None:
+        """
+        Store parsed metadata records keyed by their PMID.
+        """
+        self._put((r["pubmed_id"], as_dict(r)) for r in records if r.get("pubmed_id"))
+
+class VerdictCache(_SQLiteCache):
+    """
+    LLM affiliation verdicts keyed by a fingerprint of the normalized affiliation text,
+    the model and the prompt version. Changing any of them yields new keys, so stale
+    verdicts are never served and simply age out.
+    Values are {"industry": bool, "company": ..., "email": ...}.
+    """
+    name = "verdicts"
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, ttl: float = 180 * 24 * 3600,
+                 max_entries: int = 1_000_000) -> None:
+        super().__init__(cache_dir, ttl, max_entries)
+
+    @staticmethod
+    def fingerprint(affiliation: str, model: str, prompt_version: str) -> str:
+        normalized = " ".join(affiliation.split()).lower()
+        return hashlib.sha256(f"{prompt_version}\0{model}\0{normalized}".encode("utf-8")).hexdigest()
+
+    def get_many(self, fingerprints: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Look up cached verdicts. Returns only the hits, keyed by fingerprint.
+        """
+        return self._get(fingerprints)
+
+    def put_many(self, verdicts: Iterable[Tuple[str, Dict[str, Any]]]) -> None:
+        """
+        Store (fingerprint, verdict) pairs.
+        """
+        self._put(verdicts)
+
+def open_cache(cache_dir: Optional[str] = None) -> Optional[MetadataCache]:
+    """
+    Open the metadata cache, or return None (caching disabled) if it cannot be opened.
+    """
+    try:
+        return MetadataCache(cache_dir or DEFAULT_CACHE_DIR)
+    except (OSError, sqlite3.Error) as e:
+        DebugUtil.debug_print(f"Metadata cache disabled: {e}")
+        return None
+
+def open_verdict_cache(cache_dir: Optional[str] = None) -> Optional[VerdictCache]:
+    """
+    Open the LLM verdict cache, or return None (caching disabled) if it cannot be opened.
+    """
+    try:
+        return VerdictCache(cache_dir or DEFAULT_CACHE_DIR)
+    except (OSError, sqlite3.Error) as e:
+        DebugUtil.debug_print(f"Verdict cache disabled: {e}")
+        return None
@@ -1,36 +1,182 @@
 # src/pubmed_papers/pipe/classify.py
 
+from abc import ABC, abstractmethod
 from pubmed_papers.pipe.keymatch import KeyMatch
-from pubmed_papers.pipe.LLMmatch import filter_industry_papers_llama3
-from typing import List, Dict, Any
+from pubmed_papers.pipe.cache import VerdictCache
+from pubmed_papers.pipe.gazetteer import Gazetteer
+from pubmed_papers.pipe.metrics import metrics
+from pubmed_papers.pipe.records import Paper, Author, Verdict, as_paper
+from functools import lru_cache
+from typing import List, Dict, Mapping, Optional
 from pubmed_papers.utils import DebugUtil
 
-def filter_biotech_papers(papers: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+_keymatch = KeyMatch()
+
+@lru_cache(maxsize=100_000)
+def _keyword_verdict(affiliation: str) -> Optional[Verdict]:
+    """
+    Memoized layer-1 verdict, shared across calls (and pipeline chunks).
+    """
+    return Verdict.of(_keymatch.classify_affiliation(affiliation))
+
+def set_gazetteer(gazetteer: Optional[Gazetteer]) -> None:
+    """
+    Make layer 1 consult `gazetteer` (None: keyword heuristics only) and teach it the
+    companies confirmed by layer 2.
+    """
+    _keymatch.gazetteer = gazetteer
+    _keyword_verdict.cache_clear()
+
+class ClassifierBackend(ABC):
+    """
+    Second-layer classifier interface. Backends are chained: each one receives the
+    affiliations its predecessors left undecided.
+    """
+    name: str = "backend"
+    # True if the backend's company names are reliable enough to teach the gazetteer
+    names_companies: bool = False
+
+    @abstractmethod
+    def classify(self, affiliations: List[str]) -> Dict[int, Optional[Dict[str, str]]]:
+        """
+        Classify affiliations, returning {index: verdict} for the ones this backend is
+        confident about: {"company": ..., "email": ...} for industry, None for academic.
+        Indices left out are passed on to the next backend.
+        """
+
+class GroqBackend(ClassifierBackend):
+    """
+    Remote LLM backend (Groq). Decides every affiliation whose reply it can parse;
+    the others are left to the next backend (or a later run).
+    """
+    name = "groq"
+    names_companies = True
+
+    def __init__(self, cache: Optional[VerdictCache] = None) -> None:
+        self.cache: Optional[VerdictCache] = cache
+
+    def classify(self, affiliations: List[str]) -> Dict[int, Optional[Dict[str, str]]]:
+        # Imported on use: the Groq client needs GROQ_API_KEY, which offline runs do not have
+        from pubmed_papers.pipe.LLMmatch import classify_affiliations
+        return classify_affiliations(affiliations, cache=self.cache)
+
+def normalize_affiliation(affiliation: str) -> str:
+    """
+    Normalize an affiliation for deduplication: collapse whitespace and ignore case.
+    """
+    return " ".join(affiliation.split()).lower()
+
+def filter_biotech_papers(papers: List[Mapping], verdict_cache: Optional[VerdictCache] = None,
+                          backends: Optional[List[ClassifierBackend]] = None,
+                          keyword_verdicts: Optional[Dict[str, Optional[Verdict]]] = None) -> List[Paper]:
     """
     Filter papers for biotech/pharma industry affiliations using two layers:
     1. KeyMatch for fast keyword-based filtering.
-    2. LLM-based filtering for unmatched papers.
-    Returns a list of matched papers.
+    2. The classifier `backends` (default: Groq LLM) for papers with no keyword match,
+       after triage drops affiliations that are already known to be academic.
+    Each unique (normalized) affiliation is classified once and the verdict is
+    mapped back onto every author that shares it. LLM verdicts are served from
+    `verdict_cache` when available. `keyword_verdicts` holds layer-1 verdicts already
+    computed elsewhere (e.g. by parsing workers), keyed by normalized affiliation.
+    Returns the matched papers, each with only its industry authors; authors sharing
+    an affiliation share one Verdict. A paper matched by layer 1 keeps its layer-1 authors,
+    so its output does not depend on which other papers share the call.
     """
-    keymatch = KeyMatch()
+    papers = [as_paper(paper) for paper in papers]
+    # Index of unique affiliations: normalized key -> first original spelling seen
+    index: Dict[str, str] = {}
+    for paper in papers:
+        for author in paper.authors:
+            key = normalize_affiliation(author.affiliation)
+            if key:
+                index.setdefault(key, author.affiliation)
+
+    verdicts: Dict[str, Optional[Verdict]] = {}
+    metrics.incr("affiliations.unique", len(index))
     try:
-        # Layer 1: Fast keyword-based matching
-        matched, un_matched = keymatch.get_filter(papers)
-        DebugUtil.debug_print(f"Layer 1 matched: {len(matched)}, unmatched: {len(un_matched)}")
+        # Layer 1: Fast keyword-based matching, once per unique affiliation
+        with metrics.timer("keymatch"):
+            for key, affiliation in index.items():
+                if keyword_verdicts is not None and key in keyword_verdicts:
+                    # Precomputed by parsing workers, which have no gazetteer: known companies still win
+                    verdicts[key] = Verdict.of(_keymatch.known_company(affiliation)) or keyword_verdicts[key]
+                else:
+                    verdicts[key] = _keyword_verdict(affiliation)
     except Exception as e:
         DebugUtil.debug_print(f"Error in KeyMatch filtering: {e}", error=True)
         return []
 
-    # If all papers matched in layer 1, return them
-    if not un_matched:
-        return matched
+    # Papers with no keyword-matched author go to layer 2, as before
+    layer1_authors = [_match_authors(paper, verdicts) for paper in papers]
+    un_matched = [paper for paper, authors in zip(papers, layer1_authors) if not authors]
+    metrics.incr("papers.layer1_matched", len(papers) - len(un_matched))
+    DebugUtil.debug_print(
+        f"Layer 1 matched: {len(papers) - len(un_matched)}, unmatched: {len(un_matched)} "
+        f"({len(index)} unique affiliations)"
+    )
 
-    # Layer 2: Use LLM to match remaining papers
-    try:
-        llm_matched = filter_industry_papers_llama3(un_matched)
-        DebugUtil.debug_print(f"Layer 2 LLM matched: {len(llm_matched)}")
-    except Exception as e:
-        DebugUtil.debug_print(f"Error in LLM filtering: {e}", error=True)
-        llm_matched = []
+    # Layer 2: Run the classifier backends on the unique affiliations of the remaining papers
+    pending: List[str] = []
+    seen = set()
+    for paper in un_matched:
+        for author in paper.authors:
+            key = normalize_affiliation(author.affiliation)
+            if key and key not in seen:
+                seen.add(key)
+                pending.append(key)
+    # Triage: affiliations already ruled academic by the exclude keywords cannot be industry,
+    # so they (and papers left with nothing else) never reach layer 2
+    candidates = [key for key in pending if not _keymatch.is_academic(index[key])]
+    metrics.incr("affiliations.triaged_academic", len(pending) - len(candidates))
+    metrics.incr("affiliations.layer2", len(candidates))
+    DebugUtil.debug_print(f"Triage: {len(pending) - len(candidates)} academic affiliations skipped, {len(candidates)} sent to layer 2")
+    pending = candidates
+
+    if backends is None:
+        backends = [GroqBackend(verdict_cache)]
+    for backend in backends:
+        if not pending:
+            break
+        try:
+            with metrics.timer(f"layer2.{backend.name}"):
+                decided = backend.classify([index[key] for key in pending])
+        except Exception as e:
+            DebugUtil.debug_print(f"Error in {backend.name} classification: {e}", error=True)
+        for idx, verdict in decided.items():
+            verdicts[pending[idx]] = Verdict.of(verdict)
+        if backend.names_companies and _keymatch.gazetteer is not None:
+            learned = _keymatch.gazetteer.learn(
+                (index[pending[idx]], verdicts[pending[idx]].company) for idx, verdict in decided.items() if verdict
+            )
+            if learned:
+                # Memoized layer-1 misses may now be gazetteer hits
+                _keyword_verdict.cache_clear()
+                metrics.incr("gazetteer.learned", learned)
+                DebugUtil.debug_print(f"Gazetteer: learned {learned} company names from {backend.name}")
+        industry = sum(1 for verdict in decided.values() if verdict)
+        metrics.incr(f"affiliations.{backend.name}.decided", len(decided))
+        metrics.incr(f"affiliations.{backend.name}.industry", industry)
+        DebugUtil.debug_print(
+            f"Layer 2 {backend.name}: {len(decided)} of {len(pending)} affiliations decided, {industry} industry"
+        )
+        pending = [key for idx, key in enumerate(pending) if idx not in decided]
 
-    return matched + llm_matched
\ No newline at end of file
+    matched: List[Paper] = []
+    for paper, authors in zip(papers, layer1_authors):
+        # Layer-2 verdicts only apply to the papers that went to layer 2
+        authors = authors or _match_authors(paper, verdicts)
+        if authors:
+            matched.append(paper.with_authors(authors))
+    metrics.incr("papers.layer2_matched", len(matched) - (len(papers) - len(un_matched)))
+    return matched
+
+def _match_authors(paper: Paper, verdicts: Dict[str, Optional[Verdict]]) -> List[Author]:
+    """
+    Map affiliation verdicts back onto a paper's authors, keeping the industry ones.
+    """
+    authors: List[Author] = []
+    for author in paper.authors:
+        verdict = verdicts.get(normalize_affiliation(author.affiliation))
+        if verdict:
+            authors.append(Author(author.name, verdict))
+    return authors
@@ -1,43 +1,432 @@
 # src/pubmed_papers/pipe/controller.py
 
-from pubmed_papers.pipe.pupmed import fetch_pmids, fetch_metadata
-from pubmed_papers.pipe.classify import filter_biotech_papers
-from typing import List, Dict, Any
+from pubmed_papers.pipe.pupmed import (
+    fetch_pmids, iter_metadata, search_history, iter_metadata_history,
+    iter_history_pmids, iter_metadata_cached, search_pmids, iter_raw_pages, iter_raw_history_pages
+)
+from pubmed_papers.pipe.cache import MetadataCache, VerdictCache
+from pubmed_papers.pipe.classify import filter_biotech_papers, normalize_affiliation, ClassifierBackend
+from pubmed_papers.pipe.stream import chunked, prefetch
+from pubmed_papers.pipe.watermark import WatermarkStore
+from pubmed_papers.pipe.journal import RunJournal
+from pubmed_papers.pipe.metrics import metrics
+from pubmed_papers.pipe.records import Paper, Verdict, as_dict
+from concurrent.futures import Executor, ThreadPoolExecutor
+import itertools
+import math
+import threading
+import time
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Tuple, Optional
 from pubmed_papers.utils import DebugUtil
 
 class PubMedController:
-    def __init__(self) -> None:
-        self.query: str = ""
+    def __init__(self, chunk_size: int = 200, queue_size: int = 2, cache: Optional[MetadataCache] = None,
+                 verdict_cache: Optional[VerdictCache] = None,
+                 backends: Optional[List[ClassifierBackend]] = None, workers: int = 0,
+                 max_results: Optional[int] = None, since: Optional[str] = None, until: Optional[str] = None,
+                 sort: Optional[str] = None) -> None:
+        # Optional on-disk PMID metadata cache; only misses go to efetch
+        self.cache: Optional[MetadataCache] = cache
+        # Optional on-disk LLM verdict cache; only unseen affiliations go to the LLM
+        self.verdict_cache: Optional[VerdictCache] = verdict_cache
+        # Second-layer classifiers, tried in order; None means the Groq LLM only
+        self.backends: Optional[List[ClassifierBackend]] = backends
+        # Papers classified together; also the unit handed between pipeline stages
+        self.chunk_size: int = chunk_size
+        # Chunks each stage may run ahead of the next one
+        self.queue_size: int = queue_size
+        # Processes that parse efetch pages and run the keyword layer; 0 parses in-process
+        self.workers: int = workers
+        self._pool: Optional[Executor] = None
+        # Concurrent streams (service mode) share the controller; only one may start the pool
+        self._pool_lock = threading.Lock()
+        # Stop fetching and classifying once this many papers matched (None: no limit)
+        self.max_results: Optional[int] = max_results
+        # Publication date window (YYYY[/MM[/DD]]) and sort order, applied by esearch itself
+        self.since: Optional[str] = since
+        self.until: Optional[str] = until
+        self.sort: Optional[str] = sort
+
+    def close(self) -> None:
+        """
+        Shut down the parsing process pool, if one was started.
+        """
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
+
+    def __enter__(self) -> "PubMedController":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def _search_options(self) -> Dict[str, Any]:
+        """
+        esearch options for the date window and sort order; only the ones that were set.
+        """
+        options: Dict[str, Any] = {}
+        if self.since or self.until:
+            options.update(mindate=self.since, maxdate=self.until, datetype="pdat")
+        if self.sort:
+            options["sort"] = self.sort
+        return options
+
+    def _get_pool(self) -> Executor:
+        with self._pool_lock:
+            if self._pool is None:
+                # Imported on use: only process mode needs multiprocessing
+                from pubmed_papers.pipe.parallel import open_pool
+                self._pool = open_pool(self.workers)
+            return self._pool
+
+    def _fetcher(self, verdicts: Dict[str, Optional[Verdict]]) -> Callable[[List[str]], Iterator[Paper]]:
+        """
+        Fetch function for one stream: explicit PMIDs as a flat stream of papers, parsing in
+        the process pool when enabled. The keyword verdicts the workers computed are added to
+        `verdicts` (normalized affiliation -> verdict) before the page's papers are yielded.
+        `verdicts` only keeps the last two calls' verdicts: chunks are cut while the papers are
+        yielded, so older ones are no longer asked for.
+        """
+        previous: Dict[str, Optional[Verdict]] = {}
+
+        def fetch(pmids: List[str]) -> Iterator[Paper]:
+            if not self.workers:
+                return iter_metadata(pmids)
+            return parsed(pmids)
+
+        def parsed(pmids: List[str]) -> Iterator[Paper]:
+            from pubmed_papers.pipe.parallel import iter_parsed_pages
+            current: Dict[str, Optional[Verdict]] = {}
+            verdicts.clear()
+            verdicts.update(previous)
+            for papers, page_verdicts in iter_parsed_pages(iter_raw_pages(pmids), self._get_pool(), 2 * self.workers):
+                current.update(page_verdicts)
+                verdicts.update(page_verdicts)
+                yield from papers
+            previous.clear()
+            previous.update(current)
+        return fetch
 
     def results(self, query: str) -> List[Dict[str, Any]]:
         """
         Fetches PubMed papers for a given query, filters for biotech/pharma affiliations,
-        and returns a list of matched paper dictionaries.
+        and returns a list of matched paper dictionaries (plain, JSON-serializable dicts).
+        """
+        return [as_dict(paper) for paper in self.stream(query)]
+
+    def stream(self, query: str) -> Iterator[Paper]:
+        """
+        Streaming variant of `results`: yields matched papers as soon as their chunk is classified.
+        Papers are `Paper` records, not dicts; they read like dicts, and `to_dict()` converts them.
+        The result set is handed from esearch to efetch through the Entrez History server.
+        """
+        try:
+            # Keep the result set server-side; only WebEnv/query_key come back
+            webenv, query_key, count = search_history(query, **self._search_options())
+            DebugUtil.debug_print(f"Found {count} PMIDs for query: {query}")
+        except Exception as e:
+            DebugUtil.debug_print(f"Error searching PubMed: {e}", error=True)
+            return
+        if not count:
+            DebugUtil.debug_print("No PMIDs found for the query.")
+            return
+
+        if self.cache is not None:
+            # The cache is keyed by PMID, so page the IDs out of the History server first
+            pages = iter_history_pmids(webenv, query_key, count)
+            verdicts: Dict[str, Optional[Verdict]] = {}
+            yield from self._pipeline(iter_metadata_cached(pages, self.cache, fetch=self._fetcher(verdicts)), verdicts)
+        elif self.workers:
+            yield from self._pipeline_pages(iter_raw_history_pages(webenv, query_key, count))
+        else:
+            yield from self._pipeline(iter_metadata_history(webenv, query_key, count))
+
+    def stream_incremental(self, query: str, watermarks: WatermarkStore) -> Iterator[Paper]:
+        """
+        Delta variant of `stream`: only papers added to PubMed since the last completed run
+        of `query` (and not processed by it) are fetched and classified.
+        The first run processes the full history. The watermark advances only once the
+        stream has been consumed to the end, so an interrupted run is simply redone.
+        """
+        run_date = time.strftime("%Y/%m/%d")
+        since = watermarks.last_run(query)
+        try:
+            # The window includes the last run's day: records added after that run are on the
+            # same Entrez date, and the seen-PMID set drops the ones it already processed
+            webenv, query_key, count = search_history(query, mindate=since, maxdate=run_date if since else None)
+            DebugUtil.debug_print(f"Found {count} PMIDs for query: {query} (since {since or 'the beginning'})")
+        except Exception as e:
+            DebugUtil.debug_print(f"Error searching PubMed: {e}", error=True)
+            return
+
+        processed: List[str] = []
+
+        def new_pages() -> Iterator[List[str]]:
+            for page in iter_history_pmids(webenv, query_key, count):
+                page = watermarks.unseen(query, page)
+                processed.extend(page)
+                if page:
+                    yield page
+
+        verdicts: Dict[str, Optional[Verdict]] = {}
+        fetch = self._fetcher(verdicts)
+        if self.cache is not None:
+            metadata: Iterable[Paper] = iter_metadata_cached(new_pages(), self.cache, fetch=fetch)
+        else:
+            metadata = (article for page in new_pages() for article in fetch(page))
+        if count:
+            yield from self._pipeline(metadata, verdicts)
+        DebugUtil.debug_print(f"{len(processed)} new PMIDs processed; watermark moved to {run_date}")
+        watermarks.advance(query, run_date, processed)
+
+    def stream_many(self, queries: List[str], max_workers: int = 4) -> Iterator[Tuple[str, Paper]]:
+        """
+        Batch variant of `stream` for many queries: every esearch runs first, then each
+        unique PMID of their union is fetched and classified once. Matched papers are
+        fanned back out as (query, paper) pairs, one per query that returned the paper.
+        """
+        try:
+            # The searches share the NCBI rate limiter, so running them concurrently is safe
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                options = self._search_options()
+                results = list(pool.map(lambda query: search_pmids(query, **options), queries))
+        except Exception as e:
+            DebugUtil.debug_print(f"Error searching PubMed: {e}", error=True)
+            return
+
+        # PMID -> indices of the queries that returned it, in first-seen order
+        owners: Dict[str, List[int]] = {}
+        for idx, pmids in enumerate(results):
+            DebugUtil.debug_print(f"Found {len(pmids)} PMIDs for query: {queries[idx]}")
+            for pmid in pmids:
+                owners.setdefault(pmid, []).append(idx)
+        total = sum(len(pmids) for pmids in results)
+        DebugUtil.debug_print(f"{len(owners)} unique PMIDs across {len(queries)} queries ({total} in total)")
+        del results
+
+        for paper in self._stream_ids(list(owners)):
+            for idx in owners.get(paper.get("pubmed_id", ""), []):
+                yield queries[idx], paper
+
+    def search(self, query: str) -> List[str]:
+        """
+        All PMIDs esearch returns for `query` under the controller's date window and sort order.
+        """
+        return search_pmids(query, **self._search_options())
+
+    def results_for_pmids(self, pmids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Fetches and filters an explicit list of PMIDs, sending the IDs to efetch directly.
+        Returns plain paper dictionaries, like `results`.
+        """
+        return [as_dict(paper) for paper in self.stream_for_pmids(pmids)]
+
+    def stream_for_pmids(self, pmids: List[str]) -> Iterator[Paper]:
+        """
+        Streaming variant of `results_for_pmids`, yielding `Paper` records.
+        """
+        yield from self._stream_ids(pmids)
+
+    def stream_journaled(self, journal: RunJournal, query: Optional[str] = None,
+                         pmids: Optional[List[str]] = None) -> Iterator[Paper]:
+        """
+        Resumable variant of `stream` (for `query`) and `stream_for_pmids` (for `pmids`).
+        The PMID list and the matches of every classified chunk are checkpointed in `journal`;
+        running again with the same journal replays the finished chunks and continues from
+        the first unfinished one. Parsed metadata and LLM verdicts are checkpointed by
+        `cache` and `verdict_cache`.
+        With `max_results` the run is not journaled: the journal needs the full PMID list up
+        front, while a limited run only pulls the first few pages and has little to checkpoint.
+        """
+        if self.max_results is not None:
+            DebugUtil.debug_print(f"Result limit set: run {journal.run_id} is not journaled")
+            yield from (self.stream_for_pmids(pmids) if pmids is not None else self.stream(query or ""))
+            return
+        query = query or ""
+        saved = journal.pmids()
+        if saved is not None:
+            pmids = saved
+        elif pmids is None:
+            try:
+                webenv, query_key, count = search_history(query, **self._search_options())
+                DebugUtil.debug_print(f"Found {count} PMIDs for query: {query}")
+                pmids = [pmid for page in iter_history_pmids(webenv, query_key, count) for pmid in page]
+            except Exception as e:
+                DebugUtil.debug_print(f"Error searching PubMed: {e}", error=True)
+                return
+        if saved is None:
+            journal.save_pmids(pmids)
+
+        chunks = [pmids[i:i + self.chunk_size] for i in range(0, len(pmids), self.chunk_size)]
+        done = journal.completed(self.chunk_size)
+        DebugUtil.debug_print(
+            f"Run {journal.run_id}: {len(done)} of {len(chunks)} chunks already classified"
+        )
+
+        def load(chunk: List[str]) -> Tuple[List[Paper], Optional[Dict[str, Optional[Verdict]]]]:
+            verdicts: Dict[str, Optional[Verdict]] = {}
+            papers = list(iter_metadata_cached([chunk], self.cache, fetch=self._fetcher(verdicts)))
+            return papers, verdicts or None
+
+        todo = [chunk for index, chunk in enumerate(chunks) if index not in done]
+        pending: Iterable[Tuple[List[Paper], Optional[Dict[str, Optional[Verdict]]]]]
+        if self.cache is not None:
+            pending = (load(chunk) for chunk in todo)
+        elif self.workers:
+            pending = self._parsed_chunks(todo)
+        else:
+            pending = ((list(iter_metadata(chunk)), None) for chunk in todo)
+        classified = prefetch(self._classify_chunks(prefetch(pending, self.queue_size)), self.queue_size)
+        try:
+            for index in range(len(chunks)):
+                if index in done:
+                    matched = done[index]
+                else:
+                    _, matched = next(classified)
+                    journal.complete(index, self.chunk_size, matched)
+                yield from matched
+        finally:
+            classified.close()
+
+    def _parsed_chunks(self, chunks: List[List[str]]) -> Iterator[Tuple[List[Paper], Dict[str, Optional[Verdict]]]]:
+        """
+        Fetch PMID chunks, parsed and keyword-matched in the process pool, as one
+        (papers, keyword verdicts) pair per chunk. efetch pages are sized so that none
+        straddles two chunks, which lets downloads run ahead across chunk boundaries.
+        """
+        from pubmed_papers.pipe.parallel import iter_parsed_pages
+        batch_size = math.gcd(self.chunk_size, 100)
+        raw_pages = iter_raw_pages([pmid for chunk in chunks for pmid in chunk], batch_size=batch_size)
+        pages = iter_parsed_pages(raw_pages, self._get_pool(), 2 * self.workers)
+        for chunk in chunks:
+            papers: List[Paper] = []
+            verdicts: Dict[str, Optional[Verdict]] = {}
+            for page_papers, page_verdicts in itertools.islice(pages, -(-len(chunk) // batch_size)):
+                papers.extend(page_papers)
+                for key, verdict in page_verdicts.items():
+                    verdicts.setdefault(key, verdict)
+            yield papers, verdicts
+
+    def _stream_ids(self, pmids: List[str]) -> Iterator[Paper]:
+        """
+        Run the pipeline on explicit PMIDs, through the cache or the process pool when enabled.
+        """
+        if self.cache is not None:
+            verdicts: Dict[str, Optional[Verdict]] = {}
+            metadata = iter_metadata_cached(chunked(pmids, 1000), self.cache, fetch=self._fetcher(verdicts))
+            yield from self._pipeline(metadata, verdicts)
+        elif self.workers:
+            yield from self._pipeline_pages(iter_raw_pages(pmids))
+        else:
+            yield from self._pipeline(iter_metadata(pmids))
+
+    def results_by_pmid_list(self, query: str) -> List[Dict[str, Any]]:
+        """
+        List-based variant of `results`: pages PMIDs out of esearch and fetches them by ID.
+        Limited to esearch's first 9,999 results.
         """
-        self.query = query
         try:
             # Fetch all PMIDs based on the query
-            pmids = fetch_pmids(self.query)
-            DebugUtil.debug_print(f"Fetched {len(pmids)} PMIDs for query: {self.query}")
-            if not pmids:
-                DebugUtil.debug_print("No PMIDs found for the query.")
-                return []
+            pmids = fetch_pmids(query)
+            DebugUtil.debug_print(f"Fetched {len(pmids)} PMIDs for query: {query}")
         except Exception as e:
             DebugUtil.debug_print(f"Error fetching PMIDs: {e}", error=True)
             return []
+        if not pmids:
+            DebugUtil.debug_print("No PMIDs found for the query.")
+            return []
+
+        return self.results_for_pmids(pmids)
+
+    def _pipeline(self, metadata: Iterable[Paper],
+                  verdicts: Optional[Dict[str, Optional[Verdict]]] = None) -> Iterator[Paper]:
+        """
+        Runs fetch and classification as concurrent stages connected by bounded queues:
+        while one chunk is being classified the next one is downloading, and the caller
+        consumes results of the previous chunk. At most a few chunks are alive at once.
+        `verdicts` collects keyword verdicts computed by parsing workers while `metadata` is
+        fetched (see `_fetcher`); each chunk takes the ones of its affiliations along.
+        """
+        chunks = chunked(metadata, self.chunk_size)
+        if verdicts is None:
+            return self._run((chunk, None) for chunk in chunks)
+        return self._run((chunk, self._chunk_verdicts(chunk, verdicts)) for chunk in chunks)
 
+    @staticmethod
+    def _chunk_verdicts(chunk: List[Paper], verdicts: Dict[str, Optional[Verdict]]
+                        ) -> Optional[Dict[str, Optional[Verdict]]]:
+        """
+        The verdicts in `verdicts` for `chunk`'s affiliations. None if there are none
+        (cache hits, or in-process parsing): layer 1 then runs in this process.
+        """
+        if not verdicts:
+            return None
+        taken: Dict[str, Optional[Verdict]] = {}
+        for paper in chunk:
+            for author in paper.authors:
+                key = normalize_affiliation(author.affiliation)
+                if key in verdicts:
+                    taken[key] = verdicts[key]
+        return taken or None
+
+    def _pipeline_pages(self, raw_pages: Iterable[Tuple[bytes, Optional[List[str]]]]) -> Iterator[Paper]:
+        """
+        Like _pipeline, but raw efetch pages are parsed and keyword-matched in the process
+        pool while this process keeps downloading the next ones.
+        """
+        from pubmed_papers.pipe.parallel import iter_parsed_pages, regroup
+        pages = iter_parsed_pages(raw_pages, self._get_pool(), 2 * self.workers)
+        return self._run(regroup(pages, self.chunk_size))
+
+    def _run(self, chunks: Iterable[Tuple[List[Paper], Optional[Dict[str, Optional[Verdict]]]]]) -> Iterator[Paper]:
+        fetched = 0
+        matched = 0
+        remaining = self.max_results
+        chunks = prefetch(chunks, self.queue_size)
+        results = prefetch(self._classify_chunks(chunks), self.queue_size)
         try:
-            # Fetch metadata for the PMIDs (all papers for the query)
-            metadata = fetch_metadata(pmids)
-            DebugUtil.debug_print(f"Fetched metadata for {len(metadata)} papers.")
-        except Exception as e:
-            DebugUtil.debug_print(f"Error fetching metadata: {e}", error=True)
-            return []
+            for count, papers in results:
+                fetched += count
+                if remaining is not None:
+                    papers = papers[:remaining]
+                    remaining -= len(papers)
+                matched += len(papers)
+                yield from papers
+                if remaining == 0:
+                    # Closing the stages below stops them from downloading or classifying more
+                    DebugUtil.debug_print(f"Reached {self.max_results} results, stopping early")
+                    break
+        finally:
+            results.close()
+        DebugUtil.debug_print(f"Fetched metadata for {fetched} papers.")
+        if self.cache is not None:
+            DebugUtil.debug_print(f"Metadata cache: {self.cache.hits} hits, {self.cache.misses} misses")
+        DebugUtil.debug_print(f"Filtered papers, {matched} matched.")
 
+    def _classify_chunks(self, chunks: Iterable[Tuple[List[Paper], Optional[Dict[str, Optional[Verdict]]]]]
+                         ) -> Iterator[Tuple[int, List[Paper]]]:
+        """
+        Classify each (papers, precomputed keyword verdicts) chunk, yielding (chunk size, matched papers).
+        """
+        for chunk, keyword_verdicts in chunks:
+            metrics.incr("papers.processed", len(chunk))
+            metrics.incr("authors.processed", sum(len(paper.get("authors", [])) for paper in chunk))
+            with metrics.timer("classify"):
+                filtered = self._filter(chunk, keyword_verdicts)
+            metrics.incr("papers.matched", len(filtered))
+            yield len(chunk), filtered
+
+    def _filter(self, metadata: List[Paper],
+                keyword_verdicts: Optional[Dict[str, Optional[Verdict]]] = None) -> List[Paper]:
+        """
+        Filters fetched metadata for biotech/pharma affiliations.
+        """
         try:
             # Filter papers affiliated with Biotech or Pharmaceuticals
-            filtered_papers = filter_biotech_papers(metadata)
-            DebugUtil.debug_print(f"Filtered papers, {len(filtered_papers)} matched.")
+            filtered_papers = filter_biotech_papers(metadata, verdict_cache=self.verdict_cache, backends=self.backends,
+                                                    keyword_verdicts=keyword_verdicts)
         except Exception as e:
             DebugUtil.debug_print(f"Error filtering papers: {e}", error=True)
             return []
@@ -45,4 +434,4 @@ class PubMedController:
         # Ensure always a list
         if isinstance(filtered_papers, dict):
             return filtered_papers.get("papers", [])
-        return filtered_papers if filtered_papers is not None else []
\ No newline at end of file
+        return filtered_papers if filtered_papers is not None else []
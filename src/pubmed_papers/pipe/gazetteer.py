@@ -0,0 +1,264 @@
+# src/pubmed_papers/pipe/gazetteer.py
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import List, Dict, Iterable, Optional, Tuple
+from pubmed_papers.pipe.matcher import KeywordMatcher
+from pubmed_papers.utils import DebugUtil
+
+# Legal-form words that are not a company name on their own ("Ltd", "Co., Ltd", "S.A.")
+CORPORATE_SUFFIXES = {
+    "inc", "ltd", "llc", "llp", "plc", "pvt", "pty", "co", "corp", "corporation", "incorporated", "limited",
+    "company", "gmbh", "ag", "sa", "s", "a", "r", "l", "srl", "spa", "bv", "nv", "kk", "ab", "as", "oy"
+}
+
+# Leading comma segments that name a department or sub-unit rather than the organization
+SUBUNIT = re.compile(
+    r'^(dept\b|department|division|laboratory|lab\b|unit\b|section|group\b|program|core\b|office|'
+    r'research and development|r\s*&\s*d\b)', re.IGNORECASE
+)
+
+# Distinct affiliations an LLM company name must be confirmed by before layer 1 uses it
+MIN_CONFIRMATIONS = 3
+
+_WORD = re.compile(r"\w+")
+
+def is_bare_suffix(text: str) -> bool:
+    """
+    True if `text` holds nothing but corporate suffixes, e.g. "Ltd" or "Co., Ltd.".
+    """
+    words = _WORD.findall(text.lower())
+    return bool(words) and all(word in CORPORATE_SUFFIXES for word in words)
+
+def normalize(text: str) -> str:
+    return " ".join(text.split()).lower()
+
+def organization_segment(affiliation: str) -> Optional[str]:
+    """
+    The comma segment naming the organization: the first one that is not a department or
+    sub-unit, with a following bare legal suffix joined in ("Acme, Ltd"). None if there is none.
+    """
+    segments = [segment.strip() for segment in affiliation.split(",") if segment.strip()]
+    for index, segment in enumerate(segments):
+        if SUBUNIT.match(segment):
+            continue
+        if index + 1 < len(segments) and is_bare_suffix(segments[index + 1]):
+            segment = f"{segment}, {segments[index + 1]}"
+        return segment
+    return None
+
+def learnable(affiliation: str, company: str) -> Optional[str]:
+    """
+    The normalized variant to learn from an LLM verdict, or None. The company name must be
+    the leading part of the affiliation's organization segment, which rules out places
+    ("Biogen, Cambridge, MA" -> "Cambridge"), departments ("Research and Development")
+    and paraphrased or hallucinated names. Bare legal suffixes and very short names are rejected.
+    """
+    variant = normalize(company)
+    if len(variant) < 3 or variant == "none" or not _WORD.search(variant) or is_bare_suffix(variant):
+        return None
+    segment = organization_segment(affiliation)
+    if segment is None:
+        return None
+    segment = normalize(segment)
+    if segment == variant or (segment.startswith(variant) and not segment[len(variant)].isalnum()):
+        return variant
+    return None
+
+class Gazetteer:
+    """
+    Persistent company gazetteer: name variants (normalized) -> canonical company name,
+    consulted by KeyMatch before its keyword heuristics.
+
+    Seed entries (user lists) are used as given. Company names learned from LLM verdicts
+    are kept apart from them and only used once `min_confirmations` distinct affiliations
+    confirmed them, so one wrong answer cannot teach layer 1 a false company. Entries never
+    expire; `remove` deletes a wrong one and keeps it from being learned again.
+    """
+    def __init__(self, cache_dir: str, min_confirmations: int = MIN_CONFIRMATIONS) -> None:
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path: str = os.path.join(cache_dir, "gazetteer.sqlite3")
+        self.min_confirmations: int = min_confirmations
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Seed entries
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS variants (variant TEXT PRIMARY KEY, company TEXT NOT NULL, "
+            "source TEXT NOT NULL, updated REAL NOT NULL)"
+        )
+        # One row per (learned variant, affiliation that confirmed it)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS learned (variant TEXT NOT NULL, affiliation TEXT NOT NULL, "
+            "company TEXT NOT NULL, updated REAL NOT NULL, PRIMARY KEY (variant, affiliation))"
+        )
+        # Variants removed by the user, never learned again
+        self._conn.execute("CREATE TABLE IF NOT EXISTS removed (variant TEXT PRIMARY KEY, updated REAL NOT NULL)")
+        self._conn.commit()
+        self._seeds: Dict[str, str] = dict(self._conn.execute("SELECT variant, company FROM variants"))
+        self._removed = {variant for (variant,) in self._conn.execute("SELECT variant FROM removed")}
+        # Confirmations per learned variant, and the company name of its first confirmation
+        self._confirmations: Dict[str, int] = {}
+        self._learned_names: Dict[str, str] = {}
+        for variant, company, confirmations in self._conn.execute(
+                "SELECT variant, company, COUNT(*) FROM learned GROUP BY variant ORDER BY MIN(rowid)"):
+            self._confirmations[variant] = confirmations
+            self._learned_names[variant] = company
+        self._refresh()
+
+    def _refresh(self) -> None:
+        """
+        Rebuild the active variants (seeds win over learned names); the matcher follows on the next lookup.
+        """
+        active = {
+            variant: company for variant, company in self._learned_names.items()
+            if self._confirmations[variant] >= self.min_confirmations
+        }
+        active.update(self._seeds)
+        self._variants: Dict[str, str] = active
+        self._matcher: Optional[KeywordMatcher] = None
+        self._names: List[str] = []
+
+    def __len__(self) -> int:
+        """
+        Number of variants in use (seeds and sufficiently confirmed learned names).
+        """
+        return len(self._variants)
+
+    def add(self, entries: Iterable[Tuple[str, str]], source: str = "seed") -> int:
+        """
+        Store seed (variant, canonical company) pairs. Returns the number of new or changed variants.
+        """
+        rows = []
+        with self._lock:
+            for variant, company in entries:
+                variant = normalize(variant)
+                if not _WORD.search(variant) or is_bare_suffix(variant) or self._seeds.get(variant) == company:
+                    continue
+                self._seeds[variant] = company
+                rows.append((variant, company, source, time.time()))
+            if rows:
+                self._conn.executemany("INSERT OR REPLACE INTO variants VALUES (?, ?, ?, ?)", rows)
+                self._conn.commit()
+                self._refresh()
+        return len(rows)
+
+    def learn(self, confirmed: Iterable[Tuple[str, str]]) -> int:
+        """
+        Record (affiliation, company) verdicts of the LLM as confirmations of the company name
+        (see `learnable`). Returns the number of names that just reached `min_confirmations`
+        and are used from now on.
+        """
+        recorded = 0
+        activated = 0
+        with self._lock:
+            for affiliation, company in confirmed:
+                variant = learnable(affiliation, company)
+                if variant is None or variant in self._removed or variant in self._seeds:
+                    continue
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO learned VALUES (?, ?, ?, ?)",
+                    (variant, normalize(affiliation), company.strip(), time.time())
+                )
+                if not cursor.rowcount:
+                    continue
+                self._learned_names.setdefault(variant, company.strip())
+                self._confirmations[variant] = self._confirmations.get(variant, 0) + 1
+                if self._confirmations[variant] == self.min_confirmations:
+                    activated += 1
+                recorded += 1
+            if recorded:
+                self._conn.commit()
+            if activated:
+                self._refresh()
+        return activated
+
+    def load_seed(self, filename: str) -> int:
+        """
+        Load a seed list: one company per line as `Canonical Name | variant | variant ...`.
+        The canonical name is a variant itself; blank lines and lines starting with # are skipped.
+        """
+        entries = []
+        with open(filename, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip() or line.lstrip().startswith("#"):
+                    continue
+                names = [name.strip() for name in line.split("|") if name.strip()]
+                entries.extend((name, names[0]) for name in names)
+        return self.add(entries, "seed")
+
+    def entries(self) -> List[Tuple[str, str, str, int]]:
+        """
+        Every entry as (canonical company, variant, source, confirmations), sorted by company.
+        Source is "seed", "learned" (in use) or "pending" (not confirmed often enough yet).
+        """
+        with self._lock:
+            rows = [(company, variant, "seed", 0) for variant, company in self._seeds.items()]
+            for variant, company in self._learned_names.items():
+                if variant in self._seeds:
+                    continue
+                confirmations = self._confirmations[variant]
+                source = "learned" if confirmations >= self.min_confirmations else "pending"
+                rows.append((company, variant, source, confirmations))
+        return sorted(rows, key=lambda row: (row[0].lower(), row[1]))
+
+    def remove(self, name: str) -> int:
+        """
+        Delete every entry whose variant or canonical company is `name` (case-insensitive),
+        and keep the removed variants from being learned again. Returns the number removed.
+        """
+        key = normalize(name)
+        with self._lock:
+            variants = {
+                variant for variant, company in list(self._seeds.items()) + list(self._learned_names.items())
+                if variant == key or normalize(company) == key
+            }
+            variants.add(key)
+            now = time.time()
+            for variant in variants:
+                self._conn.execute("DELETE FROM variants WHERE variant = ?", (variant,))
+                self._conn.execute("DELETE FROM learned WHERE variant = ?", (variant,))
+                self._conn.execute("INSERT OR REPLACE INTO removed VALUES (?, ?)", (variant, now))
+            self._conn.commit()
+            removed = sum(1 for variant in variants if variant in self._seeds or variant in self._learned_names)
+            for variant in variants:
+                self._seeds.pop(variant, None)
+                self._learned_names.pop(variant, None)
+                self._confirmations.pop(variant, None)
+            self._removed |= variants
+            self._refresh()
+        return removed
+
+    def lookup(self, affiliation_lower: str) -> Optional[str]:
+        """
+        Canonical company of the longest known variant in a lower-cased affiliation, or None.
+        """
+        with self._lock:
+            if self._matcher is None:
+                if not self._variants:
+                    return None
+                self._names = list(self._variants)
+                self._matcher = KeywordMatcher(self._names)
+            matcher, names, variants = self._matcher, self._names, self._variants
+        present = matcher.present(affiliation_lower)
+        if not present:
+            return None
+        best = max(present, key=lambda index: len(names[index]))
+        return variants[names[best]]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+def open_gazetteer(cache_dir: str) -> Optional[Gazetteer]:
+    """
+    Open the gazetteer, or return None (layer 1 uses its heuristics only) if it cannot be opened.
+    """
+    try:
+        return Gazetteer(cache_dir)
+    except (OSError, sqlite3.Error) as e:
+        DebugUtil.debug_print(f"Gazetteer disabled: {e}")
+        return None
@@ -0,0 +1,142 @@
+# src/pubmed_papers/pipe/journal.py
+
+import json
+import os
+import secrets
+import shutil
+import sqlite3
+import threading
+import time
+from typing import List, Dict, Iterable, Mapping, Optional
+from pubmed_papers.pipe.records import Paper, as_dict
+from pubmed_papers.utils import DebugUtil
+
+# Journals of interrupted runs that were not resumed within this many seconds are deleted
+JOURNAL_TTL = 30 * 24 * 3600.0
+
+class RunJournal:
+    """
+    Checkpoints of one pipeline run, so an interrupted run can be resumed: the run's
+    query, its full PMID list, and the matched papers of every classified chunk.
+    Each run lives in its own directory under `runs_dir`, named by its run ID; parsed
+    metadata and LLM verdicts can be checkpointed next to it (see `directory`).
+    """
+    def __init__(self, runs_dir: str, run_id: Optional[str] = None) -> None:
+        self.run_id: str = run_id or f"{time.strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(3)}"
+        self.directory: str = os.path.join(runs_dir, self.run_id)
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(self.directory, "journal.sqlite3"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS run (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS pmids (position INTEGER PRIMARY KEY, pmid TEXT NOT NULL)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks (chunk INTEGER PRIMARY KEY, size INTEGER NOT NULL, "
+            "matched TEXT NOT NULL, finished REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        A run setting (e.g. "query", "mode"), or None if it was never set.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM run WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO run VALUES (?, ?)", (key, value))
+            self._conn.commit()
+
+    def pmids(self) -> Optional[List[str]]:
+        """
+        The run's PMIDs in result order, or None if the search has not been checkpointed yet.
+        """
+        if self.get("pmids_saved") is None:
+            return None
+        with self._lock:
+            rows = self._conn.execute("SELECT pmid FROM pmids ORDER BY position").fetchall()
+        return [pmid for (pmid,) in rows]
+
+    def save_pmids(self, pmids: List[str]) -> None:
+        """
+        Checkpoint the search result; later runs of this journal reuse it instead of searching again.
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM pmids")
+            self._conn.executemany("INSERT INTO pmids VALUES (?, ?)", enumerate(pmids))
+            self._conn.execute("INSERT OR REPLACE INTO run VALUES ('pmids_saved', ?)", (str(len(pmids)),))
+            self._conn.commit()
+
+    def completed(self, chunk_size: int) -> Dict[int, List[Paper]]:
+        """
+        Matched papers of every chunk already classified, keyed by chunk index. Chunks
+        recorded with a different chunk size cannot be reused and are ignored.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk, matched FROM chunks WHERE size = ?", (chunk_size,)
+            ).fetchall()
+        return {chunk: [Paper.from_dict(paper) for paper in json.loads(matched)] for chunk, matched in rows}
+
+    def complete(self, chunk: int, chunk_size: int, matched: Iterable[Mapping]) -> None:
+        """
+        Checkpoint one classified chunk and its matched papers.
+        """
+        data = json.dumps([as_dict(paper) for paper in matched], ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?)", (chunk, chunk_size, data, time.time()))
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def remove(self) -> None:
+        """
+        Delete the journal and everything checkpointed with it (after a completed run).
+        """
+        self.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+def prune_journals(runs_dir: str, max_age: float = JOURNAL_TTL) -> int:
+    """
+    Delete the journals of runs that were not touched for `max_age` seconds (abandoned
+    interrupted runs). Returns the number of journals deleted.
+    """
+    try:
+        runs = os.listdir(runs_dir)
+    except OSError:
+        return 0
+    cutoff = time.time() - max_age
+    pruned = 0
+    for run_id in runs:
+        directory = os.path.join(runs_dir, run_id)
+        try:
+            touched = max([os.path.getmtime(directory)] + [
+                os.path.getmtime(os.path.join(directory, name)) for name in os.listdir(directory)
+            ])
+        except OSError:
+            continue
+        if touched < cutoff:
+            shutil.rmtree(directory, ignore_errors=True)
+            pruned += 1
+    if pruned:
+        DebugUtil.debug_print(f"Deleted {pruned} run journals older than {max_age / 86400:.0f} days")
+    return pruned
+
+def open_journal(runs_dir: str, run_id: Optional[str] = None) -> Optional[RunJournal]:
+    """
+    Open a new run journal (or, with `run_id`, an existing one); None if it cannot be opened.
+    Resuming a run ID that has no journal is an error. Opening a new journal prunes stale ones.
+    """
+    if run_id is not None and not os.path.isdir(os.path.join(runs_dir, run_id)):
+        DebugUtil.debug_print(f"No journal found for run {run_id} in {runs_dir}", error=True)
+    if run_id is None:
+        prune_journals(runs_dir)
+    try:
+        return RunJournal(runs_dir, run_id)
+    except (OSError, sqlite3.Error) as e:
+        DebugUtil.debug_print(f"Run journal disabled: {e}")
+        return None
@@ -1,11 +1,16 @@
 # src/pubmed_papers/pipe/keymatch.py
 
 import re
-from typing import List, Dict, Tuple
+from typing import List, Dict, Mapping, Tuple, Optional
+from pubmed_papers.pipe.matcher import KeywordMatcher
+from pubmed_papers.pipe.gazetteer import Gazetteer, is_bare_suffix
+from pubmed_papers.pipe.records import Paper, Author, Verdict, as_paper
 from pubmed_papers.utils import DebugUtil
 
 class KeyMatch:
-    def __init__(self) -> None:
+    def __init__(self, gazetteer: Optional[Gazetteer] = None) -> None:
+        # Known companies, consulted before the keyword heuristics (see pipe/gazetteer.py)
+        self.gazetteer: Optional[Gazetteer] = gazetteer
         # List of keywords indicating company/industry affiliations
         self.company_keywords = [
             # Corporate suffixes
@@ -24,61 +29,104 @@ class KeyMatch:
         self.exclude_keywords = [
             'institute', 'university', 'college', 'academy', 'school', 'hospital', 'centre', 'center', 'faculty'
         ]
-        # Compile regex patterns for matching
-        self.pattern = r'(' + '|'.join([rf'\b{re.escape(k)}\b' for k in self.company_keywords]) + r')'
-        self.exclude_pattern = r'(' + '|'.join([rf'\b{re.escape(k)}\b' for k in self.exclude_keywords]) + r')'
+        self.email_pattern = re.compile(r'[\w\.-]+@[\w\.-]+\.\w+')
+        # One matcher over both keyword sets; indices past the company keywords are excludes
+        self.matcher = KeywordMatcher(self.company_keywords + self.exclude_keywords)
+        self._exclude_ids = set(range(len(self.company_keywords), len(self.matcher.keywords)))
 
-    def get_filter(self, papers: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+    def is_academic(self, affiliation: str) -> bool:
+        """
+        True if the affiliation hits an academic/non-profit exclude keyword.
+        """
+        return not self._exclude_ids.isdisjoint(self.matcher.present(affiliation.lower()))
+
+    def known_company(self, affiliation: str) -> Optional[Dict[str, str]]:
+        """
+        Gazetteer-only verdict: the canonical company if the affiliation names a known one
+        and is not academic, otherwise None.
+        """
+        if self.gazetteer is None:
+            return None
+        affiliation_lower = affiliation.lower()
+        company = self.gazetteer.lookup(affiliation_lower)
+        if company is None or self.is_academic(affiliation):
+            return None
+        return {"company": company, "email": self._email(affiliation)}
+
+    def _email(self, affiliation: str) -> str:
+        # Extract first email if present
+        emails = self.email_pattern.findall(affiliation) if '@' in affiliation else []
+        return emails[0] if emails else "none"
+
+    def classify_affiliation(self, affiliation: str) -> Optional[Dict[str, str]]:
+        """
+        Classifies a single affiliation string.
+        Returns {"company": ..., "email": ...} if it looks industry-affiliated, otherwise None.
+        """
+        affiliation_lower = affiliation.lower()
+        present = self.matcher.present(affiliation_lower)
+        if not self._exclude_ids.isdisjoint(present):
+            return None
+        if self.gazetteer is not None:
+            company = self.gazetteer.lookup(affiliation_lower)
+            if company is not None:
+                return {"company": company, "email": self._email(affiliation)}
+        if not present:
+            return None
+        # Same pick as the regex alternation: leftmost hit, then earliest keyword
+        if len(present) == 1:
+            index = next(iter(present))
+            start = self.matcher.locate(affiliation_lower, index)
+        else:
+            start, index = min((self.matcher.locate(affiliation_lower, i), i) for i in present)
+
+        # The company name is the comma-separated segment holding the keyword.
+        # lower() keeps commas in place, so count them rather than trusting offsets.
+        segment = affiliation_lower.count(',', 0, start)
+        segments = affiliation.split(',')
+        company_name = segments[segment].strip()
+        # "Green Toxicology, Ltd": a segment that is only a legal suffix belongs to the name before it
+        while segment > 0 and is_bare_suffix(company_name):
+            segment -= 1
+            company_name = f"{segments[segment].strip()}, {company_name}"
+        company_name = company_name or self.company_keywords[index]
+
+        return {"company": company_name, "email": self._email(affiliation)}
+
+    def classify_many(self, affiliations: List[str]) -> List[Optional[Dict[str, str]]]:
+        """
+        Bulk variant of `classify_affiliation`, returning verdicts in input order.
+        Repeated affiliation strings are classified once.
+        """
+        verdicts: Dict[str, Optional[Dict[str, str]]] = {}
+        for affiliation in affiliations:
+            if affiliation not in verdicts:
+                verdicts[affiliation] = self.classify_affiliation(affiliation)
+        return [verdicts[affiliation] for affiliation in affiliations]
+
+    def get_filter(self, papers: List[Mapping]) -> Tuple[List[Paper], List[Mapping]]:
         """
         Filters papers for industry affiliations using keyword matching.
         Returns a tuple: (matched_papers, unmatched_papers)
         """
-        matched: List[Dict] = []
-        un_matched: List[Dict] = []
-        email_pattern = re.compile(r'[\w\.-]+@[\w\.-]+\.\w+')
+        matched: List[Paper] = []
+        un_matched: List[Mapping] = []
 
         for paper in papers:
-            matched_authors: List[Dict] = []
+            matched_authors: List[Author] = []
             try:
                 for author in paper.get('authors', []):
-                    affiliation = author.get('affiliation', '')
-                    affiliation_lower = affiliation.lower()
-                    match = re.search(self.pattern, affiliation_lower)
-                    exclude_match = re.search(self.exclude_pattern, affiliation_lower)
-                    if match and not exclude_match:
-                        # Find the matched keyword (company name)
-                        company = match.group(0)
-                        # Extract the company name with surrounding commas
-                        parts = [p.strip() for p in affiliation.split(',')]
-                        company_name = None
-                        for part in parts:
-                            if company in part.lower():
-                                company_name = part.strip()
-                                break
-                        if not company_name:
-                            company_name = company  # fallback
-
-                        # Extract first email if present
-                        emails = email_pattern.findall(affiliation)
-                        email = emails[0] if emails else "none"
-
-                        matched_authors.append({
-                            "name": author.get("name", ""),
-                            "affiliation": {
-                                "company": company_name,
-                                "email": email
-                            }
-                        })
+                    verdict = self.classify_affiliation(author.get('affiliation', ''))
+                    if verdict:
+                        matched_authors.append(Author(author.get("name", ""), Verdict.of(verdict)))
             except Exception as e:
                 DebugUtil.debug_print(f"Error processing paper '{paper.get('pubmed_id', '')}': {e}", error=True)
                 continue
 
             if matched_authors:
-                new_paper = paper.copy()
-                new_paper['authors'] = matched_authors
-                matched.append(new_paper)
+                matched.append(as_paper(paper).with_authors(matched_authors))
             else:
                 un_matched.append(paper)
 
         DebugUtil.debug_print(f"KeyMatch: {len(matched)} matched, {len(un_matched)} unmatched")
-        return (matched, un_matched)
\ No newline at end of file
+        return (matched, un_matched)
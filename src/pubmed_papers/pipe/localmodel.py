@@ -0,0 +1,82 @@
+# src/pubmed_papers/pipe/localmodel.py
+
+import re
+from typing import List, Dict, Optional
+from pubmed_papers.pipe.classify import ClassifierBackend
+from pubmed_papers.pipe.gazetteer import organization_segment
+from pubmed_papers.utils import DebugUtil
+
+_EMAIL = re.compile(r'[\w\.-]+@[\w\.-]+\.\w+')
+
+def extract_company(affiliation: str) -> str:
+    """
+    Best-effort organization name: the first comma segment that is not a sub-unit.
+    """
+    parts = [p.strip() for p in affiliation.split(',') if p.strip()]
+    return organization_segment(affiliation) or (parts[0] if parts else "none")
+
+def industry_label(label2id: Dict[str, int]) -> int:
+    """
+    Output index meaning "industry": a label named like it ("industry", "company"), else the
+    positive class of a binary model. Models with more labels must name theirs.
+    """
+    for label, idx in label2id.items():
+        if "industry" in str(label).lower() or "company" in str(label).lower():
+            return idx
+    if len(label2id) != 2:
+        DebugUtil.debug_print(
+            f"Local model labels {sorted(label2id)} name no industry class; expected a label containing "
+            "'industry' or 'company', or a binary model", error=True
+        )
+    DebugUtil.debug_print("Local model labels name no industry class; using the positive class (index 1)")
+    return 1
+
+class LocalModelBackend(ClassifierBackend):
+    """
+    Offline CPU backend: a local transformers sequence-classification model that scores
+    affiliations as industry vs. academic. Only confident predictions are returned;
+    the rest fall through to the next backend (e.g. Groq).
+    """
+    name = "local"
+
+    def __init__(self, model: str, threads: int = 4, batch_size: int = 32,
+                 threshold: float = 0.9, max_length: int = 128) -> None:
+        # Heavy imports stay here so the rest of the CLI never pays for them
+        import torch
+        from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+        torch.set_num_threads(threads)
+        self.torch = torch
+        self.tokenizer = AutoTokenizer.from_pretrained(model)
+        self.model = AutoModelForSequenceClassification.from_pretrained(model).eval()
+        self.batch_size: int = batch_size
+        self.threshold: float = threshold
+        self.max_length: int = max_length
+
+        self.industry_label: int = industry_label(self.model.config.label2id)
+        DebugUtil.debug_print(f"Loaded local model {model} ({threads} threads, industry label {self.industry_label})")
+
+    def classify(self, affiliations: List[str]) -> Dict[int, Optional[Dict[str, str]]]:
+        # Sort by length so each padded batch holds similarly sized inputs
+        order = sorted(range(len(affiliations)), key=lambda idx: len(affiliations[idx]))
+        decided: Dict[int, Optional[Dict[str, str]]] = {}
+        for i in range(0, len(order), self.batch_size):
+            batch = order[i:i + self.batch_size]
+            inputs = self.tokenizer(
+                [affiliations[idx] for idx in batch],
+                padding=True, truncation=True, max_length=self.max_length, return_tensors="pt"
+            )
+            with self.torch.inference_mode():
+                logits = self.model(**inputs).logits
+            scores = self.torch.softmax(logits, dim=-1)[:, self.industry_label].tolist()
+            for idx, score in zip(batch, scores):
+                if score >= self.threshold:
+                    affiliation = affiliations[idx]
+                    emails = _EMAIL.findall(affiliation)
+                    decided[idx] = {
+                        "company": extract_company(affiliation),
+                        "email": emails[0] if emails else "none"
+                    }
+                elif score <= 1 - self.threshold:
+                    decided[idx] = None
+        return decided
@@ -0,0 +1,101 @@
+# src/pubmed_papers/pipe/matcher.py
+
+import re
+from typing import List, Dict, Tuple, Set, Iterator
+
+# \w runs, used for non-ASCII text
+_WORD = re.compile(r"\w+")
+# For ASCII text: bytes.translate maps every non-word byte to a space, then split() yields the \w runs
+_WORD_BYTES = bytes(b if (chr(b).isalnum() or b == ord("_")) and b < 128 else ord(" ") for b in range(256))
+
+def _is_word(char: str) -> bool:
+    # Same definition as \w in Python's re module for str patterns
+    return char.isalnum() or char == "_"
+
+def _words(text: str) -> Set[str]:
+    """
+    The set of maximal \\w runs in `text`.
+    """
+    if text.isascii():
+        return set(text.encode("ascii").translate(_WORD_BYTES).decode("ascii").split())
+    return set(_WORD.findall(text))
+
+class KeywordMatcher:
+    """
+    Multi-keyword matcher with the same results as a `\\bkw1\\b|\\bkw2\\b|...` regex,
+    without trying every alternative at every character.
+
+    A text is tokenized once into its set of words (a C-level pass). Single-word keywords
+    are then answered by set intersection alone; multi-word or punctuated keywords are
+    indexed by their first word and only located and boundary-checked when that word occurs.
+    Keywords are matched case-sensitively; callers lower-case both sides.
+    """
+    def __init__(self, keywords: List[str]) -> None:
+        self.keywords: List[str] = list(keywords)
+        # Keywords that are exactly one word: present iff that word is a token of the text
+        self._simple: Dict[str, List[int]] = {}
+        # Everything else, keyed by first word, needs a positional check
+        self._complex: Dict[str, List[int]] = {}
+        for index, keyword in enumerate(self.keywords):
+            words = _WORD.findall(keyword)
+            if not words:
+                raise ValueError(f"keyword without word characters: {keyword!r}")
+            table = self._simple if words == [keyword] else self._complex
+            table.setdefault(words[0], []).append(index)
+        self._edges: List[Tuple[bool, bool]] = [(_is_word(k[0]), _is_word(k[-1])) for k in self.keywords]
+
+    def _occurrences(self, text: str, index: int) -> Iterator[int]:
+        """
+        Start offsets of `keywords[index]` in `text` that satisfy \\b on both sides.
+        """
+        start = self.locate(text, index)
+        while start != -1:
+            yield start
+            start = self.locate(text, index, start + 1)
+
+    def present(self, text: str) -> Set[int]:
+        """
+        Indices of all keywords occurring in `text`, in a single tokenizing pass.
+        """
+        words = _words(text)
+        found: Set[int] = set()
+        simple = self._simple
+        for word in simple.keys() & words:
+            found.update(simple[word])
+        complex_ = self._complex
+        for word in complex_.keys() & words:
+            for index in complex_[word]:
+                if self.locate(text, index) != -1:
+                    found.add(index)
+        return found
+
+    def locate(self, text: str, index: int, start: int = 0) -> int:
+        """
+        Offset of the first occurrence of `keywords[index]` at or after `start`, or -1.
+        """
+        keyword = self.keywords[index]
+        first_word, last_word = self._edges[index]
+        size = len(text)
+        length = len(keyword)
+        start = text.find(keyword, start)
+        while start != -1:
+            end = start + length
+            # \b holds where word-ness changes between neighbouring characters
+            if ((start > 0 and _is_word(text[start - 1])) != first_word
+                    and (end < size and _is_word(text[end])) != last_word):
+                return start
+            start = text.find(keyword, start + 1)
+        return -1
+
+    def find_all(self, text: str) -> List[Tuple[int, int, int]]:
+        """
+        Return (start, end, keyword index) for every occurrence, ordered by start offset
+        and then keyword order (the order a regex alternation would prefer them).
+        """
+        hits = [
+            (start, start + len(self.keywords[index]), index)
+            for index in self.present(text)
+            for start in self._occurrences(text, index)
+        ]
+        hits.sort(key=lambda hit: (hit[0], hit[2]))
+        return hits
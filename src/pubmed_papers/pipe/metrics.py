@@ -0,0 +1,133 @@
+# src/pubmed_papers/pipe/metrics.py
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator
+
+class Metrics:
+    """
+    Thread-safe run metrics: named counters plus per-stage timers.
+    Stage time is summed over every thread that ran the stage, so concurrent stages
+    (e.g. four efetch workers) can report more seconds than the run's wall time.
+    """
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.started: float = time.time()
+        self.counters: Dict[str, float] = {}
+        self.stage_seconds: Dict[str, float] = {}
+        self.stage_calls: Dict[str, int] = {}
+
+    def incr(self, name: str, value: float = 1) -> None:
+        """
+        Add `value` to the counter `name`.
+        """
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def record(self, stage: str, seconds: float) -> None:
+        """
+        Add one timed call of `stage`.
+        """
+        with self._lock:
+            self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+            self.stage_calls[stage] = self.stage_calls.get(stage, 0) + 1
+
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        """
+        Time the enclosed block as one call of `stage`.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def drain(self) -> Dict[str, Any]:
+        """
+        Take the counters and stage timings recorded so far, clearing them; see `merge`.
+        """
+        with self._lock:
+            data = {"counters": dict(self.counters), "stage_seconds": dict(self.stage_seconds),
+                    "stage_calls": dict(self.stage_calls)}
+            self.counters.clear()
+            self.stage_seconds.clear()
+            self.stage_calls.clear()
+        return data
+
+    def merge(self, data: Dict[str, Any]) -> None:
+        """
+        Add metrics drained in another process (e.g. a parsing worker) to these ones.
+        """
+        with self._lock:
+            for name, value in data["counters"].items():
+                self.counters[name] = self.counters.get(name, 0) + value
+            for stage, seconds in data["stage_seconds"].items():
+                self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+                self.stage_calls[stage] = self.stage_calls.get(stage, 0) + data["stage_calls"][stage]
+
+    def reset(self) -> None:
+        with self._lock:
+            self.started = time.time()
+            self.counters.clear()
+            self.stage_seconds.clear()
+            self.stage_calls.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        The metrics as a JSON-ready dictionary.
+        """
+        with self._lock:
+            return {
+                "started": self.started,
+                "wall_seconds": round(time.time() - self.started, 6),
+                "counters": dict(sorted(self.counters.items())),
+                "stages": {
+                    stage: {"seconds": round(seconds, 6), "calls": self.stage_calls[stage]}
+                    for stage, seconds in sorted(self.stage_seconds.items())
+                }
+            }
+
+    def to_prometheus(self, prefix: str = "pubmed_papers") -> str:
+        """
+        The metrics in the Prometheus text exposition format (for the node exporter's textfile collector).
+        """
+        snapshot = self.snapshot()
+        lines = [
+            f"# TYPE {prefix}_run_started_seconds gauge",
+            f"{prefix}_run_started_seconds {snapshot['started']}",
+            f"# TYPE {prefix}_run_wall_seconds gauge",
+            f"{prefix}_run_wall_seconds {snapshot['wall_seconds']}"
+        ]
+        for name, value in snapshot["counters"].items():
+            metric = f"{prefix}_{_metric_name(name)}"
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {value}")
+        if snapshot["stages"]:
+            lines.append(f"# TYPE {prefix}_stage_seconds gauge")
+            for stage, stats in snapshot["stages"].items():
+                lines.append(f'{prefix}_stage_seconds{{stage="{stage}"}} {stats["seconds"]}')
+            lines.append(f"# TYPE {prefix}_stage_calls gauge")
+            for stage, stats in snapshot["stages"].items():
+                lines.append(f'{prefix}_stage_calls{{stage="{stage}"}} {stats["calls"]}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, filename: str, fmt: str = "json") -> None:
+        """
+        Write the metrics to `filename` as JSON or Prometheus text. The file is replaced
+        atomically, so a collector never reads a half-written report.
+        """
+        content = self.to_prometheus() if fmt == "prometheus" else json.dumps(self.snapshot(), indent=2) + "\n"
+        tmp = f"{filename}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp, filename)
+
+def _metric_name(name: str) -> str:
+    return "".join(c if c.isalnum() else "_" for c in name)
+
+# Process-wide metrics shared by every pipeline stage
+metrics = Metrics()
@@ -0,0 +1,134 @@
+# src/pubmed_papers/pipe/ncbi.py
+
+import os
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import requests
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, Optional
+from pubmed_papers.pipe.ratelimit import TokenBucket
+from pubmed_papers.pipe.metrics import metrics
+from pubmed_papers.utils import DebugUtil
+
+# NCBI_EUTILS_URL points the client at a stand-in server (see benchmarks/fake_server.py)
+EUTILS_URL = os.environ.get("NCBI_EUTILS_URL", "https://eutils.ncbi.nlm.nih.gov/entrez/eutils").rstrip("/")
+
+# NCBI asks clients to identify themselves with `tool` and `email`; an API key raises the rate limit
+NCBI_API_KEY = os.environ.get("NCBI_API_KEY")
+NCBI_TOOL = os.environ.get("NCBI_TOOL", "pubmed_papers")
+NCBI_EMAIL = os.environ.get("NCBI_EMAIL")
+
+# NCBI allows 3 requests/second without an API key and 10 with one; NCBI_RATE overrides
+# the limit for stand-in servers
+NCBI_RATE = float(os.environ.get("NCBI_RATE") or (10 if NCBI_API_KEY else 3))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+def _retry_after(response: requests.Response) -> Optional[float]:
+    """
+    Parse a Retry-After header (seconds or HTTP date) into a delay in seconds.
+    """
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+        return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+class NCBIClient:
+    """
+    E-utilities client shared by every esearch/efetch call of the process. It owns a pooled
+    keep-alive session (one TCP/TLS handshake per connection, not per request), the NCBI
+    rate limiter and the retry policy, asks for gzip-compressed responses, identifies
+    itself with api_key/tool/email, and sends PMID lists in a POST body instead of the URL.
+    """
+    def __init__(self, base_url: str = EUTILS_URL, api_key: Optional[str] = NCBI_API_KEY,
+                 tool: Optional[str] = NCBI_TOOL, email: Optional[str] = NCBI_EMAIL, rate: float = NCBI_RATE,
+                 pool_size: int = 16, timeout: float = 60.0, max_retries: int = 5, connect_retries: int = 2,
+                 backoff: float = 1.0) -> None:
+        self.base_url: str = base_url.rstrip("/")
+        self.timeout: float = timeout
+        self.max_retries: int = max_retries
+        # Connection failures are retried less: an unreachable host rarely recovers in seconds
+        self.connect_retries: int = connect_retries
+        self.backoff: float = backoff
+        self.identity: Dict[str, str] = {
+            key: value for key, value in (("api_key", api_key), ("tool", tool), ("email", email)) if value
+        }
+        # One bucket for every thread that uses the client, so they all share the budget
+        self.limiter: TokenBucket = TokenBucket(rate)
+        self.session: requests.Session = requests.Session()
+        # Enough pooled connections for the concurrent efetch and esearch workers;
+        # retries are handled below, where they respect the rate limiter
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Accept-Encoding": "gzip, deflate", "User-Agent": tool or "pubmed_papers"})
+
+    def request(self, endpoint: str, params: Dict[str, Any]) -> requests.Response:
+        """
+        Call an E-utility ("esearch", "efetch") under the shared rate limit.
+        Retries 429/5xx responses and connection errors, honoring Retry-After and
+        otherwise backing off exponentially.
+        """
+        url = f"{self.base_url}/{endpoint}.fcgi"
+        params = {**params, **self.identity}
+        # NCBI recommends POST for long ID lists; the body has no URL length limit
+        method = "POST" if "id" in params else "GET"
+
+        failures = 0
+        for attempt in range(self.max_retries + 1):
+            with metrics.timer("ncbi_wait"):
+                self.limiter.acquire()
+            try:
+                with metrics.timer(endpoint):
+                    if method == "POST":
+                        response = self.session.request(method, url, data=params, timeout=self.timeout)
+                    else:
+                        response = self.session.request(method, url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                metrics.incr("ncbi.errors")
+                failures += 1
+                if failures > self.connect_retries or attempt == self.max_retries:
+                    raise
+                metrics.incr("ncbi.retries")
+                delay = self.backoff * (2 ** attempt)
+                DebugUtil.debug_print(f"NCBI request failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            metrics.incr("ncbi.requests")
+            metrics.incr(f"ncbi.{endpoint}.requests")
+            metrics.incr("ncbi.bytes", len(response.content or b""))
+            if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                if response.status_code != 200:
+                    metrics.incr("ncbi.errors")
+                return response
+
+            metrics.incr("ncbi.retries")
+
+            delay = _retry_after(response)
+            if delay is None:
+                delay = self.backoff * (2 ** attempt)
+            DebugUtil.debug_print(f"NCBI returned {response.status_code}, retrying in {delay:.1f}s")
+            if response.status_code == 429:
+                # Throttled: hold back every worker, not just this one
+                self.limiter.pause(delay)
+            else:
+                time.sleep(delay)
+        return response
+
+    def esearch(self, params: Dict[str, Any]) -> requests.Response:
+        return self.request("esearch", params)
+
+    def efetch(self, params: Dict[str, Any]) -> requests.Response:
+        return self.request("efetch", params)
+
+    def close(self) -> None:
+        self.session.close()
@@ -0,0 +1,211 @@
+# src/pubmed_papers/pipe/output.py
+
+import csv
+import json
+from abc import ABC, abstractmethod
+import os
+import sys
+from typing import List, Dict, Any, Iterable, Mapping, Optional, TextIO, Tuple
+from pubmed_papers.pipe.records import as_dict
+
+CSV_HEADER = [
+    "PubmedID", "Title", "Publication Date",
+    "Non-academic Author(s)", "Company Affiliation(s)", "Corresponding Author Email"
+]
+
+FORMATS = ["csv", "json", "jsonl"]
+
+def flatten_paper(paper: Mapping) -> Dict[str, Any]:
+    """
+    Collapse a matched paper into the report fields shared by every output format:
+    the industry authors, their companies and the first known email.
+    """
+    non_acad_authors: List[str] = []
+    companies: List[str] = []
+    email = ""
+    for author in paper.get("authors", []):
+        aff = author.get("affiliation", {})
+        if aff.get("company"):
+            non_acad_authors.append(author.get("name", ""))
+            companies.append(aff.get("company", ""))
+            if not email and aff.get("email", "none") != "none":
+                email = aff.get("email") or ""
+    return {
+        "query": paper.get("query", ""),
+        "pubmed_id": paper.get("pubmed_id", ""),
+        "title": paper.get("title", ""),
+        "publication_date": paper.get("publication_date", ""),
+        "authors": non_acad_authors,
+        "companies": companies,
+        "email": email
+    }
+
+class ResultWriter(ABC):
+    """
+    Writes classified papers one at a time and flushes each one, so results show up
+    while the pipeline is still running and the full result set is never held in memory.
+    """
+    def __init__(self, stream: TextIO, owns_stream: bool = True) -> None:
+        self.stream: TextIO = stream
+        self.owns_stream: bool = owns_stream
+        self.count: int = 0
+
+    def write(self, paper: Mapping) -> None:
+        self._write(paper)
+        self.count += 1
+        self.stream.flush()
+
+    def write_all(self, papers: Iterable[Mapping]) -> int:
+        """
+        Write every paper of a (streaming) iterable. Returns the number written.
+        """
+        for paper in papers:
+            self.write(paper)
+        return self.count
+
+    @abstractmethod
+    def _write(self, paper: Mapping) -> None:
+        """
+        Write one paper in the writer's format.
+        """
+
+    def close(self) -> None:
+        self.stream.flush()
+        if self.owns_stream:
+            self.stream.close()
+
+    def __enter__(self) -> "ResultWriter":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+class CSVWriter(ResultWriter):
+    """
+    The CSV report. With `query_column`, a leading Query column holds each paper's query (batch mode).
+    The header is skipped when appending to a non-empty file.
+    """
+    def __init__(self, stream: TextIO, owns_stream: bool = True, query_column: bool = False,
+                 header: bool = True) -> None:
+        super().__init__(stream, owns_stream)
+        self.query_column: bool = query_column
+        self._writer = csv.writer(stream)
+        if header:
+            self._writer.writerow(["Query"] * query_column + CSV_HEADER)
+
+    def _write(self, paper: Mapping) -> None:
+        row = flatten_paper(paper)
+        self._writer.writerow([row["query"]] * self.query_column + [
+            row["pubmed_id"],
+            row["title"],
+            row["publication_date"],
+            "; ".join(row["authors"]),
+            "; ".join(row["companies"]),
+            row["email"]
+        ])
+
+class JSONLinesWriter(ResultWriter):
+    """
+    One full paper object per line; appending is just more lines.
+    """
+    def _write(self, paper: Mapping) -> None:
+        self.stream.write(json.dumps(as_dict(paper), ensure_ascii=False) + "\n")
+
+class JSONArrayWriter(ResultWriter):
+    """
+    A JSON array of full paper objects, written element by element.
+    `continued` means the stream is positioned after the last element of an existing array.
+    """
+    def __init__(self, stream: TextIO, owns_stream: bool = True, continued: bool = False) -> None:
+        super().__init__(stream, owns_stream)
+        self._items: int = int(continued)
+        if not continued:
+            self.stream.write("[")
+
+    def _write(self, paper: Mapping) -> None:
+        element = json.dumps(as_dict(paper), indent=2, ensure_ascii=False).replace("\n", "\n  ")
+        self.stream.write(("," if self._items else "") + "\n  " + element)
+        self._items += 1
+
+    def close(self) -> None:
+        self.stream.write("\n]\n" if self._items else "]\n")
+        super().close()
+
+class TextWriter(ResultWriter):
+    """
+    Human-readable summary for the console.
+    """
+    def __init__(self, stream: Optional[TextIO] = None, owns_stream: bool = False) -> None:
+        super().__init__(stream or sys.stdout, owns_stream)
+
+    def _write(self, paper: Mapping) -> None:
+        row = flatten_paper(paper)
+        if not self.count:
+            print("Matched papers ↓", file=self.stream)
+            print("-" * 40, file=self.stream)
+        if "query" in paper:
+            print(f"Query: {row['query']}", file=self.stream)
+        print(f"PubmedID: {row['pubmed_id']}", file=self.stream)
+        print(f"Title: {row['title']}", file=self.stream)
+        print(f"Publication Date: {row['publication_date']}", file=self.stream)
+        print(f"Non-academic Author(s): {', '.join(row['authors'])}", file=self.stream)
+        print(f"Company Affiliation(s): {', '.join(row['companies'])}", file=self.stream)
+        print(f"Corresponding Author Email: {row['email']}", file=self.stream)
+        print("-" * 40, file=self.stream)
+
+    def close(self) -> None:
+        if not self.count:
+            print("No Matched papers found.", file=self.stream)
+        super().close()
+
+def detect_format(filename: str) -> str:
+    """
+    Output format from the file extension: .csv, .jsonl/.ndjson, anything else is a JSON array.
+    """
+    ext = os.path.splitext(filename)[1].lower()
+    if ext == ".csv":
+        return "csv"
+    if ext in (".jsonl", ".ndjson"):
+        return "jsonl"
+    return "json"
+
+def _reopen_json_array(filename: str) -> Tuple[TextIO, bool]:
+    """
+    Open an existing JSON array for appending: the closing bracket is cut off and the
+    stream is positioned after the last element. Returns (stream, whether the array had elements).
+    Only the tail of the file is read, however large it is.
+    """
+    with open(filename, "rb+") as raw:
+        raw.seek(0, os.SEEK_END)
+        tail_start = max(0, raw.tell() - 64)
+        raw.seek(tail_start)
+        tail = raw.read().rstrip()
+        if not tail.endswith(b"]"):
+            raise ValueError(f"{filename} is not a JSON array")
+        body = tail[:-1].rstrip()
+        has_items = not body.endswith(b"[")
+        # An empty array is rewritten from its opening bracket
+        raw.truncate(tail_start + len(body) - (not has_items))
+    return open(filename, "a", encoding="utf-8"), has_items
+
+def open_writer(filename: Optional[str], fmt: Optional[str] = None, append: bool = False,
+                query_column: bool = False) -> ResultWriter:
+    """
+    Writer for `filename` in `fmt` (default: from the extension), or the console summary
+    when no filename is given. With `append`, results are added to an existing file.
+    """
+    if filename is None:
+        return TextWriter()
+    fmt = fmt or detect_format(filename)
+    exists = append and os.path.exists(filename) and os.path.getsize(filename) > 0
+    if fmt == "csv":
+        stream = open(filename, "a" if append else "w", newline="", encoding="utf-8")
+        return CSVWriter(stream, query_column=query_column, header=not exists)
+    if fmt == "jsonl":
+        return JSONLinesWriter(open(filename, "a" if append else "w", encoding="utf-8"))
+    if fmt == "json":
+        if exists:
+            stream, has_items = _reopen_json_array(filename)
+            return JSONArrayWriter(stream, continued=has_items)
+        return JSONArrayWriter(open(filename, "w", encoding="utf-8"))
+    raise ValueError(f"Unknown output format: {fmt}")
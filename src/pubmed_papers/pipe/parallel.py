@@ -0,0 +1,83 @@
+# src/pubmed_papers/pipe/parallel.py
+
+import multiprocessing
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+from pubmed_papers.pipe.pupmed import parse_page
+from pubmed_papers.pipe.classify import _keyword_verdict, normalize_affiliation
+from pubmed_papers.pipe.metrics import metrics
+from pubmed_papers.pipe.records import Paper, Verdict
+from pubmed_papers.utils import DebugUtil
+
+# (parsed papers, layer-1 verdict per normalized affiliation of those papers)
+ParsedPage = Tuple[List[Paper], Dict[str, Optional[Verdict]]]
+
+def parse_and_match(content: bytes, order: Optional[List[str]] = None) -> ParsedPage:
+    """
+    Worker task: parse one raw efetch page and run the keyword layer on its unique affiliations.
+    """
+    papers = parse_page(content, order)
+    verdicts: Dict[str, Optional[Verdict]] = {}
+    for paper in papers:
+        for author in paper.authors:
+            key = normalize_affiliation(author.affiliation)
+            if key and key not in verdicts:
+                verdicts[key] = _keyword_verdict(author.affiliation)
+    return papers, verdicts
+
+def _init_worker(debug: bool) -> None:
+    # Spawned workers start with a fresh DebugUtil; follow the parent's -d
+    DebugUtil.enabled = debug
+
+def _parse_task(content: bytes, order: Optional[List[str]]) -> Tuple[List[Paper], Dict[str, Optional[Verdict]], Dict[str, Any]]:
+    """
+    `parse_and_match` plus the metrics (parse time) it recorded in the worker, for the parent to merge.
+    """
+    papers, verdicts = parse_and_match(content, order)
+    return papers, verdicts, metrics.drain()
+
+def open_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Process pool for parsing. Workers are spawned rather than forked, because the
+    parent process is already running download and pipeline threads.
+    """
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=_init_worker, initargs=(DebugUtil.enabled,))
+
+def iter_parsed_pages(raw_pages: Iterable[Tuple[bytes, Optional[List[str]]]], pool: Executor,
+                      window: int) -> Iterator[ParsedPage]:
+    """
+    Parse (raw XML, PMID order) pages on `pool`, at most `window` pages at a time, while the
+    caller keeps downloading. Results are yielded in input order, so output is deterministic.
+    The workers' metrics are merged into this process's.
+    """
+    pending: deque = deque()
+    for content, order in raw_pages:
+        pending.append(pool.submit(_parse_task, content, order))
+        if len(pending) >= window:
+            yield _result(pending.popleft())
+    while pending:
+        yield _result(pending.popleft())
+
+def _result(future: Any) -> ParsedPage:
+    with metrics.timer("parse_wait"):
+        papers, verdicts, worker_metrics = future.result()
+    metrics.merge(worker_metrics)
+    return papers, verdicts
+
+def regroup(pages: Iterable[ParsedPage], size: int) -> Iterator[ParsedPage]:
+    """
+    Merge parsed pages into chunks of at least `size` papers (the last one may be smaller).
+    """
+    papers: List[Paper] = []
+    verdicts: Dict[str, Optional[Verdict]] = {}
+    for page_papers, page_verdicts in pages:
+        papers.extend(page_papers)
+        for key, verdict in page_verdicts.items():
+            verdicts.setdefault(key, verdict)
+        if len(papers) >= size:
+            yield papers, verdicts
+            papers, verdicts = [], {}
+    if papers:
+        yield papers, verdicts
@@ -1,18 +1,60 @@
 # src/pubmed_papers/pipe/pupmed.py
 
+import io
 import xml.etree.ElementTree as ET
-from datetime import datetime
-import requests
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import time
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Iterator, Iterable, Callable, Tuple, TypeVar
+from pubmed_papers.pipe.ncbi import NCBIClient
+from pubmed_papers.pipe.cache import MetadataCache
+from pubmed_papers.pipe.metrics import metrics
+from pubmed_papers.pipe.records import Paper, Author
 from pubmed_papers.utils import DebugUtil
 
+# One client for the whole process: every esearch/efetch shares its connections and rate limit
+ncbi = NCBIClient()
+
+T = TypeVar("T")
+
+# esearch sort orders by option name; without one PubMed returns the most recently added first
+SORT_ORDERS = {"relevance": "relevance", "pub_date": "pub_date", "author": "Author", "journal": "JournalName"}
+
+def search_history(query: str, mindate: Optional[str] = None, maxdate: Optional[str] = None,
+                   datetype: str = "edat", sort: Optional[str] = None) -> Tuple[str, str, int]:
+    """
+    Run esearch with usehistory=y so the result set stays on the Entrez History server.
+    `mindate`/`maxdate` (YYYY/MM/DD) restrict the search to a `datetype` window
+    (default: Entrez date, i.e. when the record was added to PubMed).
+    `sort` is one of SORT_ORDERS; the stored result set keeps that order for efetch.
+    Returns (WebEnv, query_key, count); no PMIDs are transferred.
+    """
+    params: Dict[str, Any] = {
+        "db": "pubmed",
+        "term": query,
+        "retmode": "json",
+        "retmax": 0,
+        "usehistory": "y"
+    }
+    if mindate or maxdate:
+        # esearch only honors the window when both ends are given
+        params["datetype"] = datetype
+        params["mindate"] = mindate or "1800/01/01"
+        params["maxdate"] = maxdate or time.strftime("%Y/%m/%d")
+    if sort:
+        params["sort"] = SORT_ORDERS[sort]
+    response = ncbi.esearch(params)
+    response.raise_for_status()
+    result = response.json()['esearchresult']
+    count = int(result['count'])
+    DebugUtil.debug_print(f"Total results: {count}")
+    return result['webenv'], result['querykey'], count
+
 def fetch_pmids(query: str, batch_size: int = 1000) -> List[str]:
     """
     Fetch PubMed IDs (PMIDs) for a given query.
     Returns a list of PMIDs.
     """
-    base_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
     params = {
         "db": "pubmed",
         "term": query,
@@ -23,7 +65,7 @@ def fetch_pmids(query: str, batch_size: int = 1000) -> List[str]:
 
     try:
         # Step 1: Get total count
-        response = requests.get(base_url, params=params)
+        response = ncbi.esearch(params)
         response.raise_for_status()
         data = response.json()
         total = int(data['esearchresult']['count'])
@@ -39,7 +81,7 @@ def fetch_pmids(query: str, batch_size: int = 1000) -> List[str]:
         DebugUtil.debug_print(f"Fetching {start} to {start + batch_size}")
         params.update({"retstart": start, "retmax": batch_size})
         try:
-            response = requests.get(base_url, params=params)
+            response = ncbi.esearch(params)
             response.raise_for_status()
             data = response.json()
             pmids = data['esearchresult']['idlist']
@@ -47,7 +89,6 @@ def fetch_pmids(query: str, batch_size: int = 1000) -> List[str]:
         except Exception as e:
             DebugUtil.debug_print(f"Failed to fetch PMIDs batch starting at {start}: {e}", error=True)
             continue
-        time.sleep(0.34)  # Be nice to NCBI (max 3 requests/second)
 
     return all_pmids
 
@@ -87,58 +128,224 @@ def parse_date(article_node: ET.Element) -> str:
 
     return "1900-01-01"
 
-def fetch_metadata(pubmed_ids: List[str], batch_size: int = 100) -> List[Dict[str, Any]]:
+def _ordered_map(func: Callable[..., T], args: Iterable[Tuple], max_workers: int) -> Iterator[T]:
     """
-    Fetch metadata for a list of PubMed IDs.
-    Returns a list of dictionaries containing metadata for each article.
+    Run `func(*arg)` on a thread pool, keeping at most `max_workers` calls in flight,
+    and yield the results in submission order.
     """
-    all_metadata: List[Dict[str, Any]] = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending: deque = deque()
+        for arg in args:
+            pending.append(executor.submit(func, *arg))
+            if len(pending) >= max_workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
 
-    for i in range(0, len(pubmed_ids), batch_size):
-        batch = pubmed_ids[i:i + batch_size]
-        ids_param = ",".join(batch)
+def _parse_article(article: ET.Element) -> Paper:
+    """
+    Build the metadata record for one <PubmedArticle> element.
+    """
+    # Direct child paths instead of ".//" descents: a full-tree search also walks
+    # PubmedData (history, reference lists), which is often most of the element
+    citation = article.find("MedlineCitation")
+    body = citation.find("Article") if citation is not None else None
+    if body is None:
+        citation = body = article
+    pmid = citation.findtext("PMID")
+    title = body.findtext("ArticleTitle")
+    pub_date = parse_date(body)
 
-        url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi"
-        params = {
-            "db": "pubmed",
-            "id": ids_param,
-            "retmode": "xml"
-        }
+    authors = []
+    for author in body.iterfind("AuthorList/Author"):
+        last = author.findtext("LastName", "")
+        first = author.findtext("ForeName", "")
+        name = f"{first} {last}".strip()
+        aff = author.findtext("AffiliationInfo/Affiliation", "")
+        authors.append(Author(name, aff))
 
+    return Paper(pmid, title, pub_date, authors)
+
+def iter_articles(content: bytes) -> Iterator[Paper]:
+    """
+    Incrementally parse an efetch XML payload, yielding one article record at a time.
+    Each <PubmedArticle> is discarded as soon as it is parsed, so the element tree never
+    holds more than one article.
+    """
+    root = None
+    for event, elem in ET.iterparse(io.BytesIO(content), events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = elem
+            continue
+        if elem.tag != "PubmedArticle":
+            continue
         try:
-            response = requests.get(url, params=params)
-            if response.status_code != 200:
-                DebugUtil.debug_print(f"Failed to fetch batch starting at index {i}")
-                continue
-            root = ET.fromstring(response.content)
+            yield _parse_article(elem)
         except Exception as e:
-            DebugUtil.debug_print(f"Error fetching or parsing metadata batch at index {i}: {e}", error=True)
-            continue
+            DebugUtil.debug_print(f"Error parsing article metadata: {e}", error=True)
+        finally:
+            elem.clear()
+            # Drop the cleared article from the root as well
+            root.clear()
 
-        for article in root.findall(".//PubmedArticle"):
-            try:
-                pmid = article.findtext(".//PMID")
-                title = article.findtext(".//ArticleTitle")
-                pub_date = parse_date(article)
-
-                authors = []
-                for author in article.findall(".//AuthorList/Author"):
-                    last = author.findtext("LastName", "")
-                    first = author.findtext("ForeName", "")
-                    name = f"{first} {last}".strip()
-                    aff = author.findtext(".//Affiliation", "")
-                    authors.append({"name": name, "affiliation": aff})
-
-                all_metadata.append({
-                    "pubmed_id": pmid,
-                    "title": title,
-                    "publication_date": pub_date,
-                    "authors": authors
-                })
-            except Exception as e:
-                DebugUtil.debug_print(f"Error parsing article metadata: {e}", error=True)
-                continue
-
-        time.sleep(0.34)  # Respect NCBI rate limits (3 requests/sec)
-
-    return all_metadata
+def _download(params: Dict[str, Any], index: int) -> bytes:
+    """
+    Download one raw efetch page. `index` is the offset of the page, used in log messages.
+    """
+    try:
+        response = ncbi.efetch(params)
+        if response.status_code != 200:
+            DebugUtil.debug_print(f"Failed to fetch batch starting at index {index}")
+            return b""
+        return response.content
+    except Exception as e:
+        DebugUtil.debug_print(f"Error fetching metadata batch at index {index}: {e}", error=True)
+        return b""
+
+def parse_page(content: bytes, order: Optional[List[str]] = None) -> List[Paper]:
+    """
+    Parse one efetch page. With `order`, articles are sorted into that PMID order
+    (efetch does not promise to echo the requested order).
+    """
+    if not content:
+        return []
+    try:
+        with metrics.timer("parse"):
+            articles = list(iter_articles(content))
+    except Exception as e:
+        DebugUtil.debug_print(f"Error parsing metadata batch: {e}", error=True)
+        return []
+    if order is not None:
+        position = {pmid: pos for pos, pmid in enumerate(order)}
+        articles.sort(key=lambda a: position.get(a.pubmed_id, len(position)))
+    return articles
+
+def _batch_params(batch: List[str]) -> Dict[str, Any]:
+    return {
+        "db": "pubmed",
+        "id": ",".join(batch),
+        "retmode": "xml"
+    }
+
+def _history_params(webenv: str, query_key: str, start: int, batch_size: int) -> Dict[str, Any]:
+    return {
+        "db": "pubmed",
+        "WebEnv": webenv,
+        "query_key": query_key,
+        "retstart": start,
+        "retmax": batch_size,
+        "retmode": "xml"
+    }
+
+def _fetch_batch(index: int, batch: List[str]) -> List[Paper]:
+    """
+    Fetch one batch of explicit PMIDs. Articles are returned in the order of `batch`.
+    """
+    return parse_page(_download(_batch_params(batch), index), batch)
+
+def _fetch_history_page(webenv: str, query_key: str, start: int, batch_size: int) -> List[Paper]:
+    """
+    Fetch one page of a result set stored on the Entrez History server.
+    """
+    return parse_page(_download(_history_params(webenv, query_key, start, batch_size), start))
+
+def iter_raw_pages(pubmed_ids: List[str], batch_size: int = 100, max_workers: int = 4) -> Iterator[Tuple[bytes, List[str]]]:
+    """
+    Download efetch pages for explicit PMIDs without parsing them, yielding
+    (raw XML, requested PMIDs) in order. Used to parse in another process.
+    """
+    batches = [(i, pubmed_ids[i:i + batch_size]) for i in range(0, len(pubmed_ids), batch_size)]
+    args = ((_batch_params(batch), i) for i, batch in batches)
+    for (_, batch), content in zip(batches, _ordered_map(_download, args, max_workers)):
+        yield content, batch
+
+def iter_raw_history_pages(webenv: str, query_key: str, count: int, batch_size: int = 100,
+                           max_workers: int = 4) -> Iterator[Tuple[bytes, None]]:
+    """
+    History server variant of `iter_raw_pages`; pages come back in result order.
+    """
+    args = ((_history_params(webenv, query_key, start, batch_size), start) for start in range(0, count, batch_size))
+    for content in _ordered_map(_download, args, max_workers):
+        yield content, None
+
+def iter_metadata(pubmed_ids: List[str], batch_size: int = 100, max_workers: int = 4) -> Iterator[Paper]:
+    """
+    Stream metadata for a list of PubMed IDs, in PMID order.
+    Batches are fetched concurrently by `max_workers` threads under the shared NCBI rate limit.
+    """
+    starts = range(0, len(pubmed_ids), batch_size)
+    args = ((i, pubmed_ids[i:i + batch_size]) for i in starts)
+    for articles in _ordered_map(_fetch_batch, args, max_workers):
+        yield from articles
+
+def fetch_metadata(pubmed_ids: List[str], batch_size: int = 100, max_workers: int = 4) -> List[Paper]:
+    """
+    Fetch metadata for a list of PubMed IDs.
+    Returns a list of Paper records, in PMID order.
+    """
+    return list(iter_metadata(pubmed_ids, batch_size, max_workers))
+
+def iter_metadata_history(webenv: str, query_key: str, count: int, batch_size: int = 100, max_workers: int = 4) -> Iterator[Paper]:
+    """
+    Stream metadata for a History server result set, page by page via retstart.
+    Pages are fetched concurrently and articles are yielded in result order.
+    """
+    args = ((webenv, query_key, start, batch_size) for start in range(0, count, batch_size))
+    for articles in _ordered_map(_fetch_history_page, args, max_workers):
+        yield from articles
+
+def _fetch_history_uids(webenv: str, query_key: str, start: int, batch_size: int) -> List[str]:
+    """
+    Fetch one page of PMIDs from a History server result set (efetch rettype=uilist).
+    Unlike esearch paging, this is not capped at 9,999 records.
+    """
+    params = {
+        "db": "pubmed",
+        "WebEnv": webenv,
+        "query_key": query_key,
+        "retstart": start,
+        "retmax": batch_size,
+        "rettype": "uilist",
+        "retmode": "text"
+    }
+    try:
+        response = ncbi.efetch(params)
+        response.raise_for_status()
+    except Exception as e:
+        DebugUtil.debug_print(f"Failed to fetch PMIDs batch starting at {start}: {e}", error=True)
+        return []
+    return response.text.split()
+
+def iter_history_pmids(webenv: str, query_key: str, count: int, batch_size: int = 1000, max_workers: int = 4) -> Iterator[List[str]]:
+    """
+    Stream a History server result set as pages of PMIDs.
+    """
+    args = ((webenv, query_key, start, batch_size) for start in range(0, count, batch_size))
+    yield from _ordered_map(_fetch_history_uids, args, max_workers)
+
+def search_pmids(query: str, **options: Any) -> List[str]:
+    """
+    Resolve a query to its full PMID list through the History server (no 9,999 cap).
+    `options` (date window, sort) are passed on to `search_history`.
+    """
+    webenv, query_key, count = search_history(query, **options)
+    return [pmid for page in iter_history_pmids(webenv, query_key, count) for pmid in page]
+
+def iter_metadata_cached(pmid_pages: Iterable[List[str]], cache: MetadataCache, batch_size: int = 100, max_workers: int = 4,
+                         fetch: Optional[Callable[[List[str]], Iterable[Paper]]] = None) -> Iterator[Paper]:
+    """
+    Stream metadata for pages of PMIDs, serving cache hits locally and fetching only the misses
+    (with `fetch`, default iter_metadata). Fetched records are written back to the cache.
+    Articles are yielded in PMID order.
+    """
+    for page in pmid_pages:
+        cached = cache.get_many(page)
+        misses = [pmid for pmid in page if pmid not in cached]
+        articles = fetch(misses) if fetch is not None else iter_metadata(misses, batch_size, max_workers)
+        fetched = {a.pubmed_id: a for a in articles}
+        cache.put_many(fetched.values())
+        for pmid in page:
+            article = cached.get(pmid) or fetched.get(pmid)
+            if article is not None:
+                yield article
@@ -0,0 +1,62 @@
+# src/pubmed_papers/pipe/ratelimit.py
+
+import threading
+import time
+from typing import Optional
+
+class TokenBucket:
+    """
+    Thread-safe token bucket shared by every worker that talks to one API.
+    Tokens refill continuously at `rate` per second up to `capacity`.
+    """
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        self.rate: float = float(rate)
+        self.capacity: float = float(capacity) if capacity is not None else 1.0
+        self._tokens: float = self.capacity
+        self._updated: float = time.monotonic()
+        self._paused_until: float = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        """
+        Block until `tokens` are available, then consume them.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._refill(now)
+                    if self._tokens >= tokens:
+                        self._tokens -= tokens
+                        return
+                    wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def settle(self, reserved: float, used: float) -> None:
+        """
+        Correct an estimated acquire once the real cost is known: unused tokens are given
+        back, an overrun is charged (the balance may go negative, delaying later acquires).
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens + reserved - used)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Stop handing out tokens for `seconds` (e.g. after a 429 with Retry-After).
+        Applies to every consumer of the bucket, not just the caller.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + seconds)
+            # Drain the bucket so requests resume at the steady rate after the pause
+            self._tokens = 0.0
+            self._updated = self._paused_until
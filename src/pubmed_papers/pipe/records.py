@@ -0,0 +1,144 @@
+# src/pubmed_papers/pipe/records.py
+
+import sys
+from collections.abc import Mapping
+from typing import List, Dict, Any, Iterator, Optional, Union
+
+class _Record(Mapping):
+    """
+    Slotted record with a read-only mapping view (`paper["title"]`, `paper.get(...)`),
+    so code written against the old plain dicts keeps working. Optional fields that are
+    None are absent from the view, like a missing dict key.
+    """
+    __slots__ = ()
+    _optional: tuple = ()
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self.__slots__:
+            value = getattr(self, key)
+            if value is not None or key not in self._optional:
+                return value
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return (key for key in self.__slots__ if key not in self._optional or getattr(self, key) is not None)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{key}={getattr(self, key)!r}" for key in self)
+        return f"{type(self).__name__}({fields})"
+
+class Verdict(_Record):
+    """
+    An industry verdict for one affiliation. One instance is shared by every author with
+    that affiliation; treat it as immutable.
+    """
+    __slots__ = ("company", "email")
+
+    def __init__(self, company: str, email: str = "none") -> None:
+        self.company: str = sys.intern(company)
+        self.email: str = email
+
+    @classmethod
+    def of(cls, verdict: Optional[Mapping]) -> Optional["Verdict"]:
+        """
+        Verdict from a classifier's {"company", "email"} dict; None stays None.
+        """
+        if verdict is None or isinstance(verdict, Verdict):
+            return verdict
+        return cls(str(verdict.get("company", "none")), str(verdict.get("email", "none")))
+
+    def to_dict(self) -> Dict[str, str]:
+        return {"company": self.company, "email": self.email}
+
+    def __reduce__(self) -> tuple:
+        # Rebuilt through __init__, so strings are re-interned after crossing a process boundary
+        return (Verdict, (self.company, self.email))
+
+class Author(_Record):
+    """
+    A paper author. `affiliation` is the raw affiliation text (interned: co-authors from
+    the same institution share one string) or, for matched authors, their Verdict.
+    """
+    __slots__ = ("name", "affiliation")
+
+    def __init__(self, name: str, affiliation: Union[str, Verdict] = "") -> None:
+        self.name: str = name
+        self.affiliation: Union[str, Verdict] = sys.intern(affiliation) if isinstance(affiliation, str) else affiliation
+
+    def __reduce__(self) -> tuple:
+        return (Author, (self.name, self.affiliation))
+
+    def to_dict(self) -> Dict[str, Any]:
+        affiliation = self.affiliation
+        return {"name": self.name, "affiliation": affiliation if isinstance(affiliation, str) else affiliation.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data: Mapping) -> "Author":
+        affiliation = data.get("affiliation") or ""
+        return cls(data.get("name", ""), affiliation if isinstance(affiliation, str) else Verdict.of(affiliation))
+
+class Paper(_Record):
+    """
+    Article metadata. `query` is only set in batch mode, for the query a match belongs to.
+    """
+    __slots__ = ("pubmed_id", "title", "publication_date", "authors", "query")
+    _optional = ("query",)
+
+    def __init__(self, pubmed_id: Optional[str], title: Optional[str], publication_date: str,
+                 authors: List[Author], query: Optional[str] = None) -> None:
+        self.pubmed_id: Optional[str] = pubmed_id
+        self.title: Optional[str] = title
+        self.publication_date: str = publication_date
+        self.authors: List[Author] = authors
+        self.query: Optional[str] = query
+
+    def with_authors(self, authors: List[Author]) -> "Paper":
+        """
+        Copy of the paper with a different author list (e.g. only the matched authors).
+        """
+        return Paper(self.pubmed_id, self.title, self.publication_date, authors, self.query)
+
+    def with_query(self, query: Optional[str]) -> "Paper":
+        return Paper(self.pubmed_id, self.title, self.publication_date, self.authors, query)
+
+    def __reduce__(self) -> tuple:
+        return (Paper, (self.pubmed_id, self.title, self.publication_date, self.authors, self.query))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Plain dict for the JSON boundary (output files, caches).
+        """
+        data: Dict[str, Any] = {
+            "pubmed_id": self.pubmed_id,
+            "title": self.title,
+            "publication_date": self.publication_date,
+            "authors": [author.to_dict() for author in self.authors]
+        }
+        if self.query is not None:
+            data["query"] = self.query
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Mapping) -> "Paper":
+        return cls(
+            data.get("pubmed_id"),
+            data.get("title"),
+            data.get("publication_date", ""),
+            [Author.from_dict(author) for author in data.get("authors", [])],
+            data.get("query")
+        )
+
+def as_paper(paper: Mapping) -> Paper:
+    """
+    The paper as a Paper record; plain dicts (e.g. from older callers) are converted.
+    """
+    return paper if isinstance(paper, Paper) else Paper.from_dict(paper)
+
+def as_dict(paper: Mapping) -> Dict[str, Any]:
+    """
+    The paper as a plain, JSON-serializable dict.
+    """
+    return paper.to_dict() if isinstance(paper, Paper) else dict(paper)
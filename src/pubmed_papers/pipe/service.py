@@ -0,0 +1,205 @@
+# src/pubmed_papers/pipe/service.py
+
+import io
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+from pubmed_papers.pipe.controller import PubMedController
+from pubmed_papers.pipe.metrics import metrics
+from pubmed_papers.pipe.output import CSVWriter, JSONLinesWriter, JSONArrayWriter
+from pubmed_papers.pipe.records import Paper
+from pubmed_papers.utils import DebugUtil
+
+WRITERS = {"csv": CSVWriter, "jsonl": JSONLinesWriter, "json": JSONArrayWriter}
+CONTENT_TYPES = {"csv": "text/csv", "jsonl": "application/x-ndjson", "json": "application/json"}
+
+class Flight:
+    """
+    One pipeline execution, shared by every caller that asked for the same request.
+    Results are appended as they are produced; readers follow along at their own pace
+    and, once the run is done, the same object serves as the cached result.
+    """
+    def __init__(self) -> None:
+        self.papers: List[Paper] = []
+        self.done: bool = False
+        self.error: Optional[BaseException] = None
+        self.finished: float = 0.0
+        self._cond = threading.Condition()
+
+    def run(self, papers: Iterator[Paper]) -> None:
+        """
+        Drain a pipeline stream into the flight, waking readers after every paper.
+        """
+        try:
+            for paper in papers:
+                with self._cond:
+                    self.papers.append(paper)
+                    self._cond.notify_all()
+        except BaseException as e:
+            self.error = e
+        finally:
+            with self._cond:
+                self.done = True
+                self.finished = time.monotonic()
+                self._cond.notify_all()
+
+    def follow(self) -> Iterator[Paper]:
+        """
+        Every paper of the flight, from the first one, waiting for new ones until the run ends.
+        Re-raises the run's error once the papers produced before it were delivered.
+        """
+        position = 0
+        while True:
+            with self._cond:
+                while position >= len(self.papers) and not self.done:
+                    self._cond.wait()
+                batch = self.papers[position:]
+                done, error = self.done, self.error
+            yield from batch
+            position += len(batch)
+            if done and position >= len(self.papers):
+                if error is not None:
+                    raise error
+                return
+
+class PaperService:
+    """
+    Runs pipelines for a long-lived process: one warm controller (HTTP sessions, compiled
+    matchers, LLM client, caches) serves every request. Identical concurrent requests are
+    coalesced into one execution, and finished results are reused for `result_ttl` seconds.
+    """
+    def __init__(self, controller: PubMedController, result_ttl: float = 600.0, max_cached: int = 256) -> None:
+        self.controller: PubMedController = controller
+        self.result_ttl: float = result_ttl
+        # Finished result sets kept for reuse; the least recently used are dropped first
+        self.max_cached: int = max_cached
+        self._flights: "OrderedDict[Tuple[str, str], Flight]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(query: str, mode: str) -> Tuple[str, str]:
+        return mode, " ".join(query.split())
+
+    def _start(self, query: str, mode: str) -> Iterator[Paper]:
+        if mode == "pmids":
+            return self.controller.stream_for_pmids([p.strip() for p in query.split(",") if p.strip()])
+        return self.controller.stream(query)
+
+    def papers(self, query: str, mode: str = "query") -> Iterator[Paper]:
+        """
+        Stream the matched papers for `query` (or a comma-separated PMID list with mode="pmids"),
+        joining a running or recently finished execution of the same request when there is one.
+        """
+        key = self.key(query, mode)
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None and flight.done and (
+                    flight.error is not None or time.monotonic() - flight.finished > self.result_ttl):
+                flight = None
+            if flight is None:
+                flight = Flight()
+                self._flights[key] = flight
+                self._evict()
+                metrics.incr("service.executions")
+                threading.Thread(target=flight.run, args=(self._start(query, mode),), daemon=True).start()
+            else:
+                metrics.incr("service.coalesced" if not flight.done else "service.result_hits")
+            self._flights.move_to_end(key)
+        return flight.follow()
+
+    def _evict(self) -> None:
+        finished = [key for key, flight in self._flights.items() if flight.done]
+        for key in finished[:max(0, len(finished) - self.max_cached)]:
+            del self._flights[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            running = sum(1 for flight in self._flights.values() if not flight.done)
+            return {"status": "ok", "running": running, "cached": len(self._flights) - running}
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """
+    GET /papers?query=...|pmids=1,2,3[&format=jsonl|json|csv] streams results as they are classified;
+    GET /health and GET /metrics report on the service.
+    """
+    server: "ServiceServer"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        DebugUtil.debug_print(f"{self.address_string()} {format % args}")
+
+    def _send(self, status: int, body: str, content_type: str = "application/json") -> None:
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        if url.path == "/health":
+            self._send(200, json.dumps(self.server.service.stats()))
+        elif url.path == "/metrics":
+            self._send(200, metrics.to_prometheus(), "text/plain; version=0.0.4")
+        elif url.path == "/papers":
+            self._papers(params)
+        else:
+            self._send(404, json.dumps({"error": "not found"}))
+
+    def _papers(self, params: Dict[str, str]) -> None:
+        fmt = params.get("format", "jsonl")
+        mode = "pmids" if "pmids" in params else "query"
+        query = params.get(mode, "").strip()
+        if fmt not in WRITERS or not query:
+            self._send(400, json.dumps({"error": "give query= or pmids=, and format= one of csv, json, jsonl"}))
+            return
+        papers = self.server.service.papers(query, mode)
+        try:
+            # Wait for the first result (or the end of the run) before committing to a 200
+            first: List[Paper] = [next(papers)]
+        except StopIteration:
+            first = []
+        except Exception as e:
+            self._send(502, json.dumps({"error": str(e)}))
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPES[fmt])
+        # HTTP/1.0 without Content-Length: the body ends when the connection closes
+        self.end_headers()
+        stream = io.TextIOWrapper(self.wfile, encoding="utf-8", newline="", write_through=True)
+        writer = WRITERS[fmt](stream, owns_stream=False)
+        try:
+            writer.write_all(first)
+            writer.write_all(papers)
+            writer.close()
+        except Exception as e:
+            # Headers are gone; a truncated body is all the client can be told
+            DebugUtil.debug_print(f"Streaming {mode} {query!r} failed: {e}")
+        finally:
+            stream.detach()
+
+class ServiceServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], service: PaperService) -> None:
+        super().__init__(address, ServiceHandler)
+        self.service: PaperService = service
+
+def serve(controller: PubMedController, host: str = "127.0.0.1", port: int = 8080, result_ttl: float = 600.0) -> None:
+    """
+    Serve `controller` over HTTP until interrupted.
+    """
+    server = ServiceServer((host, port), PaperService(controller, result_ttl))
+    print(f"Serving on http://{host}:{server.server_port}", file=sys.stderr, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,238 @@
+# src/pubmed_papers/pipe/shard.py
+
+import json
+import os
+import socket
+import threading
+import time
+from typing import List, Dict, Any, Iterator, Optional
+from pubmed_papers.pipe.controller import PubMedController
+from pubmed_papers.pipe.output import JSONLinesWriter
+from pubmed_papers.pipe.records import Paper
+from pubmed_papers.utils import DebugUtil
+
+class ShardQueue:
+    """
+    File-based work queue for sharded runs, in a directory every node can reach:
+
+        manifest.json          query and shard count; written last, so its presence means ready
+        shards/00000.pmids     one PMID per line
+        shards/00000.lock      claim of the worker processing the shard (created exclusively)
+        shards/00000.jsonl     matched papers; renamed into place, so it only exists once complete
+
+    Workers claim shards by creating the lock file with O_EXCL, which is atomic on local
+    disks and NFSv3+, and write their worker id into it. A busy worker touches its lock from
+    a background thread (see `Heartbeat`); a claim whose lock was not touched for
+    `stale_after` seconds is considered abandoned (crashed worker) and may be taken over.
+    Workers only touch or remove a lock that holds their own id.
+    """
+    def __init__(self, directory: str, stale_after: float = 3600.0) -> None:
+        self.directory: str = directory
+        self.shard_dir: str = os.path.join(directory, "shards")
+        self.stale_after: float = stale_after
+
+    def _path(self, shard: int, ext: str) -> str:
+        return os.path.join(self.shard_dir, f"{shard:05d}.{ext}")
+
+    def create(self, query: str, pmids: List[str], shard_size: int = 5000) -> int:
+        """
+        Coordinator step: split `pmids` into shards of `shard_size`. Returns the number of shards.
+        """
+        if os.path.exists(os.path.join(self.directory, "manifest.json")):
+            DebugUtil.debug_print(f"{self.directory} already holds a sharded run", error=True)
+        os.makedirs(self.shard_dir, exist_ok=True)
+        shards = 0
+        for start in range(0, len(pmids), shard_size):
+            with open(self._path(shards, "pmids"), "w", encoding="utf-8") as f:
+                f.write("\n".join(pmids[start:start + shard_size]) + "\n")
+            shards += 1
+        manifest = {"query": query, "pmids": len(pmids), "shard_size": shard_size, "shards": shards,
+                    "created": time.time()}
+        tmp = os.path.join(self.directory, "manifest.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, os.path.join(self.directory, "manifest.json"))
+        return shards
+
+    def manifest(self) -> Dict[str, Any]:
+        try:
+            with open(os.path.join(self.directory, "manifest.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except OSError:
+            DebugUtil.debug_print(f"No sharded run in {self.directory} (manifest.json missing)", error=True)
+            return {}
+
+    def done(self, shard: int) -> bool:
+        return os.path.exists(self._path(shard, "jsonl"))
+
+    def claim(self, worker: str) -> Optional[int]:
+        """
+        Claim the first unfinished, unclaimed (or abandoned) shard for `worker`; None when there is none.
+        """
+        for shard in range(self.manifest()["shards"]):
+            if self.done(shard):
+                continue
+            lock = self._path(shard, "lock")
+            try:
+                if time.time() - os.path.getmtime(lock) > self.stale_after:
+                    self._break_stale(shard, worker)
+            except OSError:
+                pass
+            try:
+                fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                continue
+            with os.fdopen(fd, "w") as f:
+                f.write(f"{worker}\n")
+            # Finished between our check and the claim
+            if self.done(shard):
+                os.remove(lock)
+                continue
+            return shard
+        return None
+
+    def _break_stale(self, shard: int, worker: str) -> None:
+        """
+        Remove a lock found stale. Only one of several workers noticing it wins the rename; the
+        mtime is checked again afterwards, since the lock renamed may be one another worker
+        created (or heartbeated) after our check, which is put back then.
+        """
+        lock = self._path(shard, "lock")
+        stale = f"{lock}.stale.{worker}"
+        os.rename(lock, stale)
+        if time.time() - os.path.getmtime(stale) > self.stale_after:
+            os.remove(stale)
+            DebugUtil.debug_print(f"Shard {shard}: taking over an abandoned claim")
+            return
+        try:
+            # Never overwrites a lock created in the meantime
+            os.link(stale, lock)
+        finally:
+            os.remove(stale)
+
+    def owner(self, shard: int) -> Optional[str]:
+        """
+        Worker id in a shard's lock, or None if the shard is not claimed.
+        """
+        try:
+            with open(self._path(shard, "lock"), encoding="utf-8") as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            return None
+
+    def heartbeat(self, shard: int, worker: str) -> bool:
+        """
+        Keep `worker`'s claim fresh so it is not taken over while the worker is still busy.
+        Returns False if the claim is no longer this worker's.
+        """
+        if self.owner(shard) != worker:
+            return False
+        try:
+            os.utime(self._path(shard, "lock"))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def release(self, shard: int, worker: str) -> None:
+        """
+        Remove `worker`'s claim; a lock another worker took over in the meantime is left alone.
+        """
+        if self.owner(shard) != worker:
+            return
+        try:
+            os.remove(self._path(shard, "lock"))
+        except FileNotFoundError:
+            pass
+
+    def pmids(self, shard: int) -> List[str]:
+        with open(self._path(shard, "pmids"), encoding="utf-8") as f:
+            return [line.strip() for line in f if line.strip()]
+
+    def complete(self, shard: int, papers: Iterator[Paper], worker: str) -> int:
+        """
+        Write a shard's matched papers, publishing the output atomically, and release
+        `worker`'s claim. Returns the count.
+        """
+        tmp = f"{self._path(shard, 'jsonl')}.{os.getpid()}.tmp"
+        with JSONLinesWriter(open(tmp, "w", encoding="utf-8")) as writer:
+            for paper in papers:
+                writer.write(paper)
+        os.replace(tmp, self._path(shard, "jsonl"))
+        self.release(shard, worker)
+        return writer.count
+
+    def status(self) -> Dict[str, int]:
+        shards = self.manifest()["shards"]
+        done = sum(1 for shard in range(shards) if self.done(shard))
+        claimed = sum(1 for shard in range(shards) if not self.done(shard) and os.path.exists(self._path(shard, "lock")))
+        return {"shards": shards, "done": done, "claimed": claimed, "pending": shards - done - claimed}
+
+    def results(self) -> Iterator[Paper]:
+        """
+        Merge step: every shard's matched papers, in shard (and so PMID) order.
+        Fails if any shard is not finished yet.
+        """
+        status = self.status()
+        if status["done"] < status["shards"]:
+            DebugUtil.debug_print(
+                f"Sharded run incomplete: {status['done']} of {status['shards']} shards done", error=True
+            )
+        for shard in range(status["shards"]):
+            with open(self._path(shard, "jsonl"), encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        yield Paper.from_dict(json.loads(line))
+
+class Heartbeat:
+    """
+    Touches a worker's lock every `stale_after / 4` seconds from a background thread while
+    the shard is processed, however long it takes until the first paper matches.
+    """
+    def __init__(self, queue: ShardQueue, shard: int, worker: str) -> None:
+        self.queue: ShardQueue = queue
+        self.shard: int = shard
+        self.worker: str = worker
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"heartbeat-{shard}", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.queue.stale_after / 4):
+            try:
+                if not self.queue.heartbeat(self.shard, self.worker):
+                    DebugUtil.debug_print(f"Worker {self.worker}: lost the claim on shard {self.shard}")
+                    return
+            except OSError as e:
+                DebugUtil.debug_print(f"Worker {self.worker}: heartbeat of shard {self.shard} failed: {e}")
+
+    def __enter__(self) -> "Heartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def work(queue: ShardQueue, controller: PubMedController, worker: Optional[str] = None) -> int:
+    """
+    Worker loop: claim shards, fetch and classify their PMIDs, publish the results,
+    until no shard is left. Returns the number of shards this worker completed.
+    """
+    worker = worker or worker_id()
+    completed = 0
+    while True:
+        shard = queue.claim(worker)
+        if shard is None:
+            return completed
+        DebugUtil.debug_print(f"Worker {worker}: processing shard {shard}")
+        try:
+            with Heartbeat(queue, shard, worker):
+                matched = queue.complete(shard, controller.stream_for_pmids(queue.pmids(shard)), worker)
+        except BaseException:
+            # Hand the shard back so another worker can retry it
+            queue.release(shard, worker)
+            raise
+        DebugUtil.debug_print(f"Worker {worker}: shard {shard} done, {matched} matched")
+        completed += 1
@@ -0,0 +1,73 @@
+# src/pubmed_papers/pipe/stream.py
+
+import queue
+import threading
+from typing import Iterable, Iterator, List, TypeVar
+
+T = TypeVar("T")
+
+_DONE = object()
+
+class _Failure:
+    def __init__(self, error: BaseException) -> None:
+        self.error = error
+
+def chunked(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    """
+    Group an iterable into lists of at most `size` items.
+    """
+    chunk: List[T] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def prefetch(items: Iterable[T], maxsize: int = 2) -> Iterator[T]:
+    """
+    Drive `items` on a background thread, buffering at most `maxsize` values ahead of the consumer.
+    Lets one pipeline stage run while the next one is still busy. Exceptions raised by the
+    producer are re-raised in the consumer; closing the returned generator stops the producer.
+    """
+    buffer: "queue.Queue" = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(value: object) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(value, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        iterator = iter(items)
+        try:
+            for item in iterator:
+                if not put(item):
+                    return
+            put(_DONE)
+        except BaseException as e:
+            put(_Failure(e))
+        finally:
+            # Release upstream resources (thread pools, sockets) when stopped early
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    worker = threading.Thread(target=produce, daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        worker.join()
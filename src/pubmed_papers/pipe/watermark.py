@@ -0,0 +1,86 @@
+# src/pubmed_papers/pipe/watermark.py
+
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Iterable, Optional
+from pubmed_papers.pipe.cache import _SQL_CHUNK
+from pubmed_papers.utils import DebugUtil
+
+class WatermarkStore:
+    """
+    Per-query state for incremental runs: the Entrez date of the last completed run
+    and every PMID that run (or an earlier one) already processed.
+    Unlike the caches, entries never expire.
+    """
+    def __init__(self, cache_dir: str) -> None:
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path: str = os.path.join(cache_dir, "watermarks.sqlite3")
+        self._lock = threading.Lock()
+        # The pipeline filters PMIDs from its worker threads
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS watermarks (query TEXT PRIMARY KEY, last_run TEXT NOT NULL, updated REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen (query TEXT NOT NULL, pmid TEXT NOT NULL, PRIMARY KEY (query, pmid))"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def key(query: str) -> str:
+        return " ".join(query.split())
+
+    def last_run(self, query: str) -> Optional[str]:
+        """
+        Entrez date (YYYY/MM/DD) of the last completed run of `query`, or None if it never ran.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_run FROM watermarks WHERE query = ?", (self.key(query),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def unseen(self, query: str, pmids: List[str]) -> List[str]:
+        """
+        The PMIDs of `pmids` that no earlier run of `query` processed, in order.
+        """
+        key = self.key(query)
+        seen = set()
+        with self._lock:
+            for i in range(0, len(pmids), _SQL_CHUNK):
+                chunk = pmids[i:i + _SQL_CHUNK]
+                marks = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT pmid FROM seen WHERE query = ? AND pmid IN ({marks})", (key, *chunk)
+                ).fetchall()
+                seen.update(pmid for (pmid,) in rows)
+        return [pmid for pmid in pmids if pmid not in seen]
+
+    def advance(self, query: str, run_date: str, pmids: Iterable[str]) -> None:
+        """
+        Record a completed run: mark `pmids` as seen and move the watermark to `run_date`.
+        """
+        key = self.key(query)
+        with self._lock:
+            self._conn.executemany("INSERT OR IGNORE INTO seen VALUES (?, ?)", ((key, pmid) for pmid in pmids))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO watermarks VALUES (?, ?, ?)", (key, run_date, time.time())
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+def open_watermarks(cache_dir: str) -> Optional[WatermarkStore]:
+    """
+    Open the watermark store, or return None if it cannot be opened.
+    """
+    try:
+        return WatermarkStore(cache_dir)
+    except (OSError, sqlite3.Error) as e:
+        DebugUtil.debug_print(f"Watermark store unavailable: {e}")
+        return None
@@ -0,0 +1,24 @@
+import sys
+from pubmed_papers.main import main as start_main
+
+def test_split_with_repeated_queries(monkeypatch, tmp_path):
+    """
+    Test that a query repeated in the --queries file is run once and its --split file gets its results.
+    """
+    from pubmed_papers.pipe.controller import PubMedController
+    from pubmed_papers.pipe.records import Paper, Author, Verdict
+
+    def fake_stream_many(self, queries, max_workers=4):
+        assert queries == ["crispr", "mrna"]
+        for query in queries:
+            yield query, Paper(f"{query}-1", "Title", "2024", [Author("Jane Doe", Verdict("Acme"))])
+
+    monkeypatch.setattr(PubMedController, "stream_many", fake_stream_many)
+    queries = tmp_path / "queries.txt"
+    queries.write_text("crispr\nmrna\ncrispr\n", encoding="utf-8")
+    monkeypatch.setattr(sys, "argv", ["get-papers-list", "--queries", str(queries), "--split", "--keyword-only",
+                                      "--no-cache", "-f", str(tmp_path / "results.csv")])
+    start_main()
+    assert "crispr-1" in (tmp_path / "results.1.csv").read_text(encoding="utf-8")
+    assert "mrna-1" in (tmp_path / "results.2.csv").read_text(encoding="utf-8")
+    assert not (tmp_path / "results.3.csv").exists()
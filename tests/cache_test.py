@@ -0,0 +1,93 @@
+import time
+from pubmed_papers.pipe import pupmed
+from pubmed_papers.pipe.cache import MetadataCache, VerdictCache
+from pubmed_papers.pipe.records import Paper
+
+def make_paper(pmid):
+    return {"pubmed_id": pmid, "title": f"Title {pmid}", "publication_date": "2024-01-01",
+            "authors": [{"name": "Jane Doe", "affiliation": "Acme Inc"}]}
+
+def test_hits_and_misses(tmp_path):
+    """
+    Test that stored records are served back and counted as hits.
+    """
+    cache = MetadataCache(str(tmp_path))
+    cache.put_many([make_paper("1"), make_paper("2")])
+    found = cache.get_many(["1", "2", "3"])
+    assert found["1"] == make_paper("1")
+    assert set(found) == {"1", "2"}
+    assert (cache.hits, cache.misses) == (2, 1)
+
+def test_ttl_expiry(tmp_path):
+    """
+    Test that records older than the TTL are treated as misses.
+    """
+    cache = MetadataCache(str(tmp_path), ttl=0.05)
+    cache.put_many([make_paper("1")])
+    time.sleep(0.1)
+    assert cache.get_many(["1"]) == {}
+
+def test_lru_eviction(tmp_path):
+    """
+    Test that the least recently used records are evicted past max_entries.
+    """
+    cache = MetadataCache(str(tmp_path), max_entries=2)
+    cache.put_many([make_paper("1"), make_paper("2")])
+    time.sleep(0.01)
+    cache.get_many(["1"])
+    time.sleep(0.01)
+    cache.put_many([make_paper("3")])
+    assert set(cache.get_many(["1", "2", "3"])) == {"1", "3"}
+
+def test_eviction_is_periodic(tmp_path, monkeypatch):
+    """
+    Test that the size bound is enforced every max_entries / 100 writes instead of on each write.
+    """
+    cache = MetadataCache(str(tmp_path), max_entries=1000)
+    evictions = []
+    evict = cache._evict
+    monkeypatch.setattr(cache, "_evict", lambda: evictions.append(1) or evict())
+    for pmid in range(25):
+        cache.put_many([make_paper(str(pmid))])
+    assert len(evictions) == 2
+    indexes = {row[1] for row in cache._conn.execute("PRAGMA index_list(metadata)")}
+    assert {"metadata_created", "metadata_accessed"} <= indexes
+
+def test_only_misses_are_fetched(tmp_path, monkeypatch):
+    """
+    Test that the cached fetch path sends only uncached PMIDs to efetch.
+    """
+    requested = []
+
+    def fake_iter_metadata(pmids, batch_size, max_workers):
+        requested.extend(pmids)
+        return iter([Paper.from_dict(make_paper(p)) for p in pmids])
+
+    monkeypatch.setattr(pupmed, "iter_metadata", fake_iter_metadata)
+    cache = MetadataCache(str(tmp_path))
+    cache.put_many([make_paper("2")])
+    papers = list(pupmed.iter_metadata_cached([["1", "2", "3"]], cache))
+    assert [p["pubmed_id"] for p in papers] == ["1", "2", "3"]
+    assert requested == ["1", "3"]
+    assert set(cache.get_many(["1", "3"])) == {"1", "3"}
+
+def test_verdict_fingerprint_is_versioned():
+    """
+    Test that verdict keys ignore formatting but change with the model or prompt version.
+    """
+    key = VerdictCache.fingerprint("Pfizer Inc.,  Groton", "model-a", "v1")
+    assert key == VerdictCache.fingerprint("pfizer inc., groton", "model-a", "v1")
+    assert key != VerdictCache.fingerprint("Pfizer Inc., Groton", "model-b", "v1")
+    assert key != VerdictCache.fingerprint("Pfizer Inc., Groton", "model-a", "v2")
+
+def test_verdict_cache_round_trip(tmp_path):
+    """
+    Test that academic and industry verdicts are both cached.
+    """
+    cache = VerdictCache(str(tmp_path))
+    cache.put_many([("a", {"industry": True, "company": "Pfizer", "email": "none"}),
+                    ("b", {"industry": False, "company": "none", "email": "none"})])
+    found = cache.get_many(["a", "b", "c"])
+    assert found["a"]["company"] == "Pfizer"
+    assert found["b"]["industry"] is False
+    assert "c" not in found
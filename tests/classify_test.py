@@ -0,0 +1,88 @@
+from pubmed_papers.pipe import classify
+
+class FakeBackend(classify.ClassifierBackend):
+    name = "fake"
+
+    def __init__(self, decide):
+        self.decide = decide
+        self.calls = []
+
+    def classify(self, affiliations):
+        self.calls.append(list(affiliations))
+        return {idx: verdict for idx, verdict in enumerate(map(self.decide, affiliations)) if verdict != "skip"}
+
+def make_paper(pmid, *affiliations):
+    return {"pubmed_id": pmid, "title": "", "publication_date": "",
+            "authors": [{"name": f"Author {i}", "affiliation": aff} for i, aff in enumerate(affiliations)]}
+
+def test_each_affiliation_classified_once():
+    """
+    Test that repeated affiliations reach the LLM once and the verdict is mapped back to every author.
+    """
+    backend = FakeBackend(lambda aff: {"company": "Genentech", "email": "none"} if "genentech" in aff.lower() else None)
+    papers = [
+        make_paper("1", "Pfizer Inc., Groton, CT", "Harvard University"),
+        make_paper("2", "Genentech, South San Francisco", "GENENTECH,  South San Francisco"),
+        make_paper("3", "Genentech, South San Francisco", ""),
+    ]
+    matched = classify.filter_biotech_papers(papers, backends=[backend])
+
+    assert [p["pubmed_id"] for p in matched] == ["1", "2", "3"]
+    assert matched[0]["authors"] == [{"name": "Author 0", "affiliation": {"company": "Pfizer Inc.", "email": "none"}}]
+    assert len(matched[1]["authors"]) == 2
+    assert backend.calls == [["Genentech, South San Francisco"]]
+
+def test_academic_affiliations_are_triaged():
+    """
+    Test that affiliations hitting the exclude keywords never reach the LLM.
+    """
+    backend = FakeBackend(lambda aff: None)
+    papers = [make_paper("1", "Dept. of Biology, Stanford University", "", "Mayo Clinic Hospital")]
+    assert classify.filter_biotech_papers(papers, backends=[backend]) == []
+    assert backend.calls == []
+
+def test_backends_only_see_undecided_affiliations():
+    """
+    Test that a later backend only receives what earlier backends left undecided.
+    """
+    local = FakeBackend(lambda aff: {"company": "Acme", "email": "none"} if "Acme" in aff else "skip")
+    remote = FakeBackend(lambda aff: None)
+    papers = [make_paper("1", "Acme, Boston"), make_paper("2", "Foo Labs, Paris")]
+    matched = classify.filter_biotech_papers(papers, backends=[local, remote])
+    assert [p["pubmed_id"] for p in matched] == ["1"]
+    assert remote.calls == [["Foo Labs, Paris"]]
+
+def test_output_does_not_depend_on_the_other_papers_of_a_chunk():
+    """
+    Test that a paper matched by layer 1 gets the same authors whether or not
+    layer 2 runs on other papers of the same call.
+    """
+    decide = lambda aff: {"company": "Genentech", "email": "none"} if "Genentech" in aff else None
+    alone = make_paper("1", "Pfizer Inc., Groton, CT", "Genentech, South San Francisco")
+    other = make_paper("2", "Genentech, South San Francisco")
+    by_itself = classify.filter_biotech_papers([alone], backends=[FakeBackend(decide)])
+    together = classify.filter_biotech_papers([alone, other], backends=[FakeBackend(decide)])
+    assert together[0] == by_itself[0]
+    assert [a["name"] for a in together[0]["authors"]] == ["Author 0"]
+    assert [p["pubmed_id"] for p in together] == ["1", "2"]
+
+def test_llm_companies_feed_the_gazetteer(tmp_path):
+    """
+    Test that a company confirmed by layer 2 is recognized by layer 1 on the next run.
+    """
+    from pubmed_papers.pipe.gazetteer import Gazetteer
+
+    class NamingBackend(FakeBackend):
+        names_companies = True
+
+    backend = NamingBackend(lambda aff: {"company": "Genentech", "email": "none"} if "Genentech" in aff else None)
+    classify.set_gazetteer(Gazetteer(str(tmp_path), min_confirmations=1))
+    try:
+        papers = [make_paper("1", "Genentech, South San Francisco")]
+        assert len(classify.filter_biotech_papers(papers, backends=[backend])) == 1
+        papers = [make_paper("2", "Oncology Dept, Genentech, San Francisco")]
+        matched = classify.filter_biotech_papers(papers, backends=[backend])
+    finally:
+        classify.set_gazetteer(None)
+    assert matched[0]["authors"][0]["affiliation"]["company"] == "Genentech"
+    assert backend.calls == [["Genentech, South San Francisco"]]
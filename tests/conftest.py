@@ -0,0 +1,31 @@
+import importlib.util
+from pathlib import Path
+import pytest
+
+BENCHMARKS = Path(__file__).resolve().parents[1] / "benchmarks"
+
+def load_benchmark(name):
+    """
+    Import a helper module from benchmarks/ by path, without putting benchmarks/ on sys.path.
+    """
+    spec = importlib.util.spec_from_file_location(f"benchmarks_{name}", BENCHMARKS / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+@pytest.fixture
+def fake_server():
+    """
+    A fake NCBI E-utilities server (benchmarks/fake_server.py) on a free local port.
+    """
+    server = load_benchmark("fake_server").start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture(scope="module")
+def startup_bench():
+    """
+    benchmarks/startup_bench.py, which measures what the CLI entry point imports.
+    """
+    return load_benchmark("startup_bench")
@@ -0,0 +1,155 @@
+import json
+import sys
+import pytest
+from pubmed_papers.main import main as start_main
+from pubmed_papers.pipe import controller as controller_module
+from pubmed_papers.pipe.controller import PubMedController
+from pubmed_papers.pipe.records import Paper, Author, Verdict, as_paper
+
+def make_paper(pmid):
+    return {"pubmed_id": str(pmid), "title": "", "publication_date": "", "authors": []}
+
+@pytest.fixture
+def fake_pipeline(monkeypatch):
+    fetched = []
+
+    def fake_history(webenv, query_key, count):
+        for pmid in range(count):
+            fetched.append(pmid)
+            yield make_paper(pmid)
+
+    monkeypatch.setattr(controller_module, "search_history", lambda query: ("ENV", "1", 1000))
+    monkeypatch.setattr(controller_module, "iter_metadata_history", fake_history)
+    # Keep every even PMID
+    monkeypatch.setattr(controller_module, "filter_biotech_papers",
+                        lambda papers, **kwargs: [p for p in papers if int(p["pubmed_id"]) % 2 == 0])
+    return fetched
+
+def test_stream_preserves_order(fake_pipeline):
+    """
+    Test that the streaming pipeline yields matched papers in fetch order.
+    """
+    papers = PubMedController(chunk_size=50).results("query")
+    assert [p["pubmed_id"] for p in papers] == [str(i) for i in range(0, 1000, 2)]
+
+def test_results_are_plain_dicts(fake_pipeline, monkeypatch):
+    """
+    Test that the list-returning API gives JSON-serializable dicts while streams yield Paper records.
+    """
+    author = Author("Jane Doe", Verdict("Acme Inc"))
+    monkeypatch.setattr(controller_module, "filter_biotech_papers",
+                        lambda papers, **kwargs: [as_paper(p).with_authors([author]) for p in papers])
+    controller = PubMedController(chunk_size=50, max_results=2)
+    papers = json.loads(json.dumps(controller.results("query")))
+    assert papers[0]["authors"] == [{"name": "Jane Doe", "affiliation": {"company": "Acme Inc", "email": "none"}}]
+    assert isinstance(next(controller.stream("query")), Paper)
+
+def test_stream_is_lazy(fake_pipeline):
+    """
+    Test that consuming one result does not download the whole result set.
+    """
+    stream = PubMedController(chunk_size=50, queue_size=1).stream("query")
+    assert next(stream)["pubmed_id"] == "0"
+    stream.close()
+    assert len(fake_pipeline) < 1000
+
+def test_incremental_processes_only_new_pmids(monkeypatch, tmp_path):
+    """
+    Test that an incremental run searches from the last watermark and skips PMIDs already seen.
+    """
+    from pubmed_papers.pipe.watermark import WatermarkStore
+    searches = []
+    results = {None: ["1", "2", "3"], "2024/05/01": ["3", "4", "5"]}
+
+    def fake_search(query, mindate=None, maxdate=None):
+        searches.append((mindate, maxdate))
+        return "ENV", "1", len(results[mindate])
+
+    monkeypatch.setattr(controller_module, "search_history", fake_search)
+    monkeypatch.setattr(controller_module, "iter_history_pmids",
+                        lambda webenv, query_key, count: iter([results[searches[-1][0]]]))
+    monkeypatch.setattr(controller_module, "iter_metadata", lambda pmids: [make_paper(p) for p in pmids])
+    monkeypatch.setattr(controller_module, "filter_biotech_papers", lambda papers, **kwargs: papers)
+    monkeypatch.setattr(controller_module.time, "strftime", lambda fmt: "2024/05/01")
+
+    store = WatermarkStore(str(tmp_path))
+    controller = PubMedController()
+    first = [p["pubmed_id"] for p in controller.stream_incremental("query", store)]
+    second = [p["pubmed_id"] for p in controller.stream_incremental("query", store)]
+    assert first == ["1", "2", "3"]
+    assert second == ["4", "5"]
+    assert searches == [(None, None), ("2024/05/01", "2024/05/01")]
+
+def test_stream_many_fetches_shared_pmids_once(monkeypatch):
+    """
+    Test that batch mode fetches the union of the queries' PMIDs once and fans results out per query.
+    """
+    results = {"a": ["1", "2", "3"], "b": ["2", "4"], "c": []}
+    fetched = []
+
+    def fake_metadata(pmids):
+        fetched.extend(pmids)
+        return [make_paper(p) for p in pmids]
+
+    monkeypatch.setattr(controller_module, "search_pmids", lambda query: results[query])
+    monkeypatch.setattr(controller_module, "iter_metadata", fake_metadata)
+    # Keep every even PMID
+    monkeypatch.setattr(controller_module, "filter_biotech_papers",
+                        lambda papers, **kwargs: [p for p in papers if int(p["pubmed_id"]) % 2 == 0])
+
+    pairs = [(query, paper["pubmed_id"]) for query, paper in PubMedController().stream_many(["a", "b", "c"])]
+    assert fetched == ["1", "2", "3", "4"]
+    assert pairs == [("a", "2"), ("b", "2"), ("b", "4")]
+
+def test_max_results_stops_fetching_early(fake_pipeline):
+    """
+    Test that the pipeline stops after the requested number of matches without fetching the rest.
+    """
+    papers = PubMedController(chunk_size=50, queue_size=1, max_results=30).results("query")
+    assert [p["pubmed_id"] for p in papers] == [str(i) for i in range(0, 60, 2)]
+    assert len(fake_pipeline) < 1000
+
+def test_date_window_and_sort_are_pushed_to_esearch(monkeypatch):
+    """
+    Test that --since/--until/--sort become esearch parameters rather than local filters.
+    """
+    searches = []
+
+    def fake_search(query, **options):
+        searches.append(options)
+        return "ENV", "1", 0
+
+    monkeypatch.setattr(controller_module, "search_history", fake_search)
+    PubMedController(since="2020", until="2021/06", sort="pub_date").results("query")
+    assert searches == [{"mindate": "2020", "maxdate": "2021/06", "datetype": "pdat", "sort": "pub_date"}]
+
+@pytest.mark.parametrize("cache_flag", [[], ["--no-cache"]])
+def test_max_results_fetches_only_the_first_pages(monkeypatch, tmp_path, cache_flag, fake_server):
+    """
+    Test that --max-results on the default CLI path stops after a few pages of a 100,000-PMID
+    result set instead of paging through its full PMID list.
+    """
+    from pubmed_papers.pipe import pupmed
+    from pubmed_papers.pipe.ratelimit import TokenBucket
+
+    calls = []
+    request = pupmed.ncbi.request
+
+    def counting_request(endpoint, params):
+        calls.append(f"{endpoint}.{params['rettype']}" if "rettype" in params else endpoint)
+        return request(endpoint, params)
+
+    monkeypatch.setattr(pupmed.ncbi, "base_url", f"http://127.0.0.1:{fake_server.server_port}/entrez/eutils")
+    monkeypatch.setattr(pupmed.ncbi, "limiter", TokenBucket(1000, capacity=1000))
+    monkeypatch.setattr(pupmed.ncbi, "request", counting_request)
+    output = tmp_path / "results.csv"
+    monkeypatch.setattr(sys, "argv", ["get-papers-list", "size=100000", "--keyword-only", "--max-results", "5",
+                                      "--cache-dir", str(tmp_path), "-f", str(output), *cache_flag])
+    start_main()
+
+    assert len(output.read_text(encoding="utf-8").splitlines()) == 6
+    assert calls.count("esearch") == 1
+    # Only the pages in flight, not all 100 uilist pages (1,000 PMIDs each) and their 1,000 efetches;
+    # how many are in flight when the run stops depends on thread timing
+    assert calls.count("efetch.uilist") <= 8
+    assert len(calls) <= 40
@@ -0,0 +1,131 @@
+import sys
+import pytest
+from pubmed_papers.main import main as start_main
+from pubmed_papers.pipe.gazetteer import Gazetteer, is_bare_suffix
+from pubmed_papers.pipe.keymatch import KeyMatch
+
+def test_only_organization_segments_are_learned(tmp_path):
+    """
+    Test that an LLM company name is only learned when it leads the affiliation's organization
+    segment: places, departments, paraphrases and bare suffixes are rejected.
+    """
+    gazetteer = Gazetteer(str(tmp_path), min_confirmations=1)
+    learned = gazetteer.learn([
+        ("Genentech, South San Francisco, CA", "Genentech"),
+        ("Biogen, Cambridge, MA, USA", "Cambridge"),
+        ("Research and Development, Acme Corp, Boston", "Research and Development"),
+        ("Roche Diagnostics GmbH, Penzberg", "F. Hoffmann-La Roche"),
+        ("Acme Consulting, Ltd, Leeds", "Ltd"),
+        ("Dept. of Chemistry, Bayer AG, Berlin", "Bayer"),
+    ])
+    assert learned == 2
+    assert gazetteer.lookup("dept. of oncology, genentech, usa") == "Genentech"
+    assert gazetteer.lookup("bayer ag, leverkusen") == "Bayer"
+    assert gazetteer.lookup("roche diagnostics gmbh") is None
+    keymatch = KeyMatch(gazetteer)
+    assert keymatch.classify_affiliation("Department of Physics, Cambridge, UK") is None
+    assert keymatch.classify_affiliation("Research and Development, Cambridge, UK") is None
+
+def test_learned_names_need_distinct_confirmations(tmp_path):
+    """
+    Test that a learned name is only used once enough distinct affiliations confirmed it, and that this persists.
+    """
+    gazetteer = Gazetteer(str(tmp_path), min_confirmations=3)
+    assert gazetteer.learn([("Moderna, Cambridge, MA", "Moderna")] * 3) == 0
+    assert gazetteer.learn([("Moderna Inc, Norwood, MA", "Moderna")]) == 0
+    assert gazetteer.lookup("moderna, boston") is None
+    assert gazetteer.entries() == [("Moderna", "moderna", "pending", 2)]
+    assert gazetteer.learn([("Moderna, Boston, USA", "Moderna")]) == 1
+    assert gazetteer.lookup("moderna, boston") == "Moderna"
+    gazetteer.close()
+    assert Gazetteer(str(tmp_path), min_confirmations=3).lookup("moderna tx, usa") == "Moderna"
+
+def test_seeds_stay_apart_and_removed_names_are_not_relearned(tmp_path):
+    """
+    Test that seeds are listed separately from learned names, and a removed name is never learned again.
+    """
+    gazetteer = Gazetteer(str(tmp_path), min_confirmations=1)
+    gazetteer.add([("Pfizer", "Pfizer")])
+    gazetteer.learn([("Pfizer Inc, New York", "Pfizer"), ("Illumina, San Diego", "Illumina")])
+    assert gazetteer.entries() == [("Illumina", "illumina", "learned", 1), ("Pfizer", "pfizer", "seed", 0)]
+
+    assert gazetteer.remove("ILLUMINA") == 1
+    gazetteer.learn([("Illumina, San Diego, CA", "Illumina")])
+    assert gazetteer.lookup("illumina, san diego") is None
+    reopened = Gazetteer(str(tmp_path), min_confirmations=1)
+    reopened.learn([("Illumina Inc, Cambridge, UK", "Illumina")])
+    assert reopened.entries() == [("Pfizer", "pfizer", "seed", 0)]
+
+def test_seed_list_and_longest_variant_win(tmp_path):
+    """
+    Test that seed variants map to their canonical name, the longest variant wins, and entries persist.
+    """
+    seed = tmp_path / "seed.txt"
+    seed.write_text("# companies\nNovartis | Novartis Pharma AG\n"
+                    "Novartis Institutes for BioMedical Research | NIBR\n", encoding="utf-8")
+    Gazetteer(str(tmp_path)).load_seed(str(seed))
+    gazetteer = Gazetteer(str(tmp_path))
+    assert len(gazetteer) == 4
+    assert gazetteer.lookup("novartis pharma ag, basel") == "Novartis"
+    assert gazetteer.lookup("novartis institutes for biomedical research, cambridge") == \
+        "Novartis Institutes for BioMedical Research"
+    assert gazetteer.lookup("nibr, basel") == "Novartis Institutes for BioMedical Research"
+
+def test_keymatch_consults_gazetteer_first(tmp_path):
+    """
+    Test that KeyMatch recognizes known companies without any keyword, but academic affiliations still lose.
+    """
+    gazetteer = Gazetteer(str(tmp_path))
+    gazetteer.add([("Genentech", "Genentech")], "seed")
+    keymatch = KeyMatch(gazetteer)
+    assert keymatch.classify_affiliation("Genentech, South San Francisco. a@gene.com") == \
+        {"company": "Genentech", "email": "a@gene.com"}
+    assert keymatch.classify_affiliation("Genentech Center, Stanford University") is None
+    assert KeyMatch().classify_affiliation("Genentech, South San Francisco") is None
+
+def test_bare_suffixes():
+    """
+    Test the legal-suffix detection used to reject "Ltd"-only company names.
+    """
+    assert is_bare_suffix("Ltd") and is_bare_suffix("Co., Ltd.") and is_bare_suffix(" S.A. ")
+    assert not is_bare_suffix("Acme Ltd") and not is_bare_suffix("")
+
+def test_gazetteer_list_and_remove(monkeypatch, tmp_path, capsys):
+    """
+    Test that --gazetteer-list shows seed and pending learned names and --gazetteer-remove deletes them.
+    """
+    gazetteer = Gazetteer(str(tmp_path))
+    gazetteer.add([("acme", "Acme Pharma")])
+    gazetteer.learn([("Globex Inc, Springfield", "Globex Inc")])
+    gazetteer.close()
+
+    monkeypatch.setattr(sys, "argv", ["get-papers-list", "--gazetteer-list", "--cache-dir", str(tmp_path)])
+    start_main()
+    out = capsys.readouterr().out
+    assert "Acme Pharma\tacme\tseed\t" in out
+    assert "Globex Inc\tglobex inc\tpending\t1" in out
+
+    monkeypatch.setattr(sys, "argv", ["get-papers-list", "--gazetteer-remove", "Acme Pharma",
+                                      "--gazetteer-list", "--cache-dir", str(tmp_path)])
+    start_main()
+    captured = capsys.readouterr()
+    assert "Removed 1 gazetteer entries for 'Acme Pharma'" in captured.err
+    assert "acme" not in captured.out
+
+    monkeypatch.setattr(sys, "argv", ["get-papers-list", "--gazetteer-list", "--no-gazetteer"])
+    with pytest.raises(SystemExit) as e:
+        start_main()
+    assert e.value.code == 2
+
+def test_gazetteer_seed_is_loaded_before_list(monkeypatch, tmp_path, capsys):
+    """
+    Test that --gazetteer-seed with --gazetteer-list lists the entries just seeded.
+    """
+    seed = tmp_path / "seed.txt"
+    seed.write_text("Initech | initech corp\n", encoding="utf-8")
+    monkeypatch.setattr(sys, "argv", ["get-papers-list", "--gazetteer-seed", str(seed), "--gazetteer-list",
+                                      "--cache-dir", str(tmp_path)])
+    start_main()
+    out = capsys.readouterr().out
+    assert "Initech\tinitech\tseed\t" in out
+    assert "Initech\tinitech corp\tseed\t" in out
@@ -0,0 +1,130 @@
+import os
+import sys
+import time
+import pytest
+from pubmed_papers.main import main as start_main
+from pubmed_papers.pipe import controller as controller_module
+from pubmed_papers.pipe.controller import PubMedController
+from pubmed_papers.pipe.journal import JOURNAL_TTL, RunJournal, open_journal
+from pubmed_papers.pipe.records import Paper, Author, Verdict
+
+def make_paper(pmid):
+    return Paper(str(pmid), f"Title {pmid}", "2024-01-01", [Author("Jane Doe", Verdict("Acme"))])
+
+def test_journal_round_trip(tmp_path):
+    """
+    Test that PMIDs, settings and classified chunks survive reopening the journal by run ID.
+    """
+    journal = RunJournal(str(tmp_path))
+    assert journal.pmids() is None
+    journal.set("query", "cancer")
+    journal.save_pmids(["3", "1", "2"])
+    journal.complete(1, 100, [make_paper(1)])
+    journal.close()
+
+    resumed = RunJournal(str(tmp_path), journal.run_id)
+    assert resumed.get("query") == "cancer"
+    assert resumed.pmids() == ["3", "1", "2"]
+    done = resumed.completed(100)
+    assert list(done) == [1]
+    assert done[1][0].to_dict() == make_paper(1).to_dict()
+    # Chunks recorded with another chunk size do not line up and are not reused
+    assert resumed.completed(50) == {}
+
+def test_resume_unknown_run_is_an_error(tmp_path):
+    """
+    Test that resuming a run ID without a journal fails instead of starting a new run.
+    """
+    with pytest.raises(RuntimeError):
+        open_journal(str(tmp_path), "no-such-run")
+
+def test_new_journal_prunes_abandoned_runs(tmp_path):
+    """
+    Test that opening a new journal deletes journals untouched for longer than the TTL and keeps recent ones.
+    """
+    old = RunJournal(str(tmp_path))
+    old.close()
+    recent = RunJournal(str(tmp_path))
+    recent.close()
+    long_ago = time.time() - JOURNAL_TTL - 60
+    for name in os.listdir(old.directory):
+        os.utime(os.path.join(old.directory, name), (long_ago, long_ago))
+    os.utime(old.directory, (long_ago, long_ago))
+
+    current = open_journal(str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == sorted([recent.run_id, current.run_id])
+
+def test_resume_continues_from_first_unfinished_chunk(monkeypatch, tmp_path):
+    """
+    Test that a run interrupted mid-way resumes without searching again or reclassifying
+    finished chunks, and yields the same results as an uninterrupted run.
+    """
+    searches = []
+    classified = []
+    fail_at = {"pmid": 250}
+
+    def fake_search(query):
+        searches.append(query)
+        return "ENV", "1", 500
+
+    def fake_filter(papers, **kwargs):
+        if any(int(p.pubmed_id) == fail_at["pmid"] for p in papers):
+            raise RuntimeError("Groq outage")
+        classified.extend(p.pubmed_id for p in papers)
+        return [p for p in papers if int(p.pubmed_id) % 2 == 0]
+
+    monkeypatch.setattr(controller_module, "search_history", fake_search)
+    monkeypatch.setattr(controller_module, "iter_history_pmids",
+                        lambda webenv, query_key, count: iter([[str(i) for i in range(count)]]))
+    monkeypatch.setattr(controller_module, "iter_metadata", lambda pmids: [make_paper(p) for p in pmids])
+    monkeypatch.setattr(controller_module, "filter_biotech_papers", fake_filter)
+
+    journal = RunJournal(str(tmp_path))
+    with pytest.raises(RuntimeError):
+        list(PubMedController(chunk_size=100, queue_size=1).stream_journaled(journal, query="cancer"))
+    assert len(journal.completed(100)) == 2
+
+    fail_at["pmid"] = -1
+    classified.clear()
+    resumed = RunJournal(str(tmp_path), journal.run_id)
+    papers = list(PubMedController(chunk_size=100, queue_size=1).stream_journaled(resumed, query="cancer"))
+    assert searches == ["cancer"]
+    assert classified == [str(i) for i in range(200, 500)]
+    assert [p.pubmed_id for p in papers] == [str(i) for i in range(0, 500, 2)]
+
+def test_limited_run_is_not_journaled(monkeypatch, tmp_path):
+    """
+    Test that a run with max_results streams directly instead of paging the full PMID list for the journal.
+    """
+    monkeypatch.setattr(controller_module, "iter_metadata", lambda pmids: [make_paper(p) for p in pmids])
+    monkeypatch.setattr(controller_module, "filter_biotech_papers", lambda papers, **kwargs: list(papers))
+    journal = RunJournal(str(tmp_path))
+    controller = PubMedController(chunk_size=10, max_results=3)
+    papers = list(controller.stream_journaled(journal, pmids=[str(i) for i in range(100)]))
+    assert [p.pubmed_id for p in papers] == ["0", "1", "2"]
+    assert journal.pmids() is None
+
+def test_journal_of_failed_search_is_removed(monkeypatch, tmp_path):
+    """
+    Test that a --journal run failing before anything was checkpointed leaves no journal behind.
+    """
+    def failing_search(query, **options):
+        raise ConnectionError("esearch unreachable")
+
+    monkeypatch.setattr(controller_module, "search_history", failing_search)
+    monkeypatch.setattr(sys, "argv", ["get-papers-list", "cancer", "--journal", "--keyword-only",
+                                      "--cache-dir", str(tmp_path), "-f", str(tmp_path / "out.csv")])
+    with pytest.raises(RuntimeError):
+        start_main()
+    assert os.listdir(tmp_path / "runs") == []
+
+
+def test_journal_rejects_max_results(monkeypatch, capsys):
+    """
+    Test that --journal with --max-results is a usage error, since journaled runs page the full PMID list.
+    """
+    monkeypatch.setattr(sys, "argv", ["get-papers-list", "cancer", "--journal", "--max-results", "5"])
+    with pytest.raises(SystemExit) as e:
+        start_main()
+    assert e.value.code == 2
+    assert "--max-results" in capsys.readouterr().err
@@ -0,0 +1,46 @@
+import random
+import re
+from pubmed_papers.pipe.keymatch import KeyMatch
+from pubmed_papers.pipe.matcher import KeywordMatcher
+
+def test_matcher_agrees_with_regex_alternation():
+    """
+    Test that the keyword matcher finds the same first hit as the regex it replaces,
+    including \\b edge cases around punctuated keywords.
+    """
+    keymatch = KeyMatch()
+    pattern = re.compile(r'(' + '|'.join([rf'\b{re.escape(k)}\b' for k in keymatch.company_keywords]) + r')')
+    matcher = KeywordMatcher(keymatch.company_keywords)
+    fragments = keymatch.company_keywords + ["x", "prince", "ton", "s", "a", "co", "é", "1", "_"]
+    separators = [" ", ", ", ".", "-", "", "/", "  "]
+    rng = random.Random(0)
+    for _ in range(5000):
+        text = "".join(rng.choice(fragments) + rng.choice(separators) for _ in range(rng.randint(1, 6)))
+        match = pattern.search(text)
+        hits = matcher.find_all(text)
+        expected = (match.start(), match.group(0)) if match else None
+        actual = (hits[0][0], matcher.keywords[hits[0][2]]) if hits else None
+        assert actual == expected, text
+
+def test_company_segment_comes_from_match_offset():
+    """
+    Test that the company is the comma segment holding the keyword, not an earlier
+    segment that merely contains the same letters.
+    """
+    verdict = KeyMatch().classify_affiliation("Dept. of Chemistry, Princeton, Acme Inc, NJ. jane@acme.com")
+    assert verdict == {"company": "Acme Inc", "email": "jane@acme.com"}
+
+def test_classify_many_matches_single_calls():
+    """
+    Test that bulk classification returns the same verdicts, in order.
+    """
+    keymatch = KeyMatch()
+    affiliations = ["Pfizer Inc., Groton", "Harvard University", "Pfizer Inc., Groton", ""]
+    assert keymatch.classify_many(affiliations) == [keymatch.classify_affiliation(a) for a in affiliations]
+
+def test_bare_suffix_segment_joins_the_name_before_it():
+    """
+    Test that "Green Toxicology, Ltd" yields the full company, not a bare "Ltd".
+    """
+    verdict = KeyMatch().classify_affiliation("Green Toxicology, Ltd, Westford, MA, USA")
+    assert verdict["company"] == "Green Toxicology, Ltd"
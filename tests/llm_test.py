@@ -0,0 +1,111 @@
+import json
+import httpx
+import pytest
+from types import SimpleNamespace
+from groq import RateLimitError
+from pubmed_papers.pipe import LLMmatch
+from pubmed_papers.pipe.ratelimit import TokenBucket
+
+class FakeCompletions:
+    """
+    Answers like the model would: every affiliation mentioning 'Inc' is industry.
+    """
+    def __init__(self, failures=None, garble_over=None, total_tokens=None):
+        self.failures = list(failures or [])
+        self.garble_over = garble_over
+        self.total_tokens = total_tokens
+        self.batches = []
+
+    def create(self, messages, max_tokens, **kwargs):
+        if self.failures:
+            raise self.failures.pop(0)
+        batch = [line.split("\t") for line in messages[1]["content"].split("\n")]
+        self.batches.append([int(idx) for idx, _ in batch])
+        if self.garble_over is not None and len(batch) > self.garble_over:
+            content = "[[not json"
+        else:
+            content = json.dumps([[int(idx), affiliation, "none"] for idx, affiliation in batch if "Inc" in affiliation])
+        usage = None
+        if self.total_tokens is not None:
+            usage = SimpleNamespace(prompt_tokens=0, completion_tokens=0, total_tokens=self.total_tokens)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=usage)
+
+@pytest.fixture
+def completions(monkeypatch):
+    def install(**kwargs):
+        fake = FakeCompletions(**kwargs)
+        monkeypatch.setattr(LLMmatch, "_client", SimpleNamespace(chat=SimpleNamespace(completions=fake)))
+        return fake
+    monkeypatch.setattr(LLMmatch, "request_limiter", TokenBucket(1000, capacity=1000))
+    monkeypatch.setattr(LLMmatch, "token_limiter", TokenBucket(10**9, capacity=10**9))
+    return install
+
+def test_pack_batches_respects_token_budget():
+    """
+    Test that batches are packed by estimated tokens rather than item count.
+    """
+    items = [{"id": i, "affiliation": "x" * 400} for i in range(10)]
+    batches = LLMmatch.pack_batches(items, max_tokens=300)
+    assert [item for batch in batches for item in batch] == items
+    assert all(len(batch) == 2 for batch in batches)
+
+def test_payload_is_compact():
+    """
+    Test that the prompt payload is one id-referenced line per affiliation, without indentation.
+    """
+    payload = LLMmatch.serialize_batch([{"id": 4, "affiliation": "Acme Inc,\n  Boston"}, {"id": 9, "affiliation": "MIT"}])
+    assert payload == "4\tAcme Inc, Boston\n9\tMIT"
+
+def test_bad_json_splits_batch(completions):
+    """
+    Test that an unparseable reply splits the batch instead of losing it.
+    """
+    fake = completions(garble_over=1)
+    affiliations = [f"Company {i} Inc" if i % 2 else f"University {i}" for i in range(6)]
+    verdicts = LLMmatch.classify_affiliations_llama3(affiliations)
+    assert sorted(verdicts) == [1, 3, 5]
+    assert verdicts[1] == {"company": "Company 1 Inc", "email": "none"}
+    # 6 -> 3 + 3 -> 1 + 2 + 1 + 2 -> six single-affiliation requests that parse
+    assert sorted(b for batch in fake.batches if len(batch) == 1 for b in batch) == list(range(6))
+
+def test_rate_limit_is_retried(completions, monkeypatch):
+    """
+    Test that a 429 from the API is retried after its Retry-After delay.
+    """
+    request = httpx.Request("POST", "https://api.groq.com")
+    throttled = RateLimitError("slow down", response=httpx.Response(429, request=request, headers={"retry-after": "0"}), body=None)
+    fake = completions(failures=[throttled])
+    verdicts = LLMmatch.classify_affiliations_llama3(["Acme Inc"])
+    assert verdicts == {0: {"company": "Acme Inc", "email": "none"}}
+    assert len(fake.batches) == 1
+
+def test_unparsed_affiliations_stay_undecided(completions, tmp_path):
+    """
+    Test that affiliations whose reply never parses are neither reported as academic nor cached.
+    """
+    from pubmed_papers.pipe.cache import VerdictCache
+    from pubmed_papers.pipe.classify import GroqBackend
+    completions(garble_over=0)
+    cache = VerdictCache(str(tmp_path))
+    assert GroqBackend(cache).classify(["Acme Inc", "MIT"]) == {}
+    assert cache.get_many([VerdictCache.fingerprint("MIT", LLMmatch.MODEL, LLMmatch.PROMPT_VERSION)]) == {}
+
+    completions()
+    assert GroqBackend(cache).classify(["Acme Inc", "MIT"]) == {0: {"company": "Acme Inc", "email": "none"}, 1: None}
+    # Answered from the cache now, academic verdict included
+    completions(garble_over=0)
+    assert GroqBackend(cache).classify(["Acme Inc", "MIT"]) == {0: {"company": "Acme Inc", "email": "none"}, 1: None}
+
+def test_token_limiter_is_settled_against_usage(completions, monkeypatch):
+    """
+    Test that a request reserves less than its max_tokens and the TPM bucket is charged its real usage.
+    """
+    completions(total_tokens=500)
+    bucket = TokenBucket(1e-6, capacity=6000)
+    monkeypatch.setattr(LLMmatch, "token_limiter", bucket)
+    reserved = []
+    acquire = bucket.acquire
+    monkeypatch.setattr(bucket, "acquire", lambda tokens: reserved.append(tokens) or acquire(tokens))
+    LLMmatch.classify_affiliations_llama3(["Acme Inc"])
+    assert reserved and reserved[0] < LLMmatch.OUTPUT_BASE_TOKENS
+    assert bucket._tokens == pytest.approx(5500)
@@ -0,0 +1,92 @@
+import contextlib
+import math
+import sys
+import types
+import pytest
+from pubmed_papers.pipe.localmodel import LocalModelBackend, industry_label
+
+class FakeTensor:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __getitem__(self, key):
+        rows, column = key
+        return FakeTensor([row[column] for row in self.rows[rows]])
+
+    def tolist(self):
+        return list(self.rows)
+
+def softmax(logits, dim=-1):
+    return FakeTensor([[math.exp(x) / sum(math.exp(y) for y in row) for x in row] for row in logits.rows])
+
+class FakeModel:
+    """
+    Stands in for a transformers classifier: "pharma" affiliations score as industry,
+    "university" ones as academic, anything else is a coin toss.
+    """
+    def __init__(self, label2id):
+        self.config = types.SimpleNamespace(label2id=label2id)
+        self.industry = industry_label(label2id)
+
+    def eval(self):
+        return self
+
+    def __call__(self, texts):
+        rows = []
+        for text in texts:
+            score = 5.0 if "pharma" in text.lower() else -5.0 if "university" in text.lower() else 0.0
+            row = [0.0, 0.0]
+            row[self.industry] = score
+            rows.append(row)
+        return types.SimpleNamespace(logits=FakeTensor(rows))
+
+@pytest.fixture
+def fake_transformers(monkeypatch):
+    """
+    Install stub torch/transformers modules; returns the label2id the next loaded model gets.
+    """
+    labels = {"label2id": {"LABEL_0": 0, "LABEL_1": 1}}
+    torch = types.SimpleNamespace(set_num_threads=lambda n: None, inference_mode=contextlib.nullcontext,
+                                  softmax=softmax)
+    tokenizer = lambda texts, **kwargs: {"texts": texts}
+    transformers = types.SimpleNamespace(
+        AutoTokenizer=types.SimpleNamespace(from_pretrained=lambda name: tokenizer),
+        AutoModelForSequenceClassification=types.SimpleNamespace(
+            from_pretrained=lambda name: FakeModel(labels["label2id"])
+        ),
+    )
+    monkeypatch.setitem(sys.modules, "torch", torch)
+    monkeypatch.setitem(sys.modules, "transformers", transformers)
+    return labels
+
+def test_confident_predictions_decide_and_the_rest_fall_through(fake_transformers):
+    """
+    Test that confident industry and academic scores are decided and uncertain ones are left out.
+    """
+    backend = LocalModelBackend("fake-model", batch_size=2)
+    decided = backend.classify([
+        "Dept. of Chemistry, Acme Pharma GmbH, Berlin. jane@acme.com",
+        "Harvard University, Boston",
+        "Broad Foundation, Cambridge",
+    ])
+    assert decided == {0: {"company": "Acme Pharma GmbH", "email": "jane@acme.com"}, 1: None}
+
+def test_industry_label_is_found_by_name(fake_transformers):
+    """
+    Test that a label named like industry is used whatever its index.
+    """
+    fake_transformers["label2id"] = {"INDUSTRY": 0, "ACADEMIC": 1}
+    backend = LocalModelBackend("fake-model")
+    assert backend.industry_label == 0
+    assert backend.classify(["Acme Pharma Inc", "Oxford University"]) == {
+        0: {"company": "Acme Pharma Inc", "email": "none"}, 1: None
+    }
+
+def test_industry_label_defaults_only_for_binary_models():
+    """
+    Test that unnamed labels fall back to the positive class of a binary model and are an error otherwise.
+    """
+    assert industry_label({"LABEL_0": 0, "LABEL_1": 1}) == 1
+    assert industry_label({"academic": 0, "company": 1}) == 1
+    with pytest.raises(RuntimeError):
+        industry_label({"LABEL_0": 0, "LABEL_1": 1, "LABEL_2": 2})
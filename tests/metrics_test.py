@@ -0,0 +1,47 @@
+import json
+import threading
+from pubmed_papers.pipe.metrics import Metrics
+
+def test_counters_and_stages():
+    """
+    Test that counters add up and stage timers count calls, including from several threads.
+    """
+    metrics = Metrics()
+
+    def work():
+        for _ in range(100):
+            metrics.incr("ncbi.requests")
+            with metrics.timer("efetch"):
+                pass
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    snapshot = metrics.snapshot()
+    assert snapshot["counters"] == {"ncbi.requests": 400}
+    assert snapshot["stages"]["efetch"]["calls"] == 400
+
+def test_prometheus_format():
+    """
+    Test that counters and stages are rendered as Prometheus gauges with sanitized names.
+    """
+    metrics = Metrics()
+    metrics.incr("cache.metadata.hits", 3)
+    metrics.record("layer2.groq", 1.5)
+    text = metrics.to_prometheus()
+    assert "pubmed_papers_cache_metadata_hits 3" in text
+    assert 'pubmed_papers_stage_seconds{stage="layer2.groq"} 1.5' in text
+    assert 'pubmed_papers_stage_calls{stage="layer2.groq"} 1' in text
+
+def test_write_json(tmp_path):
+    """
+    Test that the JSON report is written atomically and parses back.
+    """
+    metrics = Metrics()
+    metrics.incr("papers.processed", 10)
+    path = tmp_path / "metrics.json"
+    metrics.write(str(path))
+    assert json.loads(path.read_text())["counters"]["papers.processed"] == 10
+    assert not (tmp_path / "metrics.json.tmp").exists()
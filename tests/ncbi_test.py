@@ -0,0 +1,52 @@
+import requests
+from pubmed_papers.pipe.ncbi import NCBIClient
+
+class FakeResponse:
+    def __init__(self, status_code=200, content=b"", headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+def make_client(monkeypatch, responses, calls, **kwargs):
+    client = NCBIClient(base_url="http://ncbi.test/eutils", rate=1000, backoff=0.01, **kwargs)
+
+    def fake_request(method, url, **request):
+        calls.append((method, url, request))
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    monkeypatch.setattr(client.session, "request", fake_request)
+    return client
+
+def test_id_lists_are_posted_with_identity(monkeypatch):
+    """
+    Test that efetch sends PMIDs in a POST body and every call carries api_key/tool/email.
+    """
+    calls = []
+    client = make_client(monkeypatch, [FakeResponse(), FakeResponse()], calls,
+                         api_key="KEY", tool="tool", email="me@example.org")
+    client.efetch({"db": "pubmed", "id": "1,2,3"})
+    client.esearch({"db": "pubmed", "term": "cancer"})
+    (method, url, request), (search_method, search_url, search_request) = calls
+    assert (method, url) == ("POST", "http://ncbi.test/eutils/efetch.fcgi")
+    assert request["data"] == {"db": "pubmed", "id": "1,2,3", "api_key": "KEY", "tool": "tool", "email": "me@example.org"}
+    assert (search_method, search_url) == ("GET", "http://ncbi.test/eutils/esearch.fcgi")
+    assert search_request["params"]["term"] == "cancer" and search_request["params"]["tool"] == "tool"
+
+def test_session_asks_for_compression(monkeypatch):
+    """
+    Test that the pooled session negotiates compressed responses.
+    """
+    client = NCBIClient(base_url="http://ncbi.test/eutils", rate=1000)
+    assert "gzip" in client.session.headers["Accept-Encoding"]
+
+def test_connection_errors_are_retried(monkeypatch):
+    """
+    Test that a dropped connection is retried under the central policy.
+    """
+    calls = []
+    client = make_client(monkeypatch, [requests.ConnectionError("reset"), FakeResponse(503), FakeResponse(200)], calls)
+    assert client.esearch({"term": "cancer"}).status_code == 200
+    assert len(calls) == 3
@@ -0,0 +1,118 @@
+import csv
+import io
+import json
+import pytest
+from pubmed_papers.pipe.output import (
+    CSVWriter, JSONArrayWriter, JSONLinesWriter, ResultWriter, TextWriter, flatten_paper, open_writer
+)
+
+def make_paper(pmid, company="Acme Inc", email="jane@acme.com"):
+    return {
+        "pubmed_id": pmid, "title": f"Title {pmid}", "publication_date": "2024-01-01",
+        "authors": [
+            {"name": "Jane Doe", "affiliation": {"company": company, "email": email}},
+            {"name": "John Roe", "affiliation": {"company": "Beta Ltd", "email": "none"}}
+        ]
+    }
+
+def test_flatten_paper():
+    """
+    Test that flattening keeps industry authors, their companies and the first real email.
+    """
+    row = flatten_paper(make_paper("1", email="none"))
+    assert row["authors"] == ["Jane Doe", "John Roe"]
+    assert row["companies"] == ["Acme Inc", "Beta Ltd"]
+    assert row["email"] == ""
+
+def test_writers_flush_each_paper():
+    """
+    Test that every writer flushes a paper to its stream as soon as it is written.
+    """
+    for writer_class in (CSVWriter, JSONLinesWriter, JSONArrayWriter, TextWriter):
+        stream = io.StringIO()
+        writer = writer_class(stream, owns_stream=False)
+        before = len(stream.getvalue())
+        writer.write(make_paper("1"))
+        assert len(stream.getvalue()) > before
+
+def test_csv_append_skips_header(tmp_path):
+    """
+    Test that appending to a CSV file adds rows without repeating the header.
+    """
+    path = str(tmp_path / "out.csv")
+    with open_writer(path) as writer:
+        writer.write_all([make_paper("1")])
+    with open_writer(path, append=True) as writer:
+        writer.write_all([make_paper("2")])
+    rows = list(csv.reader(open(path, encoding="utf-8")))
+    assert [row[0] for row in rows] == ["PubmedID", "1", "2"]
+    assert rows[1][3:] == ["Jane Doe; John Roe", "Acme Inc; Beta Ltd", "jane@acme.com"]
+
+def test_json_array_streams_and_appends(tmp_path):
+    """
+    Test that the JSON array writer produces valid JSON, including empty and appended arrays.
+    """
+    path = str(tmp_path / "out.json")
+    with open_writer(path) as writer:
+        writer.write_all([])
+    assert json.load(open(path, encoding="utf-8")) == []
+    with open_writer(path, append=True) as writer:
+        writer.write_all([make_paper("1")])
+    with open_writer(path, append=True) as writer:
+        writer.write_all([make_paper("2"), make_paper("3")])
+    papers = json.load(open(path, encoding="utf-8"))
+    assert [p["pubmed_id"] for p in papers] == ["1", "2", "3"]
+    assert papers[0] == make_paper("1")
+
+def test_json_lines(tmp_path):
+    """
+    Test that .jsonl output holds one paper per line.
+    """
+    path = str(tmp_path / "out.jsonl")
+    with open_writer(path) as writer:
+        writer.write_all([make_paper("1"), make_paper("2")])
+    lines = open(path, encoding="utf-8").read().splitlines()
+    assert [json.loads(line)["pubmed_id"] for line in lines] == ["1", "2"]
+
+def test_text_writer_without_results():
+    """
+    Test that the console writer reports when nothing matched.
+    """
+    stream = io.StringIO()
+    with TextWriter(stream) as writer:
+        writer.write_all([])
+    assert stream.getvalue() == "No Matched papers found.\n"
+
+def test_result_writer_is_abstract():
+    """
+    Test that a writer without a format cannot be created.
+    """
+    with pytest.raises(TypeError):
+        ResultWriter(io.StringIO())
+
+def test_save_results_does_not_mask_pipeline_errors(tmp_path):
+    """
+    Test that an error raised by the pipeline while saving is not reported as a file error.
+    """
+    from pubmed_papers.main import save_results
+
+    def papers():
+        yield {"pubmed_id": "1", "title": "", "publication_date": "", "authors": []}
+        raise ValueError("bad efetch page")
+
+    with pytest.raises(ValueError, match="bad efetch page"):
+        save_results(papers(), str(tmp_path / "results.csv"))
+    with pytest.raises(RuntimeError):
+        save_results(iter([]), str(tmp_path / "missing" / "results.csv"))
+
+def test_save_results_csv_goes_through_save_results(tmp_path):
+    """
+    Test that save_results_csv writes the same file as save_results and reports file errors the same way.
+    """
+    from pubmed_papers.main import save_results, save_results_csv
+
+    save_results_csv([make_paper("1")], str(tmp_path / "a.csv"))
+    save_results([make_paper("1")], str(tmp_path / "b.csv"))
+    assert (tmp_path / "a.csv").read_bytes() == (tmp_path / "b.csv").read_bytes()
+    with pytest.raises(RuntimeError):
+        save_results_csv([make_paper("1")], str(tmp_path / "missing" / "a.csv"))
@@ -0,0 +1,139 @@
+import pytest
+from pubmed_papers.pipe import controller as controller_module
+from pubmed_papers.pipe.controller import PubMedController
+from pubmed_papers.pipe.cache import MetadataCache
+from pubmed_papers.pipe.journal import RunJournal
+from pubmed_papers.pipe.metrics import metrics
+from pubmed_papers.pipe.parallel import parse_and_match, iter_parsed_pages, open_pool, regroup
+from pubmed_papers.pipe.pupmed import parse_page
+from pubmed_papers.utils import DebugUtil
+
+AFFILIATIONS = ["Acme Therapeutics Inc, Boston", "Department of Biology, Harvard University", "Pfizer Inc., New York"]
+
+def efetch_xml(pmids):
+    articles = "".join(
+        f"<PubmedArticle><MedlineCitation><PMID>{p}</PMID><Article>"
+        f"<ArticleTitle>Title {p}</ArticleTitle>"
+        f"<AuthorList><Author><LastName>Doe</LastName><ForeName>Jane</ForeName>"
+        f"<AffiliationInfo><Affiliation>{AFFILIATIONS[int(p) % 3]}</Affiliation></AffiliationInfo>"
+        f"</Author></AuthorList></Article></MedlineCitation></PubmedArticle>"
+        for p in pmids
+    )
+    return f"<PubmedArticleSet>{articles}</PubmedArticleSet>".encode()
+
+def raw_pages(pmids, size=10):
+    for i in range(0, len(pmids), size):
+        batch = pmids[i:i + size]
+        # Serve each page in reverse, like efetch answering out of order
+        yield efetch_xml(reversed(batch)), batch
+
+@pytest.fixture(scope="module")
+def pool():
+    with open_pool(2) as pool:
+        yield pool
+
+def test_parse_and_match_returns_keyword_verdicts():
+    """
+    Test that a worker task parses papers in PMID order and decides each unique affiliation once.
+    """
+    papers, verdicts = parse_and_match(efetch_xml(["2", "1", "3"]), ["1", "2", "3"])
+    assert [p.pubmed_id for p in papers] == ["1", "2", "3"]
+    assert len(verdicts) == 3
+    assert verdicts["department of biology, harvard university"] is None
+    assert verdicts["acme therapeutics inc, boston"].company
+
+def test_parsed_pages_keep_input_order(pool):
+    """
+    Test that pages parsed in the process pool come back in input order.
+    """
+    pmids = [str(i) for i in range(1, 101)]
+    pages = iter_parsed_pages(raw_pages(pmids), pool, window=4)
+    chunks = list(regroup(pages, 25))
+    assert [len(papers) for papers, _ in chunks] == [30, 30, 30, 10]
+    assert [p.pubmed_id for papers, _ in chunks for p in papers] == pmids
+
+def test_workers_match_in_process_results(monkeypatch):
+    """
+    Test that process-pool parsing yields the same matches, in the same order, as in-process parsing.
+    """
+    pmids = [str(i) for i in range(1, 251)]
+    monkeypatch.setattr(controller_module, "iter_raw_pages", lambda ids: raw_pages(ids))
+    monkeypatch.setattr(controller_module, "iter_metadata",
+                        lambda ids: (p for _, batch in raw_pages(ids) for p in parse_page(efetch_xml(batch), batch)))
+
+    expected = [p.to_dict() for p in PubMedController(chunk_size=40, backends=[]).stream_for_pmids(pmids)]
+    with PubMedController(chunk_size=40, backends=[], workers=2) as controller:
+        actual = [p.to_dict() for p in controller.stream_for_pmids(pmids)]
+    assert expected
+    assert actual == expected
+
+def test_journaled_run_uses_worker_keyword_verdicts(monkeypatch, tmp_path):
+    """
+    Test that a journaled run parses in the process pool and hands the workers' keyword verdicts
+    to classification, with the same results as an in-process run.
+    """
+    pmids = [str(i) for i in range(1, 251)]
+    monkeypatch.setattr(controller_module, "iter_raw_pages", lambda ids, batch_size=100: raw_pages(ids, batch_size))
+    monkeypatch.setattr(controller_module, "iter_metadata",
+                        lambda ids: (p for _, batch in raw_pages(ids) for p in parse_page(efetch_xml(batch), batch)))
+    expected = [p.to_dict() for p in PubMedController(chunk_size=40, backends=[]).stream_for_pmids(pmids)]
+
+    keyword_verdicts = []
+    filter_biotech_papers = controller_module.filter_biotech_papers
+
+    def recording_filter(papers, **kwargs):
+        keyword_verdicts.append(kwargs["keyword_verdicts"])
+        return filter_biotech_papers(papers, **kwargs)
+
+    monkeypatch.setattr(controller_module, "filter_biotech_papers", recording_filter)
+    with PubMedController(chunk_size=40, backends=[], workers=2) as controller:
+        actual = [p.to_dict() for p in controller.stream_journaled(RunJournal(str(tmp_path)), pmids=pmids)]
+    assert actual == expected
+    assert len(keyword_verdicts) == 7
+    assert all(keyword_verdicts)
+
+def test_cached_run_uses_worker_keyword_verdicts(monkeypatch, tmp_path):
+    """
+    Test that with the metadata cache (the default) cache misses are keyword-matched by the
+    workers, and cache hits in this process, with the same results either way.
+    """
+    pmids = [str(i) for i in range(1, 251)]
+    monkeypatch.setattr(controller_module, "iter_raw_pages", lambda ids: raw_pages(ids))
+    monkeypatch.setattr(controller_module, "iter_metadata",
+                        lambda ids: (p for _, batch in raw_pages(ids) for p in parse_page(efetch_xml(batch), batch)))
+    expected = [p.to_dict() for p in PubMedController(chunk_size=40, backends=[]).stream_for_pmids(pmids)]
+
+    keyword_verdicts = []
+    filter_biotech_papers = controller_module.filter_biotech_papers
+
+    def recording_filter(papers, **kwargs):
+        keyword_verdicts.append(kwargs["keyword_verdicts"])
+        return filter_biotech_papers(papers, **kwargs)
+
+    monkeypatch.setattr(controller_module, "filter_biotech_papers", recording_filter)
+    cache = MetadataCache(str(tmp_path))
+    with PubMedController(chunk_size=40, backends=[], workers=2, cache=cache) as controller:
+        cold = [p.to_dict() for p in controller.stream_for_pmids(pmids)]
+        assert keyword_verdicts and all(keyword_verdicts)
+        keyword_verdicts.clear()
+        warm = [p.to_dict() for p in controller.stream_for_pmids(pmids)]
+        assert keyword_verdicts and not any(keyword_verdicts)
+    assert cold == warm == expected
+
+def test_workers_follow_debug_flag(monkeypatch):
+    """
+    Test that a parse error in a worker keeps its message when -d is on.
+    """
+    monkeypatch.setattr(DebugUtil, "enabled", True)
+    with open_pool(1) as pool:
+        with pytest.raises(RuntimeError, match="Error parsing metadata batch"):
+            list(iter_parsed_pages([(b"<PubmedArticleSet><oops", None)], pool, window=1))
+
+def test_worker_parse_time_is_reported(pool):
+    """
+    Test that the parse time recorded in the workers reaches this process's metrics.
+    """
+    metrics.reset()
+    pages = list(iter_parsed_pages(raw_pages([str(i) for i in range(1, 51)]), pool, window=2))
+    assert len(pages) == 5
+    assert metrics.snapshot()["stages"]["parse"]["calls"] == 5
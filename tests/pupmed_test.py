@@ -0,0 +1,107 @@
+import time
+import pytest
+from pubmed_papers.pipe import pupmed
+from pubmed_papers.pipe.ratelimit import TokenBucket
+
+class FakeResponse:
+    def __init__(self, status_code=200, content=b"", headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+def efetch_xml(pmids):
+    articles = "".join(
+        f"<PubmedArticle><MedlineCitation><PMID>{p}</PMID><Article>"
+        f"<ArticleTitle>Title {p}</ArticleTitle>"
+        f"<AuthorList><Author><LastName>Doe</LastName><ForeName>Jane</ForeName>"
+        f"<AffiliationInfo><Affiliation>Acme Therapeutics Inc, Boston</Affiliation></AffiliationInfo>"
+        f"</Author></AuthorList></Article></MedlineCitation></PubmedArticle>"
+        for p in pmids
+    )
+    return f"<PubmedArticleSet>{articles}</PubmedArticleSet>".encode()
+
+@pytest.fixture(autouse=True)
+def fast_limiter(monkeypatch):
+    monkeypatch.setattr(pupmed.ncbi, "limiter", TokenBucket(1000, capacity=1000))
+
+def test_token_bucket_spaces_requests():
+    """
+    Test that a bucket with capacity 1 never exceeds its rate.
+    """
+    bucket = TokenBucket(20)
+    start = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    assert time.monotonic() - start >= 5 / 20 * 0.9
+
+def test_fetch_metadata_preserves_pmid_order(monkeypatch):
+    """
+    Test that concurrent batches are reassembled in PMID order, even when NCBI reorders a batch.
+    """
+    def fake_request(method, url, data=None, **kwargs):
+        ids = data["id"].split(",")
+        # Make earlier batches slower so they complete last
+        time.sleep(0.05 if ids[0] == "1" else 0)
+        return FakeResponse(content=efetch_xml(reversed(ids)))
+
+    monkeypatch.setattr(pupmed.ncbi.session, "request", fake_request)
+    pmids = [str(i) for i in range(1, 26)]
+    papers = pupmed.fetch_metadata(pmids, batch_size=5, max_workers=4)
+    assert [p["pubmed_id"] for p in papers] == pmids
+    assert papers[0]["authors"][0] == {"name": "Jane Doe", "affiliation": "Acme Therapeutics Inc, Boston"}
+
+def test_ncbi_client_honors_retry_after(monkeypatch):
+    """
+    Test that a 429 response is retried after the Retry-After delay.
+    """
+    responses = [FakeResponse(429, headers={"Retry-After": "0.1"}), FakeResponse(200)]
+    monkeypatch.setattr(pupmed.ncbi.session, "request", lambda method, url, **kwargs: responses.pop(0))
+    start = time.monotonic()
+    response = pupmed.ncbi.efetch({"db": "pubmed"})
+    assert response.status_code == 200
+    assert time.monotonic() - start >= 0.1
+
+def test_history_fetch_pages_by_retstart(monkeypatch):
+    """
+    Test that the History server path pages efetch by WebEnv/retstart without sending PMIDs.
+    """
+    seen = []
+
+    def fake_request(method, url, params=None, **kwargs):
+        seen.append(params)
+        start = params["retstart"]
+        return FakeResponse(content=efetch_xml(range(start, min(start + params["retmax"], 12))))
+
+    monkeypatch.setattr(pupmed.ncbi.session, "request", fake_request)
+    papers = list(pupmed.iter_metadata_history("ENV", "1", 12, batch_size=5))
+    assert [p["pubmed_id"] for p in papers] == [str(i) for i in range(12)]
+    assert all("id" not in params and params["WebEnv"] == "ENV" for params in seen)
+    assert sorted(params["retstart"] for params in seen) == [0, 5, 10]
+
+def test_iter_articles_yields_incrementally():
+    """
+    Test that the iterparse parser yields articles one at a time, in document order.
+    """
+    articles = pupmed.iter_articles(efetch_xml(["7", "3", "5"]))
+    first = next(articles)
+    assert first["pubmed_id"] == "7"
+    assert first["title"] == "Title 7"
+    assert [a["pubmed_id"] for a in articles] == ["3", "5"]
+
+def test_search_history_pushes_down_window_and_sort(monkeypatch):
+    """
+    Test that the date window and sort order are sent to esearch.
+    """
+    seen = []
+
+    def fake_request(method, url, params=None, **kwargs):
+        seen.append(params)
+        response = FakeResponse()
+        response.raise_for_status = lambda: None
+        response.json = lambda: {"esearchresult": {"count": "3", "webenv": "ENV", "querykey": "1"}}
+        return response
+
+    monkeypatch.setattr(pupmed.ncbi.session, "request", fake_request)
+    assert pupmed.search_history("cancer", mindate="2020", datetype="pdat", sort="journal") == ("ENV", "1", 3)
+    assert seen[0]["sort"] == "JournalName"
+    assert (seen[0]["datetype"], seen[0]["mindate"]) == ("pdat", "2020")
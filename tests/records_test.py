@@ -0,0 +1,37 @@
+import json
+import sys
+from pubmed_papers.pipe.records import Paper, Author, Verdict, as_dict
+
+def make_dict(pmid):
+    return {"pubmed_id": pmid, "title": f"Title {pmid}", "publication_date": "2024-01-01",
+            "authors": [{"name": "Jane Doe", "affiliation": "Acme Inc, Boston"},
+                        {"name": "John Roe", "affiliation": {"company": "Acme Inc", "email": "none"}}]}
+
+def test_records_are_slotted():
+    """
+    Test that records carry no per-instance __dict__.
+    """
+    paper = Paper.from_dict(make_dict("1"))
+    assert not hasattr(paper, "__dict__")
+    assert not hasattr(paper.authors[0], "__dict__")
+    assert not hasattr(paper.authors[1].affiliation, "__dict__")
+
+def test_dict_round_trip_and_mapping_view():
+    """
+    Test that records convert to and from plain dicts and read like them.
+    """
+    paper = Paper.from_dict(make_dict("1"))
+    assert paper.to_dict() == make_dict("1")
+    assert paper == make_dict("1")
+    assert paper["authors"][0]["affiliation"] == "Acme Inc, Boston"
+    assert paper.get("query") is None and "query" not in paper
+    assert json.loads(json.dumps(as_dict(paper.with_query("q"))))["query"] == "q"
+
+def test_affiliations_are_interned():
+    """
+    Test that equal affiliation and company strings parsed separately share one object.
+    """
+    first = Author("A", "".join(["Acme Inc", ", Boston"]))
+    second = Author("B", "".join(["Acme Inc, ", "Boston"]))
+    assert first.affiliation is second.affiliation
+    assert Verdict("".join(["Acme", " Inc"])).company is sys.intern("Acme Inc")
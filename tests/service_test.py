@@ -0,0 +1,130 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from pubmed_papers.pipe import controller as controller_module, parallel
+from pubmed_papers.pipe.controller import PubMedController
+from pubmed_papers.pipe.records import Paper, Author, Verdict
+from pubmed_papers.pipe.service import PaperService, ServiceServer
+
+class FakeController:
+    def __init__(self, gate=None):
+        self.calls = []
+        self.gate = gate
+
+    def stream(self, query):
+        self.calls.append(query)
+        if query == "broken":
+            raise RuntimeError("NCBI is down")
+        for pmid in range(3):
+            if self.gate is not None:
+                self.gate.wait()
+            yield Paper(str(pmid), f"{query} {pmid}", "2024-01-01", [Author("Jane Doe", Verdict("Acme"))])
+
+def test_identical_requests_share_one_execution():
+    """
+    Test that concurrent identical requests run the pipeline once and all receive every paper.
+    """
+    gate = threading.Event()
+    controller = FakeController(gate)
+    service = PaperService(controller)
+    results = []
+
+    def call():
+        results.append([p.pubmed_id for p in service.papers("cancer  therapy")])
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    gate.set()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert controller.calls == ["cancer  therapy"]
+    assert results == [["0", "1", "2"]] * 3
+
+def test_finished_results_are_reused_until_they_expire():
+    """
+    Test that a finished result set is served again within its TTL and recomputed after it.
+    """
+    controller = FakeController()
+    service = PaperService(controller, result_ttl=60)
+    assert len(list(service.papers("q"))) == 3
+    assert len(list(service.papers("q"))) == 3
+    assert controller.calls == ["q"]
+    service.result_ttl = 0
+    list(service.papers("q"))
+    assert controller.calls == ["q", "q"]
+
+def test_http_streams_results_and_reports_errors():
+    """
+    Test the HTTP endpoint: JSON Lines results for a query, 502 for a failed run.
+    """
+    server = ServiceServer(("127.0.0.1", 0), PaperService(FakeController()))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    try:
+        with urllib.request.urlopen(f"{base}/papers?query=cancer") as response:
+            lines = response.read().decode().splitlines()
+        assert [json.loads(line)["pubmed_id"] for line in lines] == ["0", "1", "2"]
+        assert json.loads(lines[0])["authors"][0]["affiliation"]["company"] == "Acme"
+        try:
+            urllib.request.urlopen(f"{base}/papers?query=broken")
+            assert False, "expected an HTTP error"
+        except urllib.error.HTTPError as e:
+            assert e.code == 502
+        with urllib.request.urlopen(f"{base}/health") as response:
+            assert json.load(response)["status"] == "ok"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_concurrent_distinct_queries_on_one_controller(monkeypatch):
+    """
+    Test that distinct requests running at once on the shared controller each search their own
+    query and get their own results, and that concurrent pool users start a single pool.
+    """
+    searches = []
+    both_searching = threading.Barrier(2, timeout=5)
+
+    def fake_search(query, **options):
+        searches.append(query)
+        both_searching.wait()
+        return f"ENV-{query}", "1", 4
+
+    def fake_history(webenv, query_key, count):
+        query = webenv[len("ENV-"):]
+        return [Paper(str(i), f"{query} {i}", "2024-01-01", [Author("Jane Doe", Verdict("Acme"))]) for i in range(count)]
+
+    monkeypatch.setattr(controller_module, "search_history", fake_search)
+    monkeypatch.setattr(controller_module, "iter_metadata_history", fake_history)
+    monkeypatch.setattr(controller_module, "filter_biotech_papers", lambda papers, **kwargs: list(papers))
+    service = PaperService(PubMedController(chunk_size=2))
+    results = {}
+
+    def call(query):
+        results[query] = [p.title for p in service.papers(query)]
+
+    threads = [threading.Thread(target=call, args=(query,)) for query in ("crispr", "mrna")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert sorted(searches) == ["crispr", "mrna"]
+    assert results == {query: [f"{query} {i}" for i in range(4)] for query in ("crispr", "mrna")}
+
+    pools = []
+
+    def slow_open_pool(workers):
+        time.sleep(0.05)
+        pools.append(workers)
+        return pools
+
+    monkeypatch.setattr(parallel, "open_pool", slow_open_pool)
+    controller = PubMedController(workers=2)
+    threads = [threading.Thread(target=controller._get_pool) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert pools == [2]
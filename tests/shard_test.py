@@ -0,0 +1,137 @@
+import multiprocessing
+import os
+import threading
+import time
+import pytest
+from pubmed_papers.pipe import controller as controller_module
+from pubmed_papers.pipe.controller import PubMedController
+from pubmed_papers.pipe.shard import ShardQueue, work
+from pubmed_papers.pipe.records import Paper, Author, Verdict
+
+def make_paper(pmid):
+    return Paper(str(pmid), f"Title {pmid}", "2024-01-01", [Author("Jane Doe", Verdict("Acme"))])
+
+def fake_metadata(pmids):
+    time.sleep(0.05)
+    return [make_paper(p) for p in pmids]
+
+def fake_filter(papers, **kwargs):
+    return [p for p in papers if int(p.pubmed_id) % 2 == 0]
+
+def run_worker(directory):
+    # Runs in a spawned process: patch the pipeline of this process only
+    controller_module.iter_metadata = fake_metadata
+    controller_module.filter_biotech_papers = fake_filter
+    return work(ShardQueue(directory), PubMedController(chunk_size=10))
+
+def test_workers_in_separate_processes_process_every_shard_once(tmp_path):
+    """
+    Test that several worker processes drain the queue without processing a shard twice,
+    and that merging yields the matched papers in PMID order.
+    """
+    queue = ShardQueue(str(tmp_path))
+    assert queue.create("cancer", [str(i) for i in range(200)], shard_size=25) == 8
+
+    with multiprocessing.get_context("spawn").Pool(3) as pool:
+        completed = pool.map(run_worker, [str(tmp_path)] * 3)
+
+    assert sum(completed) == 8
+    assert queue.status() == {"shards": 8, "done": 8, "claimed": 0, "pending": 0}
+    assert [p.pubmed_id for p in queue.results()] == [str(i) for i in range(0, 200, 2)]
+    assert not [name for name in os.listdir(queue.shard_dir) if name.endswith((".lock", ".tmp"))]
+
+def test_claims_are_exclusive_and_stale_claims_are_taken_over(tmp_path):
+    """
+    Test that a claimed shard is not handed out again until its claim goes stale.
+    """
+    queue = ShardQueue(str(tmp_path), stale_after=60)
+    queue.create("cancer", ["1", "2", "3"], shard_size=2)
+    assert queue.claim("a") == 0
+    assert queue.claim("b") == 1
+    assert queue.claim("c") is None
+
+    # Worker "a" crashed an hour ago
+    lock = os.path.join(queue.shard_dir, "00000.lock")
+    os.utime(lock, (time.time() - 3600, time.time() - 3600))
+    assert queue.claim("c") == 0
+    with open(lock) as f:
+        assert f.read().strip() == "c"
+
+def test_busy_worker_keeps_its_claim_without_matches(tmp_path, monkeypatch):
+    """
+    Test that a worker whose shard outlasts `stale_after` before anything matches keeps
+    its claim, since the lock is touched in the background.
+    """
+    def slow_metadata(pmids):
+        time.sleep(1.0)
+        return [make_paper(p) for p in pmids]
+
+    monkeypatch.setattr(controller_module, "iter_metadata", slow_metadata)
+    monkeypatch.setattr(controller_module, "filter_biotech_papers", lambda papers, **kwargs: [])
+    queue = ShardQueue(str(tmp_path), stale_after=0.3)
+    queue.create("cancer", ["1"])
+    worker = threading.Thread(target=work, args=(queue, PubMedController(), "a"))
+    worker.start()
+    while queue.owner(0) != "a":
+        time.sleep(0.01)
+    claims = []
+    while worker.is_alive():
+        claims.append(queue.claim("b"))
+        time.sleep(0.05)
+    worker.join()
+    assert claims and set(claims) == {None}
+    assert queue.status() == {"shards": 1, "done": 1, "claimed": 0, "pending": 0}
+
+def test_locks_taken_over_are_not_released_or_broken(tmp_path):
+    """
+    Test that a worker only releases its own lock, and that a lock found fresh again after
+    the stale rename is put back instead of being removed.
+    """
+    queue = ShardQueue(str(tmp_path), stale_after=60)
+    queue.create("cancer", ["1"])
+    assert queue.claim("a") == 0
+    lock = os.path.join(queue.shard_dir, "00000.lock")
+    os.utime(lock, (time.time() - 3600, time.time() - 3600))
+    assert queue.claim("b") == 0
+
+    # "a" finishes late: neither its heartbeat nor its release touches the lock of "b"
+    assert not queue.heartbeat(0, "a")
+    queue.release(0, "a")
+    assert queue.owner(0) == "b"
+
+    # "c" saw the old mtime, but "b" heartbeated before the rename
+    queue._break_stale(0, "c")
+    assert queue.owner(0) == "b"
+    assert not [name for name in os.listdir(queue.shard_dir) if ".stale." in name]
+    queue.release(0, "b")
+    assert queue.owner(0) is None
+
+def test_failed_shard_is_released_and_merge_refuses_partial_runs(tmp_path, monkeypatch):
+    """
+    Test that a worker error hands its shard back to the queue, and merging an unfinished run fails.
+    """
+    def broken_metadata(pmids):
+        raise RuntimeError("efetch down")
+
+    monkeypatch.setattr(controller_module, "iter_metadata", broken_metadata)
+    queue = ShardQueue(str(tmp_path))
+    queue.create("cancer", ["1", "2"], shard_size=1)
+    with pytest.raises(RuntimeError):
+        work(queue, PubMedController(), "w1")
+    assert queue.status() == {"shards": 2, "done": 0, "claimed": 0, "pending": 2}
+    with pytest.raises(RuntimeError):
+        list(queue.results())
+
+    monkeypatch.setattr(controller_module, "iter_metadata", fake_metadata)
+    monkeypatch.setattr(controller_module, "filter_biotech_papers", fake_filter)
+    assert work(queue, PubMedController(), "w2") == 2
+    assert [p.pubmed_id for p in queue.results()] == ["2"]
+
+def test_create_refuses_existing_run(tmp_path):
+    """
+    Test that creating shards over an existing sharded run fails instead of mixing the two.
+    """
+    queue = ShardQueue(str(tmp_path))
+    queue.create("cancer", ["1"])
+    with pytest.raises(RuntimeError):
+        queue.create("cancer", ["2"])
@@ -0,0 +1,34 @@
+import os
+import subprocess
+import sys
+
+def run_python(startup_bench, *args):
+    env = dict(os.environ)
+    env.pop("GROQ_API_KEY", None)
+    env["PYTHONPATH"] = startup_bench.SRC + os.pathsep + env.get("PYTHONPATH", "")
+    return subprocess.run([sys.executable, *args], capture_output=True, text=True, env=env, timeout=60)
+
+def test_entry_point_skips_heavy_imports(startup_bench):
+    """
+    Importing the CLI entry point must not pull in the HTTP stack, the LLM client or torch.
+    Its import time is checked by benchmarks/startup_bench.py, not here: wall-clock budgets
+    are unreliable on loaded CI machines.
+    """
+    times = startup_bench.import_times(startup_bench.ENTRY_POINT)
+    assert startup_bench.ENTRY_POINT in times
+    assert startup_bench.heavy_imports(times) == []
+
+def test_llm_module_imports_without_key(startup_bench):
+    """
+    LLMmatch can be imported without GROQ_API_KEY; the client is only needed on first use.
+    """
+    proc = run_python(startup_bench, "-c", "import pubmed_papers.pipe.LLMmatch as m; assert m._client is None")
+    assert proc.returncode == 0, proc.stderr
+
+def test_help_without_key(startup_bench):
+    """
+    `-h` works without GROQ_API_KEY.
+    """
+    proc = run_python(startup_bench, "-c", "from pubmed_papers.main import main; main()", "-h")
+    assert proc.returncode == 0, proc.stderr
+    assert "--keyword-only" in proc.stdout
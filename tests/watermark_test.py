@@ -0,0 +1,41 @@
+import sys
+import pytest
+from pubmed_papers.main import main as start_main
+from pubmed_papers.pipe.watermark import WatermarkStore
+
+def test_new_query_has_no_watermark(tmp_path):
+    """
+    Test that a query that never ran has no watermark and nothing seen.
+    """
+    store = WatermarkStore(str(tmp_path))
+    assert store.last_run("cancer") is None
+    assert store.unseen("cancer", ["1", "2"]) == ["1", "2"]
+
+def test_advance_records_date_and_pmids(tmp_path):
+    """
+    Test that a completed run moves the watermark and marks its PMIDs as seen, per query.
+    """
+    store = WatermarkStore(str(tmp_path))
+    store.advance("cancer  therapy", "2024/05/01", ["1", "2"])
+    assert store.last_run("cancer therapy") == "2024/05/01"
+    assert store.unseen("cancer therapy", ["3", "2", "1", "4"]) == ["3", "4"]
+    assert store.unseen("other query", ["1"]) == ["1"]
+
+def test_watermarks_persist(tmp_path):
+    """
+    Test that watermarks survive reopening the store.
+    """
+    WatermarkStore(str(tmp_path)).advance("q", "2024/05/01", ["1"])
+    store = WatermarkStore(str(tmp_path))
+    assert store.last_run("q") == "2024/05/01"
+    assert store.unseen("q", ["1"]) == []
+
+def test_incremental_rejects_pmids(monkeypatch, capsys):
+    """
+    Test that --incremental with --pmids is a usage error instead of an unwatermarked append.
+    """
+    monkeypatch.setattr(sys, "argv", ["get-papers-list", "123,456", "--pmids", "--incremental", "-f", "out.csv"])
+    with pytest.raises(SystemExit) as e:
+        start_main()
+    assert e.value.code == 2
+    assert "--incremental cannot be combined with --pmids" in capsys.readouterr().err